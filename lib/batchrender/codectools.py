@@ -20,9 +20,8 @@ def get_unicode(input_bytes, codecs=('UTF-8', 'GBK')):
     if isinstance(input_bytes, six.text_type):
         return input_bytes
 
-    try:
-        input_bytes = six.binary_type(input_bytes)
-    except (TypeError, ValueError):
+    if not isinstance(input_bytes, six.binary_type):
+        # `bytes` of a integer iterable is not its text on python3.
         return six.text_type(input_bytes)
 
     try:
@@ -36,6 +36,34 @@ class Config(dict):
         'MEMORY_LIMIT': max(psutil.virtual_memory().total / 2.0 ** 30 - 8.0, 0.0),
         'THREADS': psutil.cpu_count(logical=True),
         'TIME_OUT': 600,
+        'TIME_OUT_FACTOR': 0.0,
+        'TIME_OUT_MIN': 0,
+        'TIME_OUT_OVERRIDES': {},
+        'METRICS_PORT': 0,
+        'SAMPLE_INTERVAL': 0.0,
+        'AUTO_TUNE': 0,
+        'MAX_CONCURRENT': 1,
+        'MEMORY_HEADROOM': 2.0,
+        'RETRY_BACKOFF': 30,
+        'VALIDATE': 0,
+        'PROGRESSIVE': 0,
+        'PREEMPT': 0,
+        'MAX_SUSPENDED': 1,
+        'SUSPENDED_MEMORY': 8.0,
+        'SCHEDULE_POLICY': 'fifo',
+        'AGING_RATE': 1.0,
+        'DEADLINES': {},
+        'INFER_DEPENDENCIES': 0,
+        'DEPENDENCIES': {},
+        'BATCH_COST': 0,
+        'BATCH_SIZE': 20,
+        'RECYCLE_FRAMES': 0,
+        'RECYCLE_MEMORY': 0.0,
+        'STAGING_DIR': '',
+        'STAGING_BANDWIDTH': 0,
+        'PREFETCH_DIR': '',
+        'PREFETCH_SIZE': 50.0,
+        'PREFETCH_TASKS': 2,
     }
     engine_path = os.path.expanduser('~/.nuke/.batchrender/database.db')
     engine_uri = 'sqlite:///{}'.format(engine_path)
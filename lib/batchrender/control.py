@@ -9,7 +9,7 @@ import os
 from PySide2.QtCore import QObject, Signal
 from PySide2.QtWidgets import QMessageBox
 
-from . import actions, database, filetools
+from . import actions, database, filetools, metrics
 from . import model as qmodel
 from . import render
 from .codectools import get_unicode as u
@@ -38,6 +38,8 @@ class Controller(UnicodeTrMixin, QObject):
         proxy_model = qmodel.FilesProxyModel(self)
         proxy_model.setSourceModel(model)
         self.model = proxy_model
+        self.watcher = qmodel.DirectoryWatcher(self)
+        proxy_model.set_watcher(self.watcher)
         self.output_model = qmodel.FileOutputModel(self)
         self.output_model.update()
 
@@ -45,9 +47,20 @@ class Controller(UnicodeTrMixin, QObject):
         self.queue = render.Queue(self.model)
         self.slave = render.Slave(self.queue)
 
-        self.slave.progressed.connect(self.queue.update_remains)
+        self.watcher.file_added.connect(self.queue.on_file_added)
+        self.watcher.file_modified.connect(self.queue.on_file_modified)
+        self.watcher.file_removed.connect(self.queue.on_file_removed)
+
         self.slave.task_stopped.connect(self.output_model.update)
 
+        self.metrics_server = None
+        if CONFIG['METRICS_PORT']:
+            try:
+                self.metrics_server = metrics.serve(CONFIG['METRICS_PORT'])
+            except (IOError, OSError):
+                LOGGER.warning('Can not serve metrics on port %s.',
+                               CONFIG['METRICS_PORT'], exc_info=True)
+
     def start(self):
         """Start rendering.  """
         self.slave.start()
@@ -61,6 +74,7 @@ class Controller(UnicodeTrMixin, QObject):
 
         path = os.path.normpath(path)
         CONFIG['DIR'] = path
+        self.watcher.set_root(path)
         self.model.sourceModel().setRootPath(path)
         self.root_changed.emit(path)
 
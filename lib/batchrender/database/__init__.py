@@ -8,5 +8,9 @@ from . import core, util
 from .file import File
 from .frame import Frame
 from .output import Output
+from .phase import Phase
+from .recycle import Recycle
+from .resource import Resource
+from .tuning import Tuning
 
 core.setup()
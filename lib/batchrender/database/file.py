@@ -58,17 +58,42 @@ class File(Base, SerializableMixin):
             return None
         return FrameRange(list(range(first, last+1)))
 
-    def average_frame_cost(self):
-        """Average frame cost for this file.  """
+    def average_frame_cost(self, session=None):
+        """Average frame cost for this file.
 
-        session = object_session(self)
-        return session.query(func.avg(Frame.cost)).filter(Frame.file == self).scalar()
+        Args:
+            session (Session, optional): Defaults to object session.
+                Required for object not in a session.
+        """
+
+        session = session or object_session(self)
+        return session.query(func.avg(Frame.cost)).filter(
+            Frame.file_hash == self.hash).scalar()
+
+    def statistics(self, session=None):
+        """Render statistics of this file.
+
+        Args:
+            session (Session, optional): Defaults to object session.
 
-    def estimate_cost(self, frame_count=None, default_frame_count=100, default_frame_cost=30):
+        Returns:
+            dict: Statistics data.
+        """
+
+        range_ = self.range()
+        return {
+            'hash': self.hash,
+            'frame_count': self.frame_count,
+            'range': six.text_type(range_) if range_ is not None else None,
+            'average_frame_cost': self.average_frame_cost(session),
+        }
+
+    def estimate_cost(self, frame_count=None, default_frame_count=100, default_frame_cost=30,
+                      session=None):
         """Estimate file render time cost.  """
 
-        session = object_session(self)
-        frame_cost = (self.average_frame_cost() or
+        session = session or object_session(self)
+        frame_cost = (self.average_frame_cost(session) or
                       session.query(func.avg(Frame.cost)).scalar() or
                       default_frame_cost)
 
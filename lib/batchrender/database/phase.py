@@ -0,0 +1,70 @@
+# -*- coding=UTF-8 -*-
+"""Database render phase table.  """
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+from collections import OrderedDict
+
+from sqlalchemy import Column, Float, ForeignKey, Integer, String, func
+from sqlalchemy.orm import relationship
+
+from .core import Base, SerializableMixin
+from .frame import Frame
+
+
+class Phase(Base, SerializableMixin):
+    """Render phase timing table.  """
+
+    __tablename__ = 'Phase'
+    id = Column(Integer, primary_key=True)
+    run = Column(String, index=True)
+    name = Column(String)
+    start = Column(Float)
+    cost = Column(Float)
+    host = Column(String)
+    slot = Column(Integer)
+    file_hash = Column(String, ForeignKey('File.hash'))
+    file = relationship('File')
+
+    @classmethod
+    def summary(cls, session, file_hash=None, since=None):
+        """Time spent on each phase.
+
+        Frame time comes from `Frame` table.
+
+        Args:
+            session (Session): Database session.
+            file_hash (str, optional): Defaults to None. Only include this file.
+            since (float, optional): Defaults to None. Only include data after this timestamp.
+
+        Returns:
+            OrderedDict: Phase name as key,
+                dict with `count`, `total`, `average`, `ratio` as value.
+        """
+
+        query = session.query(
+            cls.name, func.count(cls.id), func.sum(cls.cost)
+        ).group_by(cls.name).order_by(func.min(cls.id))
+        frame_query = session.query(func.count(Frame.id), func.sum(Frame.cost))
+        if file_hash is not None:
+            query = query.filter(cls.file_hash == file_hash)
+            frame_query = frame_query.filter(Frame.file_hash == file_hash)
+        if since is not None:
+            query = query.filter(cls.start >= since)
+            frame_query = frame_query.filter(Frame.timestamp >= since)
+
+        rows = [i for i in query.all() if i[0] != 'task']
+        rows.append(('frame',) + tuple(frame_query.one()))
+
+        ret = OrderedDict()
+        for name, count, total in rows:
+            if not count:
+                continue
+            ret[name] = {'count': count,
+                         'total': total or 0.0,
+                         'average': (total or 0.0) / count}
+        total = sum(i['total'] for i in ret.values())
+        for i in ret.values():
+            i['ratio'] = i['total'] / total if total else 0.0
+        return ret
@@ -0,0 +1,66 @@
+# -*- coding=UTF-8 -*-
+"""Database render process recycle table.  """
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+from sqlalchemy import Column, Float, ForeignKey, Integer, String, func
+from sqlalchemy.orm import relationship
+
+from .core import Base, SerializableMixin
+
+
+class Recycle(Base, SerializableMixin):
+    """Render process restarted to release memory.
+
+    `cost_before` is average frame cost of last frames before restart,
+    `cost_after` is average frame cost of first frames after restart,
+    first frame of a process is not counted for startup time.
+    """
+
+    __tablename__ = 'Recycle'
+    id = Column(Integer, primary_key=True)
+    run = Column(String, index=True)
+    timestamp = Column(Float)
+    reason = Column(String)
+    frame = Column(Integer)
+    frames = Column(Integer)
+    rss = Column(Integer)
+    cost_before = Column(Float)
+    cost_after = Column(Float)
+    file_hash = Column(String, ForeignKey('File.hash'), index=True)
+    file = relationship('File')
+
+    @classmethod
+    def summary(cls, session, file_hash=None, since=None):
+        """Frame cost change by recycles.
+
+        Args:
+            session (Session): Database session.
+            file_hash (str, optional): Defaults to None. Only include this file.
+            since (float, optional): Defaults to None. Only include data after this timestamp.
+
+        Returns:
+            dict: `count`, `cost_before`, `cost_after`, `speedup`.
+                Costs only include recycles that have both costs,
+                values are None if no data.
+        """
+
+        query = session.query(func.count(cls.id))
+        compared = session.query(
+            func.avg(cls.cost_before),
+            func.avg(cls.cost_after),
+        ).filter(cls.cost_before.isnot(None), cls.cost_after.isnot(None))
+        if file_hash is not None:
+            query = query.filter(cls.file_hash == file_hash)
+            compared = compared.filter(cls.file_hash == file_hash)
+        if since is not None:
+            query = query.filter(cls.timestamp >= since)
+            compared = compared.filter(cls.timestamp >= since)
+        before, after = compared.one()
+        return dict(
+            count=query.scalar(),
+            cost_before=before,
+            cost_after=after,
+            speedup=before / after if before and after else None,
+        )
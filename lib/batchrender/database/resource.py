@@ -0,0 +1,66 @@
+# -*- coding=UTF-8 -*-
+"""Database render process resource usage table.  """
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+from sqlalchemy import Column, Float, ForeignKey, Integer, String, func
+from sqlalchemy.orm import relationship
+
+from .core import Base, SerializableMixin
+
+
+class Resource(Base, SerializableMixin):
+    """Render process resource usage table.
+
+    Row with `frame` is usage of a frame,
+    row without `frame` is usage of whole render run.
+    """
+
+    __tablename__ = 'Resource'
+    id = Column(Integer, primary_key=True)
+    run = Column(String, index=True)
+    frame = Column(Integer)
+    timestamp = Column(Float)
+    samples = Column(Integer)
+    cpu_average = Column(Float)
+    cpu_max = Column(Float)
+    rss_average = Column(Integer)
+    rss_peak = Column(Integer)
+    io_read = Column(Integer)
+    io_write = Column(Integer)
+    threads = Column(Integer)
+    file_hash = Column(String, ForeignKey('File.hash'))
+    file = relationship('File')
+
+    @classmethod
+    def summary(cls, session, file_hash=None, since=None):
+        """Resource usage of render runs.
+
+        Args:
+            session (Session): Database session.
+            file_hash (str, optional): Defaults to None. Only include this file.
+            since (float, optional): Defaults to None. Only include data after this timestamp.
+
+        Returns:
+            dict: `runs`, `cpu_average`, `cpu_max`, `rss_peak`,
+                `io_read`, `io_write`, `threads`.
+                Values are None if no data.
+        """
+
+        query = session.query(
+            func.count(cls.id),
+            func.sum(cls.cpu_average * cls.samples) / func.sum(cls.samples),
+            func.max(cls.cpu_max),
+            func.max(cls.rss_peak),
+            func.sum(cls.io_read),
+            func.sum(cls.io_write),
+            func.max(cls.threads),
+        ).filter(cls.frame.is_(None), cls.samples > 0)
+        if file_hash is not None:
+            query = query.filter(cls.file_hash == file_hash)
+        if since is not None:
+            query = query.filter(cls.timestamp >= since)
+        keys = ('runs', 'cpu_average', 'cpu_max', 'rss_peak',
+                'io_read', 'io_write', 'threads')
+        return dict(zip(keys, query.one()))
@@ -0,0 +1,67 @@
+# -*- coding=UTF-8 -*-
+"""Database render option tuning table.  """
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+from sqlalchemy import Column, Float, ForeignKey, Integer, String, func
+from sqlalchemy.orm import relationship
+
+from .core import Base, SerializableMixin
+
+
+class Tuning(Base, SerializableMixin):
+    """Render options used by each run and the result.  """
+
+    __tablename__ = 'Tuning'
+    id = Column(Integer, primary_key=True)
+    run = Column(String, index=True)
+    timestamp = Column(Float)
+    reason = Column(String)
+    threads = Column(Integer)
+    memory_limit = Column(Float)
+    frames = Column(Integer)
+    frame_cost = Column(Float)
+    speedup = Column(Float)
+    file_hash = Column(String, ForeignKey('File.hash'), index=True)
+    file = relationship('File')
+
+    @classmethod
+    def history(cls, session, file_hash):
+        """Average frame cost of each tried options.
+
+        Args:
+            session (Session): Database session.
+            file_hash (str): File hash.
+
+        Returns:
+            dict: (threads, memory_limit) as key, average frame cost as value.
+        """
+
+        query = session.query(
+            cls.threads, cls.memory_limit,
+            func.sum(cls.frame_cost * cls.frames) / func.sum(cls.frames)
+        ).filter(
+            cls.file_hash == file_hash, cls.frames > 0
+        ).group_by(cls.threads, cls.memory_limit)
+        return {(threads, memory_limit): cost
+                for threads, memory_limit, cost in query}
+
+    @classmethod
+    def baseline(cls, session, file_hash, reason):
+        """Average frame cost of runs with a reason.
+
+        Args:
+            session (Session): Database session.
+            file_hash (str): File hash.
+            reason (str): Reason of baseline runs.
+
+        Returns:
+            float: Frame cost, None if no data.
+        """
+
+        return session.query(
+            func.sum(cls.frame_cost * cls.frames) / func.sum(cls.frames)
+        ).filter(
+            cls.file_hash == file_hash, cls.frames > 0, cls.reason == reason
+        ).scalar()
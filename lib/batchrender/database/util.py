@@ -8,6 +8,7 @@ import time
 from contextlib import contextmanager
 
 from . import core
+from .. import metrics
 
 _CONTEXT = {}
 
@@ -21,6 +22,7 @@ def throttle_commit(session, min_interval=1):
     now = time.time()
     if now - last_time > min_interval:
         session.commit()
+        metrics.on_db_commit()
         _CONTEXT[context_key] = now
 
 
@@ -33,6 +35,7 @@ def session_scope(session=None):
     try:
         yield sess
         sess.commit()
+        metrics.on_db_commit()
     except:
         sess.rollback()
         raise
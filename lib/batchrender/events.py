@@ -0,0 +1,328 @@
+# -*- coding=UTF-8 -*-
+"""Render events as JSON lines.
+
+One file per day: `events-YYYY-MM-DD.jsonl`,
+file over size limit continues in `events-YYYY-MM-DD.1.jsonl`, etc.
+
+Every record has these keys:
+    version (int): Schema version.
+    time (float): Unix timestamp.
+    event (str): Event name.
+    host (str): Host name.
+    pid (int): Process id of batchrender.
+Render task events also have `file`, `file_hash`, `run` and `slot`.
+
+Usage:
+    python -m batchrender.events --follow
+"""
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import argparse
+import atexit
+import io
+import json
+import logging
+import os
+import re
+import socket
+import threading
+import time
+
+import six
+from six.moves import queue
+
+from .config import CONFIG
+
+LOGGER = logging.getLogger(__name__)
+
+SCHEMA_VERSION = 1
+PREFIX = 'events'
+DEFAULT_DIR = os.path.join(os.path.dirname(CONFIG.path), 'events')
+HOST = socket.gethostname()
+
+# Event names.
+STARTED = 'started'
+FRAME_FINISHED = 'frame_finished'
+OUTPUT = 'output'
+ERROR = 'error'
+RETRY = 'retry'
+ABORTED = 'aborted'
+SUSPENDED = 'suspended'
+RESUMED = 'resumed'
+RECYCLED = 'recycled'
+PREFETCHED = 'prefetched'
+FINISHED = 'finished'
+
+_FILENAME_PATTERN = re.compile(
+    r'^(?P<prefix>.+)-(?P<date>\d{4}-\d{2}-\d{2})(?:\.(?P<index>\d+))?\.jsonl$')
+
+
+def _sort_key(path):
+    match = _FILENAME_PATTERN.match(os.path.basename(path))
+    return (match.group('date'), int(match.group('index') or 0))
+
+
+def files(dirname, prefix=PREFIX):
+    """Event log files in time order.
+
+    Args:
+        dirname (str): Event log directory.
+        prefix (str, optional): Defaults to `PREFIX`. File name prefix.
+
+    Returns:
+        list[str]: File paths.
+    """
+
+    try:
+        names = os.listdir(dirname)
+    except OSError:
+        return []
+    ret = []
+    for i in names:
+        match = _FILENAME_PATTERN.match(i)
+        if match and match.group('prefix') == prefix:
+            ret.append(os.path.join(dirname, i))
+    ret.sort(key=_sort_key)
+    return ret
+
+
+def read(path):
+    """Read records from a event log file.
+
+    Args:
+        path (str): File path.
+
+    Returns:
+        Generator: Event records.
+    """
+
+    with io.open(path, encoding='utf-8') as f:
+        for line in f:
+            if not line.endswith('\n'):
+                # Being written.
+                break
+            yield json.loads(line)
+
+
+def follow(dirname, prefix=PREFIX, from_start=False, interval=0.5,
+           stop=None):
+    """Follow event log like `tail -f`, rotated files are followed too.
+
+    Args:
+        dirname (str): Event log directory.
+        prefix (str, optional): Defaults to `PREFIX`. File name prefix.
+        from_start (bool, optional): Defaults to False.
+            Read from earliest file instead of end of latest file.
+        interval (float, optional): Defaults to 0.5. Poll interval in seconds.
+        stop (callable, optional): Defaults to None.
+            Stop following when this returns True.
+
+    Returns:
+        Generator: Event records.
+    """
+
+    current = None
+    f = None
+    buffer_ = ''
+    try:
+        paths = files(dirname, prefix)
+        if paths:
+            current = paths[0] if from_start else paths[-1]
+            f = io.open(current, encoding='utf-8')
+            if not from_start:
+                f.seek(0, io.SEEK_END)
+        while not (stop and stop()):
+            line = f.readline() if f else ''
+            if line:
+                buffer_ += line
+                if buffer_.endswith('\n'):
+                    record, buffer_ = buffer_, ''
+                    yield json.loads(record)
+                continue
+
+            # Writer closes old file before create new one,
+            # so nothing left in current file when a newer one exists.
+            newer = [i for i in files(dirname, prefix)
+                     if current is None or _sort_key(i) > _sort_key(current)]
+            if newer and not buffer_:
+                if f:
+                    f.close()
+                current = newer[0]
+                f = io.open(current, encoding='utf-8')
+                continue
+            time.sleep(interval)
+    finally:
+        if f:
+            f.close()
+
+
+class EventLog(object):
+    """Event log that written in a background thread.
+
+    Args:
+        dirname (str): Directory to save files.
+        max_bytes (int, optional): Defaults to 32MiB. Size limit of one file.
+        prefix (str, optional): Defaults to `PREFIX`. File name prefix.
+    """
+
+    def __init__(self, dirname, max_bytes=32 * 2 ** 20, prefix=PREFIX):
+        self.dirname = dirname
+        self.max_bytes = max_bytes
+        self.prefix = prefix
+        self.path = None
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._file = None
+        self._date = None
+
+    def emit(self, event, **data):
+        """Add a event record, this never blocks.
+
+        Args:
+            event (str): Event name.
+            **data: Event data, must be json serializable.
+
+        Returns:
+            dict: Event record.
+        """
+
+        record = dict(data,
+                      version=SCHEMA_VERSION,
+                      time=time.time(),
+                      event=event,
+                      host=HOST,
+                      pid=os.getpid())
+        self._queue.put(record)
+        self._ensure_thread()
+        return record
+
+    def flush(self):
+        """Wait all records written.  """
+
+        if self._thread:
+            self._queue.join()
+
+    def close(self):
+        """Flush and close file.  """
+
+        self.flush()
+        with self._lock:
+            self._close_file()
+
+    def _ensure_thread(self):
+        if self._thread and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            thread = threading.Thread(target=self._run, name='event-log')
+            thread.daemon = True
+            thread.start()
+            self._thread = thread
+
+    def _run(self):
+        while True:
+            records = [self._queue.get()]
+            # Drain queue for less flush.
+            while True:
+                try:
+                    records.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                with self._lock:
+                    self._write(records)
+            except Exception:  # pylint: disable=broad-except
+                LOGGER.warning('Write event log failed.', exc_info=True)
+            finally:
+                for _ in records:
+                    self._queue.task_done()
+
+    def _write(self, records):
+        for i in records:
+            line = json.dumps(i, ensure_ascii=False, sort_keys=True,
+                              default=six.text_type)
+            f = self._get_file(i['time'])
+            f.write(six.text_type(line) + '\n')
+        if self._file:
+            self._file.flush()
+
+    def _get_file(self, timestamp):
+        date = time.strftime('%Y-%m-%d', time.localtime(timestamp))
+        f = self._file
+        if f and (date != self._date or f.tell() >= self.max_bytes):
+            self._close_file()
+            f = None
+        if f is None:
+            f = self._open(date)
+        return f
+
+    def _open(self, date):
+        try:
+            os.makedirs(self.dirname)
+        except OSError:
+            pass
+        index = 0
+        existed = [i for i in files(self.dirname, self.prefix)
+                   if _sort_key(i)[0] == date]
+        if existed:
+            index = _sort_key(existed[-1])[1]
+        while True:
+            path = os.path.join(self.dirname, '{}-{}{}.jsonl'.format(
+                self.prefix, date, '.{}'.format(index) if index else ''))
+            if (not os.path.exists(path)
+                    or os.path.getsize(path) < self.max_bytes):
+                break
+            index += 1
+        self.path = path
+        self._date = date
+        self._file = io.open(path, 'a', encoding='utf-8')
+        return self._file
+
+    def _close_file(self):
+        if self._file:
+            self._file.close()
+        self._file = None
+
+
+_DEFAULT = {}
+
+
+def get_default():
+    """Default event log in config directory.  """
+
+    if 'log' not in _DEFAULT:
+        _DEFAULT['log'] = EventLog(DEFAULT_DIR)
+        atexit.register(_DEFAULT['log'].close)
+    return _DEFAULT['log']
+
+
+def emit(event, **data):
+    """Add a event record to default event log.  """
+
+    return get_default().emit(event, **data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Print render events.')
+    parser.add_argument('--dir', default=DEFAULT_DIR,
+                        help='Event log directory.')
+    parser.add_argument('--follow', '-f', action='store_true',
+                        help='Wait for new events.')
+    args = parser.parse_args()
+    if args.follow:
+        records = follow(args.dir)
+    else:
+        records = (j for i in files(args.dir) for j in read(i))
+    try:
+        for i in records:
+            print(json.dumps(i, ensure_ascii=False, sort_keys=True))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -11,3 +11,19 @@ class RenderException(Exception):
 
 class AlreadyRendering(RenderException):
     """Task already rendering.  """
+
+
+class AlreadyCompleted(RenderException):
+    """All frames of task are completed in journal.  """
+
+
+class ValidationFailed(RenderException):
+    """Script will fail to render.  """
+
+    def __init__(self, problems):
+        super(ValidationFailed, self).__init__(problems)
+        self.problems = problems
+
+
+class DependencyHeld(RenderException):
+    """No frame of task is released by upstream tasks.  """
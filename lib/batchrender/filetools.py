@@ -136,6 +136,89 @@ def version_filter(iterable):
     return sorted(shots.values())
 
 
+class VersionIndex(object):
+    """Incremental index of newest version for each shot.
+
+    Same rule as `version_filter`, but only the shot of changed file
+    need to be re-evaluated.
+
+    >>> index = VersionIndex()
+    >>> index.add('sc_001_v1.nk', 1)
+    >>> index.add('sc_001_v2.nk', 0)
+    >>> index.add('sc_002_v1.nk', 0)
+    >>> sorted(index.outdated)
+    ['sc_001_v1.nk']
+    >>> index.remove('sc_001_v2.nk')
+    >>> sorted(index.outdated)
+    []
+    """
+
+    def __init__(self):
+        self._shots = {}
+        self._shot_by_path = {}
+        self._outdated = set()
+
+    def __len__(self):
+        return len(self._shot_by_path)
+
+    def __contains__(self, path):
+        return path in self._shot_by_path
+
+    @property
+    def outdated(self):
+        """Files that has a lower version number.  """
+
+        return frozenset(self._outdated)
+
+    def add(self, path, mtime):
+        """Add or update a file.
+
+        Args:
+            path (str): File path.
+            mtime (float): File modification time.
+        """
+
+        path = u(path)
+        dirname, basename = os.path.split(path)
+        shot, version = split_version(basename)
+        key = (dirname, shot.lower())
+        old_key = self._shot_by_path.get(path)
+        if old_key is not None and old_key != key:
+            self.remove(path)
+
+        self._shot_by_path[path] = key
+        self._shots.setdefault(key, {})[path] = (version or -1, mtime or 0)
+        self._update(key)
+
+    def remove(self, path):
+        """Remove a file.  """
+
+        path = u(path)
+        key = self._shot_by_path.pop(path, None)
+        if key is None:
+            return
+        self._outdated.discard(path)
+        files = self._shots[key]
+        del files[path]
+        if files:
+            self._update(key)
+        else:
+            del self._shots[key]
+
+    def clear(self):
+        """Remove all files.  """
+
+        self._shots.clear()
+        self._shot_by_path.clear()
+        self._outdated.clear()
+
+    def _update(self, key):
+        files = self._shots[key]
+        newest = max(files, key=files.get)
+        self._outdated.update(files)
+        self._outdated.discard(newest)
+
+
 def split_version(f):
     """Return nuke style _v# (shot, version number) pair.
 
@@ -84,6 +84,15 @@ class FrameRange(set):
         """Nuke style frame range representation.  """
         return ' '.join(_format_part(i) for i in self._iter_parts())
 
+    def parts(self):
+        """Nuke style representation of each continuous part.
+
+        >>> FrameRange([1, 2, 3, 5, 7, 9, 20]).parts()
+        ['1-3', '5-9x2', '20']
+        """
+
+        return [_format_part(i) for i in self._iter_parts()]
+
     def _iter_parts(self):
         frames = sorted(self)
         parts = (_FrameRangePart(first=i, last=i, increment=1) for i in frames)
@@ -0,0 +1,299 @@
+# -*- coding=UTF-8 -*-
+"""Render metrics in prometheus text format.
+
+Values are updated by render code, set config `METRICS_PORT`
+to serve them on `http://127.0.0.1:<port>/metrics`.
+"""
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+
+import psutil
+from six.moves.BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+from six.moves.socketserver import ThreadingMixIn
+
+LOGGER = logging.getLogger(__name__)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{{{}}}'.format(','.join(
+        '{}="{}"'.format(k, str(v).replace('\\', '\\\\').replace('"', '\\"'))
+        for k, v in labels))
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value))
+
+
+class _Metric(object):
+    type_ = None
+
+    def __init__(self, name, help_):
+        self.name = name
+        self.help = help_
+        self._values = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, **labels):
+        """Current value.  """
+
+        return self._values.get(tuple(sorted(labels.items())), 0)
+
+    def render(self):
+        """Prometheus text lines.  """
+
+        lines = ['# HELP {} {}'.format(self.name, self.help),
+                 '# TYPE {} {}'.format(self.name, self.type_)]
+        with self._lock:
+            items = list(self._values.items())
+        for labels, value in items:
+            lines.append('{}{} {}'.format(
+                self.name, _format_labels(labels), _format_value(value)))
+        return lines
+
+
+class Counter(_Metric):
+    """Value that only increase.  """
+
+    type_ = 'counter'
+
+    def inc(self, value=1, **labels):
+        """Increase value.  """
+
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + value
+
+
+class Gauge(_Metric):
+    """Value that can go up and down.  """
+
+    type_ = 'gauge'
+
+    def set(self, value, **labels):
+        """Set value.  """
+
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = value
+
+
+class Rate(object):
+    """Events count in a sliding time window.
+
+    Args:
+        window (float, optional): Defaults to 60. Window size in seconds.
+    """
+
+    def __init__(self, window=60):
+        self.window = window
+        self._times = deque()
+        self._lock = threading.Lock()
+
+    def mark(self, now=None):
+        """Record a event.  """
+
+        now = time.time() if now is None else now
+        with self._lock:
+            self._times.append(now)
+            self._prune(now)
+
+    def per_minute(self, now=None):
+        """Events per minute in the window.  """
+
+        now = time.time() if now is None else now
+        with self._lock:
+            self._prune(now)
+            return len(self._times) * 60.0 / self.window
+
+    def _prune(self, now):
+        times = self._times
+        while times and times[0] < now - self.window:
+            times.popleft()
+
+
+class Registry(object):
+    """Collection of metrics.  """
+
+    def __init__(self):
+        self._metrics = OrderedDict()
+        self._collectors = []
+
+    def counter(self, name, help_):
+        """Create a counter.  """
+
+        return self._add(Counter(name, help_))
+
+    def gauge(self, name, help_):
+        """Create a gauge.  """
+
+        return self._add(Gauge(name, help_))
+
+    def add_collector(self, func):
+        """Add a function that called before render.  """
+
+        self._collectors.append(func)
+        return func
+
+    def _add(self, metric):
+        assert metric.name not in self._metrics, metric.name
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self):
+        """Prometheus text format.  """
+
+        for i in self._collectors:
+            try:
+                i()
+            except Exception:  # pylint: disable=broad-except
+                LOGGER.warning('Metric collector failed.', exc_info=True)
+        lines = []
+        for i in self._metrics.values():
+            lines.extend(i.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+FRAMES = REGISTRY.counter(
+    'batchrender_frames_total', 'Rendered frames.')
+FRAME_COST = REGISTRY.counter(
+    'batchrender_frame_cost_seconds_total', 'Total rendered frame time.')
+DB_COMMITS = REGISTRY.counter(
+    'batchrender_db_commits_total', 'Database commits.')
+QUEUE_TASKS = REGISTRY.gauge(
+    'batchrender_queue_tasks', 'Tasks in queue by state bit.')
+QUEUE_REMAINS = REGISTRY.gauge(
+    'batchrender_queue_remains_seconds', 'Estimated remaining time of queue.')
+TASK_CACHE = REGISTRY.gauge(
+    'batchrender_task_cache', 'Cached task objects in queue.')
+FRAMES_PER_MINUTE = REGISTRY.gauge(
+    'batchrender_frames_per_minute', 'Rendered frames in last minute.')
+FRAME_COST_AVERAGE = REGISTRY.gauge(
+    'batchrender_frame_cost_average_seconds', 'Average rendered frame time.')
+DB_COMMITS_PER_MINUTE = REGISTRY.gauge(
+    'batchrender_db_commits_per_minute', 'Database commits in last minute.')
+PROCESS_RSS = REGISTRY.gauge(
+    'batchrender_process_resident_memory_bytes',
+    'Resident memory of this process and render processes.')
+PROCESS_CPU = REGISTRY.gauge(
+    'batchrender_process_cpu_percent',
+    'CPU usage of this process and render processes.')
+RENDER_ERRORS = REGISTRY.counter(
+    'batchrender_render_errors_total', 'Failed renders by error class.')
+PREEMPTIONS = REGISTRY.counter(
+    'batchrender_preemptions_total', 'Renders suspended for higher priority.')
+SUSPENDED_TASKS = REGISTRY.gauge(
+    'batchrender_suspended_tasks', 'Suspended render tasks.')
+SUSPENDED_SECONDS = REGISTRY.counter(
+    'batchrender_suspended_seconds_total', 'Total time renders spent suspended.')
+RECYCLES = REGISTRY.counter(
+    'batchrender_recycles_total', 'Render processes restarted by reason.')
+PREFETCH_FILES = REGISTRY.counter(
+    'batchrender_prefetch_files_total', 'Read input files by cache result.')
+PREFETCH_BYTES = REGISTRY.counter(
+    'batchrender_prefetch_bytes_total', 'Read input bytes served from cache.')
+
+FRAME_RATE = Rate()
+DB_COMMIT_RATE = Rate()
+
+
+def on_frame_finished(cost):
+    """Record a rendered frame.  """
+
+    FRAMES.inc()
+    FRAME_COST.inc(cost)
+    FRAME_RATE.mark()
+
+
+def on_db_commit():
+    """Record a database commit.  """
+
+    DB_COMMITS.inc()
+    DB_COMMIT_RATE.mark()
+
+
+_PROCESS = psutil.Process()
+# Pid -> render process, reused to keep cpu percent state between scrapes.
+_CHILDREN = {}
+
+
+def _children():
+    try:
+        processes = _PROCESS.children(recursive=True)
+    except psutil.Error:
+        processes = []
+    alive = set(i.pid for i in processes)
+    for pid in set(_CHILDREN) - alive:
+        _CHILDREN.pop(pid, None)
+    return [_CHILDREN.setdefault(i.pid, i) for i in processes]
+
+
+@REGISTRY.add_collector
+def _collect():
+    FRAMES_PER_MINUTE.set(FRAME_RATE.per_minute())
+    DB_COMMITS_PER_MINUTE.set(DB_COMMIT_RATE.per_minute())
+    frames = FRAMES.get()
+    FRAME_COST_AVERAGE.set(FRAME_COST.get() / frames if frames else 0)
+
+    for role, processes in (('self', [_PROCESS]), ('render', _children())):
+        rss, cpu = 0, 0.0
+        for i in processes:
+            try:
+                rss += i.memory_info().rss
+                cpu += i.cpu_percent(interval=None)
+            except psutil.Error:
+                continue
+        PROCESS_RSS.set(rss, process=role)
+        PROCESS_CPU.set(cpu, process=role)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):  # pylint: disable=invalid-name
+        """Serve metrics.  """
+
+        if self.path.split('?')[0] not in ('/', '/metrics'):
+            self.send_error(404)
+            return
+        body = REGISTRY.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        LOGGER.debug(format, *args)
+
+
+class _Server(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+def serve(port, host='127.0.0.1'):
+    """Serve metrics in a thread.
+
+    Args:
+        port (int): Port to listen.
+        host (str, optional): Defaults to '127.0.0.1'. Address to bind.
+
+    Returns:
+        HTTPServer: Server, call `shutdown` to stop.
+    """
+
+    server = _Server((host, port), _Handler)
+    thread = threading.Thread(target=server.serve_forever, name='metrics')
+    thread.daemon = True
+    thread.start()
+    LOGGER.info('Serving metrics: http://%s:%s/metrics', host, port)
+    return server
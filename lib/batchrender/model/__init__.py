@@ -13,6 +13,9 @@ from .core import (
     ROLE_FRAMES,
     ROLE_FILE,
     ROLE_ERROR_COUNT,
+    ROLE_FILE_HASH,
+    ROLE_RETRY_TIME,
+    ROLE_ERROR_COUNTS,
 
     DOING,
     DISABLED,
@@ -24,3 +27,4 @@ from .directory import DirectoryModel
 from .fileproxy import FilesProxyModel
 from .task import Task
 from .fileoutput import FileOutputModel
+from .watcher import DirectoryWatcher
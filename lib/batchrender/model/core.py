@@ -14,6 +14,9 @@ ROLE_ESTIMATE = Qt.UserRole + 8
 ROLE_FRAMES = Qt.UserRole + 9
 ROLE_FILE = Qt.UserRole + 10
 ROLE_ERROR_COUNT = Qt.UserRole + 11
+ROLE_FILE_HASH = Qt.UserRole + 12
+ROLE_RETRY_TIME = Qt.UserRole + 13
+ROLE_ERROR_COUNTS = Qt.UserRole + 14
 
 
 DOING = 1 << 0
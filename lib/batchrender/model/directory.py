@@ -4,6 +4,8 @@
 from __future__ import (absolute_import, division, print_function,
                         unicode_literals)
 
+import time
+
 import pendulum
 from PySide2.QtCore import QDir, Qt
 from PySide2.QtGui import QBrush, QColor
@@ -33,8 +35,12 @@ class DirectoryModel(UnicodeTrMixin, QFileSystemModel):
              core.ROLE_ESTIMATE,
              core.ROLE_FRAMES,
              core.ROLE_FILE,
-             core.ROLE_ERROR_COUNT)
+             core.ROLE_FILE_HASH,
+             core.ROLE_ERROR_COUNT,
+             core.ROLE_RETRY_TIME,
+             core.ROLE_ERROR_COUNTS)
         }
+        self._file_stats = {}
 
         self.header_roles = (
             self.FileNameRole, core.ROLE_RANGE, core.ROLE_PRIORITY)
@@ -53,6 +59,23 @@ class DirectoryModel(UnicodeTrMixin, QFileSystemModel):
 
         return len(self.header_roles)
 
+    def canFetchMore(self, parent):
+        """Override.  """
+        # pylint: disable=invalid-name,unused-argument
+
+        # Rows are added by `add_file` from directory watcher,
+        # qt directory listing would watch the directory again.
+        return False
+
+    def fetchMore(self, parent):
+        """Override.  """
+        # pylint: disable=invalid-name,unused-argument
+
+    def add_file(self, path):
+        """Add row for a file found by directory watcher.  """
+
+        self.index(path)
+
     def flags(self, index):
         """Override.  """
 
@@ -92,36 +115,51 @@ class DirectoryModel(UnicodeTrMixin, QFileSystemModel):
                      if value is None else value)
             return row_template.format(label, value)
 
-        def _timef(seconds):
-            if seconds is None:
-                return None
-            return pendulum.duration(seconds=seconds).in_words()
-
-        file_record = self.data(index, core.ROLE_FILE)
+        stats = self._file_stats.get(self.data(index, core.ROLE_FILE_HASH))
         state = self.data(index, core.ROLE_STATE)
         remains = self.data(index, core.ROLE_REMAINS)
         estimate = self.data(index, core.ROLE_ESTIMATE)
         label = self.data(index, Qt.DisplayRole)
 
         rows = ['<tr><th colspan=2>{}</th></tr>'.format(label),
-                _row(self.tr('Estimate cost'), _timef(estimate)), ]
-        if file_record:
-            with database.util.session_scope() as sess:
-                file_record = sess.merge(file_record)
-                rows.extend(
-                    [
-                        _row(self.tr('File hash'), file_record.hash),
-                        _row(self.tr('Frame count'), file_record.frame_count),
-                        _row(self.tr('File range'), file_record.range()),
-                        _row(self.tr('Average frame cost'), _timef(
-                            file_record.average_frame_cost())),
-                    ]
-                )
+                _row(self.tr('Estimate cost'), _format_duration(estimate)), ]
+        if stats:
+            rows.extend(
+                [
+                    _row(self.tr('File hash'), stats['hash']),
+                    _row(self.tr('Frame count'), stats['frame_count']),
+                    _row(self.tr('File range'), stats['range']),
+                    _row(self.tr('Average frame cost'),
+                         stats['average_frame_cost']),
+                ]
+            )
         if state & core.DOING and remains:
-            rows.append(_row(self.tr('Remains'), _timef(remains)))
+            rows.append(_row(self.tr('Remains'), _format_duration(remains)))
+        retry_time = self.data(index, core.ROLE_RETRY_TIME)
+        if retry_time and retry_time > time.time():
+            rows.append(_row(self.tr('Retry after'),
+                             _format_duration(retry_time - time.time())))
 
         return '<table>{}</table>'.format(''.join(rows))
 
+    def set_file_stats(self, stats):
+        """Update cached file statistics used by tooltip.
+
+        Args:
+            stats (dict): Data from `database.File.statistics`.
+        """
+
+        stats = dict(stats)
+        stats['average_frame_cost'] = _format_duration(
+            stats['average_frame_cost'])
+        self._file_stats[stats['hash']] = stats
+
+    def update_file_stats(self, file_record):
+        """Refresh cached file statistics from a database record in session.  """
+
+        assert isinstance(file_record, database.File), type(file_record)
+        self.set_file_stats(file_record.statistics())
+
     def _get_check_state_data(self, index):
         if index.column() != 0:
             return None
@@ -182,6 +220,7 @@ class DirectoryModel(UnicodeTrMixin, QFileSystemModel):
             return False
         elif value == Qt.Checked:
             status &= ~core.DISABLED
+            self.setData(index, None, core.ROLE_RETRY_TIME)
             with database.util.session_scope() as sess:
                 file_ = sess.merge(self.data(index, core.ROLE_FILE))
                 if file_.is_rendering():
@@ -209,6 +248,12 @@ class DirectoryModel(UnicodeTrMixin, QFileSystemModel):
         return value
 
 
+def _format_duration(seconds):
+    if seconds is None:
+        return None
+    return pendulum.duration(seconds=seconds).in_words()
+
+
 def _column_default(index, role):
     defaults = {
         core.ROLE_PRIORITY: 0,
@@ -11,13 +11,14 @@ from pathlib import PurePath
 import sqlalchemy
 from PySide2.QtCore import QAbstractListModel, Qt
 from sqlalchemy import desc
+from sqlalchemy.orm import selectinload
 
 from .. import database as db
 from ..codectools import get_unicode as u
 from ..framerange import FrameRange
 from ..mixin import UnicodeTrMixin
 
-Sequence = namedtuple('sequence', ('path', 'timestamp', 'range'))
+Sequence = namedtuple('sequence', ('path', 'timestamp', 'range', 'coverage'))
 
 LOGGER = logging.getLogger(__name__)
 
@@ -34,19 +35,23 @@ class FileOutputModel(UnicodeTrMixin, QAbstractListModel):
         with db.util.session_scope(db.core.Session(expire_on_commit=False)) as sess:
             outputs = sess.query(
                 db.Output
+            ).options(
+                # Outputs of files are used by coverage, load them together.
+                selectinload(db.Output.files).selectinload(db.File.outputs)
             ).order_by(
                 desc(db.Output.timestamp)
             ).limit(500).all()
 
-        outputs_groups = db.output.group_by_pattern(outputs)
-        data = []
-        for k, v in list(outputs_groups.items()):
-            if len(v) == 1:
-                data.append(v[0])
-            else:
-                sequences = Sequence(PurePath(k), max(
-                    i.timestamp for i in v), FrameRange(i.frame for i in v))
-                data.append(sequences)
+            outputs_groups = db.output.group_by_pattern(outputs)
+            data = []
+            for k, v in list(outputs_groups.items()):
+                if len(v) == 1:
+                    data.append(v[0])
+                else:
+                    sequences = Sequence(PurePath(k), max(
+                        i.timestamp for i in v), FrameRange(i.frame for i in v),
+                                         _coverage(k, v))
+                    data.append(sequences)
 
         data.sort(key=lambda x: x.timestamp, reverse=True)
 
@@ -68,12 +73,17 @@ class FileOutputModel(UnicodeTrMixin, QAbstractListModel):
         # column = index.colomn()
         item = self._data[row]
 
+        is_sequence = isinstance(item, Sequence)
         if role == Qt.DisplayRole:
+            if is_sequence and item.coverage is not None and item.coverage < 1:
+                return '{} [{:.0%}]'.format(item.path.name, item.coverage)
             return item.path.name
         elif role == Qt.ToolTipRole:
             rows = [item.timestamp.diff_for_humans(), u(item.path.as_posix())]
-            if isinstance(item, Sequence):
+            if is_sequence:
                 rows.append(self.tr('Range: {}').format(item.range))
+                if item.coverage is not None:
+                    rows.append(self.tr('Coverage: {:.0%}').format(item.coverage))
             return '\n'.join(rows)
         elif role == Qt.EditRole:
             return item
@@ -82,3 +92,26 @@ class FileOutputModel(UnicodeTrMixin, QAbstractListModel):
     def flags(self, _):
         """(Override).  """
         return Qt.ItemIsEnabled
+
+
+def _coverage(pattern, outputs):
+    """Rendered part of related file range for a output sequence.
+
+    Args:
+        pattern (str): Sequence pattern.
+        outputs (list[Output]): Outputs in sequence,
+            files and their outputs loaded.
+
+    Returns:
+        float: Coverage from 0 to 1, None if file range unknown.
+    """
+
+    expected = FrameRange()
+    rendered = FrameRange()
+    for file_ in set(j for i in outputs for j in i.files):
+        expected |= file_.range() or FrameRange()
+        rendered |= FrameRange(
+            i.frame for i in file_.outputs if i.file_pattern() == pattern)
+    if not expected:
+        return None
+    return len(rendered & expected) / len(expected)
@@ -8,13 +8,14 @@ import logging
 import os
 
 from PySide2 import QtCore
-from PySide2.QtCore import QSortFilterProxyModel, Qt
+from PySide2.QtCore import QSortFilterProxyModel, Qt, QTimer
 from six.moves import range
 
 from .. import filetools
 from ..mixin import UnicodeTrMixin
 from . import core
 from .directory import DirectoryModel
+from .watcher import DirectoryWatcher
 
 LOGGER = logging.getLogger(__name__)
 
@@ -28,6 +29,34 @@ class FilesProxyModel(UnicodeTrMixin, QSortFilterProxyModel):
         self.layoutChanged.connect(self._sort)
         self.dataChanged.connect(self._sort)
         self.is_updating = False
+        self.watcher = None
+        self.versions = filetools.VersionIndex()
+
+        # Coalesce filter invalidation from watcher events.
+        timer = QTimer(self)
+        timer.setSingleShot(True)
+        timer.setInterval(0)
+        timer.timeout.connect(self.invalidateFilter)
+        self._invalidate_filter_timer = timer
+
+    def set_watcher(self, watcher):
+        """Only accept files that settled in watcher.  """
+
+        assert isinstance(watcher, DirectoryWatcher), type(watcher)
+        self.watcher = watcher
+        watcher.file_added.connect(self._on_file_added)
+        watcher.file_added.connect(self.versions.add)
+        watcher.file_modified.connect(self.versions.add)
+        watcher.file_removed.connect(self.versions.remove)
+        # Files of previous root are not removed by events.
+        watcher.root_changed.connect(self.versions.clear)
+        watcher.file_added.connect(self._invalidate_filter_timer.start)
+        watcher.file_removed.connect(self._invalidate_filter_timer.start)
+        watcher.root_changed.connect(self._invalidate_filter_timer.start)
+        self._invalidate_filter_timer.start()
+
+    def _on_file_added(self, path):
+        self.sourceModel().add_file(path)
 
     def _sort(self):
         if self.is_updating:
@@ -46,7 +75,9 @@ class FilesProxyModel(UnicodeTrMixin, QSortFilterProxyModel):
         if model.isDir(index):
             return True
         data = model.data(index, model.FileNameRole)
-        return data.endswith('.nk')
+        if not data.endswith('.nk'):
+            return False
+        return self.watcher is None or model.filePath(index) in self.watcher
 
     def lessThan(self, left, right):
         """Override.  """
@@ -131,8 +162,11 @@ class FilesProxyModel(UnicodeTrMixin, QSortFilterProxyModel):
     def old_version_files(self):
         """Files that has a lower version number.  """
 
+        if self.watcher is not None:
+            return iter(sorted(self.versions.outdated))
         files = list(self.file_path(i) for i in self.iter())
-        return (i for i in files if i not in filetools.version_filter(files))
+        latest = set(filetools.version_filter(files))
+        return (i for i in files if i not in latest)
 
 
 def _get_sort_key(model, index):
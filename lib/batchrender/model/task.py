@@ -8,10 +8,11 @@ import logging
 import os
 
 import six
-from PySide2.QtCore import QObject, Qt
+from PySide2.QtCore import Qt
 
 from .. import database
 from ..codectools import get_encoded as e
+from ..framerange import FrameRange
 from . import core
 from .directory import DirectoryModel
 
@@ -29,8 +30,12 @@ def _map_model_data(role, docstring=None):
 
 
 @six.python_2_unicode_compatible
-class Task(QObject):
-    """Task data.  """
+class Task(object):
+    """Task data.
+
+    Lightweight record that only maps data from the directory model,
+    render objects are created from it when actually started.
+    """
 
     state = _map_model_data(core.ROLE_STATE, 'Task state.')
     range = _map_model_data(core.ROLE_RANGE, 'Render range.')
@@ -45,6 +50,11 @@ class Task(QObject):
     _estimate = _map_model_data(
         core.ROLE_ESTIMATE, 'Estimate time to render.')
     file = _map_model_data(core.ROLE_FILE, 'Database file object.')
+    file_hash = _map_model_data(core.ROLE_FILE_HASH, 'Database file hash.')
+    retry_time = _map_model_data(
+        core.ROLE_RETRY_TIME, 'Time that failed task can retry.')
+    error_counts = _map_model_data(
+        core.ROLE_ERROR_COUNTS, 'Error count by error class, None if no error.')
 
     def __init__(self, index, dir_model):
         assert isinstance(dir_model, DirectoryModel), type(dir_model)
@@ -56,7 +66,6 @@ class Task(QObject):
         self.proc = None
         self.start_time = None
         super(Task, self).__init__()
-        self.remains_changed.connect(self.on_changed)
 
     def __eq__(self, other):
         if isinstance(other, Task):
@@ -71,7 +80,8 @@ class Task(QObject):
         """Estimate time to render.  """
 
         ret = self._estimate
-        if not ret:
+        # Zero is a valid result for files without frame cost records.
+        if ret is None:
             with database.util.session_scope() as sess:
                 ret = self._update_estimate(sess)
         return ret
@@ -90,13 +100,14 @@ class Task(QObject):
         session.flush()
         session.refresh(record)
         self.file = record
+        self.file_hash = record.hash
         self._update_range()
 
     def _update_range(self):
         if not self.range:
             self.range = self.file.range()
-        if self.file.has_sequence():
-            remains = self.range - self.file.rendered_frames()
+        if self.range and self.file.has_sequence():
+            remains = FrameRange(self.range - self.file.rendered_frames())
             self.range = remains or self.range
 
     def _update_estimate(self, session):
@@ -105,9 +116,12 @@ class Task(QObject):
         old = self._estimate
         self._estimate = ret
         if old != ret:
-            self.changed.emit()
+            self.on_estimate_changed()
         return ret
 
+    def on_estimate_changed(self):
+        """Called when estimate changed.  """
+
     def _set_state(self, state, value):
         if value:
             self.state |= state
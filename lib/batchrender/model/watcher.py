@@ -0,0 +1,84 @@
+# -*- coding=UTF-8 -*-
+"""Qt signals for directory watcher.  """
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import logging
+import os
+from functools import partial
+
+import six
+from PySide2.QtCore import QObject, Signal
+
+from .. import watcher
+from ..codectools import get_unicode as u
+
+LOGGER = logging.getLogger(__name__)
+
+
+class DirectoryWatcher(QObject):
+    """Emit file events from watcher thread in main thread.  """
+
+    file_added = Signal(six.text_type, float)
+    file_modified = Signal(six.text_type, float)
+    file_removed = Signal(six.text_type)
+    root_changed = Signal(six.text_type)
+
+    def __init__(self, parent=None):
+        super(DirectoryWatcher, self).__init__(parent)
+        self._watcher = None
+        self._token = None
+
+    def __contains__(self, path):
+        return self._watcher is None or path in self._watcher
+
+    @property
+    def root(self):
+        """Current watching directory.  """
+
+        return self._watcher.root if self._watcher else None
+
+    def set_root(self, path):
+        """Start watching another directory.
+
+        Directory is scanned in watcher thread, files are added by events.
+        """
+
+        path = os.path.normpath(u(path))
+        if path == self.root:
+            return
+        self.stop()
+        self.root_changed.emit(path)
+        if not os.path.isdir(path):
+            return
+        self._token = token = object()
+        callback = partial(self._on_event, token)
+        try:
+            self._watcher = watcher.create(path, callback)
+            self._watcher.start()
+        except OSError:
+            LOGGER.warning(
+                'Can not use inotify, fallback to polling: %s', path, exc_info=True)
+            self._watcher = watcher.PollingWatcher(path, callback)
+            self._watcher.start()
+        LOGGER.debug('Watching: %s', self._watcher)
+
+    def stop(self):
+        """Stop watching, old watcher thread exits in background.  """
+
+        self._token = None
+        if self._watcher is not None:
+            self._watcher.stop(wait=False)
+            self._watcher = None
+
+    def _on_event(self, token, event):
+        if token is not self._token:
+            # From stopped watcher.
+            return
+        if event.type == watcher.ADDED:
+            self.file_added.emit(event.path, event.mtime)
+        elif event.type == watcher.MODIFIED:
+            self.file_modified.emit(event.path, event.mtime)
+        elif event.type == watcher.REMOVED:
+            self.file_removed.emit(event.path)
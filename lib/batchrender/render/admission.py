@@ -0,0 +1,158 @@
+# -*- coding=UTF-8 -*-
+"""Memory aware admission control for concurrent renders.  """
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import logging
+
+import psutil
+
+from .. import database, script
+from ..config import CONFIG
+from .resource import process_tree_rss
+
+LOGGER = logging.getLogger(__name__)
+
+# Memory of a nuke process without any image loaded.
+BASE_MEMORY = 2 ** 29
+# Float RGBA pixel.
+BYTES_PER_PIXEL = 16
+
+
+def estimate(path):
+    """Estimate peak memory of a never rendered script.
+
+    Every Read and Write node holds a full frame of root format,
+    other nodes count as one frame per ten nodes for their line caches.
+
+    Args:
+        path (str): Script path.
+
+    Returns:
+        int: Memory in bytes, None if script has no root format.
+    """
+
+    try:
+        parsed = script.parse(path)
+    except (IOError, OSError):
+        return None
+    size = parsed.resolution()
+    if not size:
+        return None
+    frames = (len(parsed.reads()) + len(parsed.writes())
+              + len(parsed.nodes) // 10)
+    return BASE_MEMORY + size[0] * size[1] * BYTES_PER_PIXEL * max(frames, 1)
+
+
+class AdmissionController(object):
+    """Decide which tasks start now.
+
+    Tasks are packed in queue order while predicted peak memory fits
+    available memory minus config `MEMORY_HEADROOM` (GB).
+    A task that does not fit is skipped so smaller tasks can run,
+    after skipped `max_skip` times, no task behind it starts until it fits.
+    First task always starts when nothing is rendering.
+    """
+
+    max_skip = 3
+
+    def __init__(self):
+        self._predictions = {}
+        self._skipped = {}
+
+    def predict(self, file_hash, path=None):
+        """Predicted peak memory of a file.
+
+        Use recorded peak of the file, then estimate from script content,
+        then largest recorded peak of all files.
+
+        Args:
+            file_hash (str): File hash, can be None.
+            path (str, optional): Defaults to None. Script path for estimate.
+
+        Returns:
+            int: Memory in bytes.
+        """
+
+        if file_hash in self._predictions:
+            return self._predictions[file_hash]
+
+        ret = None
+        if file_hash:
+            with database.util.session_scope() as sess:
+                ret = database.Resource.summary(
+                    sess, file_hash=file_hash)['rss_peak']
+        if ret is None and path:
+            ret = estimate(path)
+        if ret is None:
+            # Unknown file, assume as large as largest recorded.
+            with database.util.session_scope() as sess:
+                ret = database.Resource.summary(sess)['rss_peak']
+        if ret is None:
+            ret = int((CONFIG['MEMORY_LIMIT'] * 2 ** 30)
+                      or psutil.virtual_memory().total / 4)
+        if file_hash:
+            self._predictions[file_hash] = ret
+        return ret
+
+    def invalidate(self, file_hash):
+        """Drop cached prediction after new record.  """
+
+        self._predictions.pop(file_hash, None)
+
+    def budget(self, running):
+        """Memory can be used by new tasks.
+
+        Args:
+            running (list[NukeTask]): Rendering tasks.
+
+        Returns:
+            int: Memory in bytes.
+        """
+
+        ret = (psutil.virtual_memory().available
+               - CONFIG['MEMORY_HEADROOM'] * 2 ** 30)
+        for i in running:
+            # Memory that running task will still take.
+            proc = i.proc
+            used = process_tree_rss(proc.pid) if proc else 0
+            ret -= max(self.predict(i.file_hash, i.path) - used, 0)
+        return ret
+
+    def select(self, candidates, running, slots):
+        """Select tasks to start.
+
+        Args:
+            candidates (Iterable[Task]): Startable tasks in queue order.
+            running (list[NukeTask]): Rendering tasks.
+            slots (int): Free render slots.
+
+        Returns:
+            list[Task]: Tasks to start.
+        """
+
+        if slots <= 0:
+            return []
+        budget = self.budget(running)
+        ret = []
+        for i in candidates:
+            need = self.predict(i.file_hash, i.path)
+            if need <= budget or not (running or ret):
+                ret.append(i)
+                budget -= need
+                self._skipped.pop(i.path, None)
+                LOGGER.debug('Admit: %s, predicted: %.2fGB',
+                             i.path, need / 2.0 ** 30)
+                if len(ret) >= slots:
+                    break
+                continue
+
+            skipped = self._skipped.get(i.path, 0) + 1
+            self._skipped[i.path] = skipped
+            LOGGER.debug('Skip: %s, predicted: %.2fGB, budget: %.2fGB',
+                         i.path, need / 2.0 ** 30, budget / 2.0 ** 30)
+            if skipped > self.max_skip:
+                # Wait running tasks to release memory for it.
+                break
+        return ret
@@ -0,0 +1,148 @@
+# -*- coding=UTF-8 -*-
+"""Render many small scripts in one nuke session.
+
+With config `BATCH_COST` > 0, tasks estimated to finish within
+`BATCH_COST` seconds are grouped, at most `BATCH_SIZE` tasks a group.
+A group is rendered by `nuke -t` with a generated driver script,
+that opens each script in turn and prints marker lines around it:
+
+    [batchrender] BEGIN 0
+    Frame 1 (1 of 1)
+    [batchrender] END 0 0
+
+Output between markers belongs to that script,
+an error in one script only fails that script.
+"""
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import json
+import logging
+import re
+import time
+
+from PySide2.QtCore import Signal
+
+from .proc_handler import NukeHandler, parse_output
+
+LOGGER = logging.getLogger(__name__)
+
+MARKER = '[batchrender]'
+
+_DRIVER = '''# -*- coding=UTF-8 -*-
+"""Generated by batchrender, render scripts in turn.  """
+from __future__ import print_function
+
+import json
+import sys
+import traceback
+
+import nuke
+
+ENTRIES = json.loads({entries!r})
+PROXY = {proxy!r}
+CONTINUE = {continue_!r}
+WRITE_CLASSES = ('Write', 'DeepWrite', 'WriteGeo')
+
+
+def render(path, frames):
+    nuke.scriptOpen(path)
+    root = nuke.root()
+    root['proxy'].setValue(PROXY)
+    if not frames:
+        frames = list(range(int(root['first_frame'].value()),
+                            int(root['last_frame'].value()) + 1))
+    writes = [i for i in nuke.allNodes(recurseGroups=True)
+              if i.Class() in WRITE_CLASSES and not i['disable'].value()]
+    if not writes:
+        raise RuntimeError('No enabled write node.')
+    for current, frame in enumerate(frames, 1):
+        nuke.executeMultiple(writes, [(frame, frame, 1)],
+                             continueOnError=CONTINUE)
+        print('Frame {{}} ({{}} of {{}})'.format(frame, current, len(frames)))
+        sys.stdout.flush()
+
+
+for index, entry in enumerate(ENTRIES):
+    print('{marker} BEGIN {{}}'.format(index))
+    sys.stdout.flush()
+    retcode = 0
+    try:
+        render(entry['path'], entry['frames'])
+    except Exception:  # pylint: disable=broad-except
+        traceback.print_exc(file=sys.stdout)
+        retcode = 1
+    try:
+        nuke.scriptClear()
+    except Exception:  # pylint: disable=broad-except
+        traceback.print_exc(file=sys.stdout)
+    print('{marker} END {{}} {{}}'.format(index, retcode))
+    sys.stdout.flush()
+'''
+
+
+def driver_script(entries, proxy=False, continue_=False):
+    """Driver script content for `nuke -t`.
+
+    Args:
+        entries (list[tuple]): (script path, frames) pairs,
+            frames can be None for script root range.
+        proxy (bool, optional): Defaults to False. Render in proxy mode.
+        continue_ (bool, optional): Defaults to False.
+            Continue frame render on error.
+
+    Returns:
+        str: Python source code.
+    """
+
+    return _DRIVER.format(
+        entries=json.dumps([dict(path=path,
+                                 frames=sorted(frames) if frames else None)
+                            for path, frames in entries]),
+        proxy=bool(proxy),
+        continue_=bool(continue_),
+        marker=MARKER)
+
+
+class BatchHandler(NukeHandler):
+    """Process output handler for batch driver.
+
+    Frame and output payloads have key `entry` for script index.
+
+    Args:
+        proc (Popen): Driver process.
+        classifiers (list[failure.Classifier]): Classifier for each script.
+    """
+
+    entry_started = Signal(int)
+    entry_finished = Signal(int, int)
+
+    def __init__(self, proc, classifiers):
+        super(BatchHandler, self).__init__(proc)
+        self.classifiers = classifiers
+
+    def parse_stdout(self, text, **context):
+        payload = parse_output(text)
+        if payload:
+            payload['frame'] = context.get('frame')
+            payload['entry'] = context.get('entry')
+            self.output_updated.emit(payload)
+
+    def _match_frame_finish(self, line, context, **data):
+        match = re.match(r'{} (BEGIN|END) (\d+)(?: (-?\d+))?'.format(
+            re.escape(MARKER)), line)
+        if match:
+            index = int(match.group(2))
+            if match.group(1) == 'BEGIN':
+                context['entry'] = index
+                context['last_frame_time'] = time.perf_counter()
+                self.classifier = self.classifiers[index]
+                self.entry_started.emit(index)
+            else:
+                self.entry_finished.emit(index, int(match.group(3) or 0))
+            # Marker also ends output lines of previous frame.
+            return True
+        data['entry'] = context.get('entry')
+        return super(BatchHandler, self)._match_frame_finish(
+            line, context, **data)
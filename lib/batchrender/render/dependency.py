@@ -0,0 +1,216 @@
+# -*- coding=UTF-8 -*-
+"""Dependencies between scripts in queue.
+
+A script depends on another when one of its Read nodes reads
+a sequence written by Write node of the other, with config
+`INFER_DEPENDENCIES` enabled. Dependencies can also be declared by config
+`DEPENDENCIES`, that maps script file name pattern to upstream patterns,
+e.g. `{"comp_*.nk": ["precomp_*.nk"]}`.
+
+Only checked and unfinished upstream tasks hold a task.
+Frames are released as soon as upstream journal confirms them,
+so a comp can start with first frames while its precomp is still rendering.
+Declared dependency without matched sequence holds whole task
+until upstream finished.
+"""
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import fnmatch
+import logging
+import os
+import re
+
+import six
+
+from .. import script
+from ..config import CONFIG
+from ..framerange import FrameRange
+
+LOGGER = logging.getLogger(__name__)
+
+
+def is_enabled():
+    """Whether any dependency can exist.  """
+
+    return bool(CONFIG['INFER_DEPENDENCIES'] or CONFIG['DEPENDENCIES'])
+
+
+def pattern_key(path, cwd):
+    """Comparable key of a sequence path.
+
+    >>> pattern_key('a/b.####.exr', '/tmp') == pattern_key('/tmp/a/b.%04d.exr', '/')
+    True
+    >>> pattern_key('b.#.exr', '/tmp') == pattern_key('/tmp/b.%d.exr', '/')
+    True
+
+    Args:
+        path (str): File path, can be relative.
+        cwd (str): Directory relative path based on.
+
+    Returns:
+        str: Normalized path with frame number as `%0Nd`.
+    """
+
+    path = os.path.normcase(os.path.abspath(os.path.join(cwd, path)))
+
+    def _repl(match):
+        value = match.group(0)
+        width = len(value) if value.startswith('#') else int(match.group(1) or 1)
+        return '%0{}d'.format(width) if width > 1 else '%d'
+
+    return re.sub(r'%0?(\d*)d|#+', _repl, path.replace('\\', '/'))
+
+
+class Graph(object):
+    """Dependency graph of scripts.
+
+    Keys are normalized script paths, see `batchrender.render.queue._file_key`.
+    """
+
+    def __init__(self):
+        self._upstreams = {}
+
+    def add(self, key, upstream, pattern=None):
+        """Add a dependency.
+
+        Args:
+            key (str): Downstream script.
+            upstream (str): Upstream script.
+            pattern (str, optional): Defaults to None.
+                Sequence pattern that links them, None for declared.
+        """
+
+        if key == upstream:
+            return
+        patterns = self._upstreams.setdefault(key, {}).setdefault(upstream, set())
+        if pattern:
+            patterns.add(pattern)
+
+    def remove(self, key, upstream):
+        """Remove a dependency.  """
+
+        self._upstreams.get(key, {}).pop(upstream, None)
+
+    def upstreams(self, key):
+        """Upstreams of a script.
+
+        Returns:
+            dict: Upstream key to sequence patterns they linked by.
+        """
+
+        return self._upstreams.get(key, {})
+
+    def __len__(self):
+        return sum(len(i) for i in self._upstreams.values())
+
+    @classmethod
+    def build(cls, paths, cwd=None, declared=None, infer=None):
+        """Build graph from scripts.
+
+        Args:
+            paths (Iterable[str]): Script keys.
+            cwd (str, optional): Defaults to config `DIR`.
+                Directory relative paths in scripts based on.
+            declared (dict, optional): Defaults to config `DEPENDENCIES`.
+            infer (bool, optional): Defaults to config `INFER_DEPENDENCIES`.
+
+        Returns:
+            Graph: Dependency graph without cycle.
+        """
+
+        cwd = CONFIG['DIR'] if cwd is None else cwd
+        declared = CONFIG['DEPENDENCIES'] if declared is None else declared
+        infer = CONFIG['INFER_DEPENDENCIES'] if infer is None else infer
+        paths = sorted(paths)
+        ret = cls()
+
+        for pattern, upstream_patterns in declared.items():
+            if isinstance(upstream_patterns, six.string_types):
+                upstream_patterns = [upstream_patterns]
+            for key in _match(paths, pattern):
+                for i in upstream_patterns:
+                    for upstream in _match(paths, i):
+                        ret.add(key, upstream)
+
+        if infer:
+            writers = {}
+            reads = {}
+            for key in paths:
+                try:
+                    parsed = script.parse(key)
+                except (IOError, OSError):
+                    LOGGER.debug('Can not parse script: %s', key, exc_info=True)
+                    continue
+                for node in parsed.writes():
+                    if node.file:
+                        writers.setdefault(
+                            pattern_key(node.file, cwd), set()).add(key)
+                reads[key] = [pattern_key(i.file, cwd)
+                              for i in parsed.reads() if i.file]
+            for key, patterns in reads.items():
+                for pattern in patterns:
+                    for upstream in writers.get(pattern, ()):
+                        ret.add(key, upstream, pattern)
+
+        ret.break_cycles()
+        return ret
+
+    def break_cycles(self):
+        """Remove dependencies that make cycle.
+
+        Returns:
+            list[tuple]: Removed (downstream, upstream) pairs.
+        """
+
+        removed = []
+        done = set()
+
+        def _visit(key, stack):
+            stack.append(key)
+            for upstream in sorted(self.upstreams(key)):
+                if upstream in stack:
+                    LOGGER.warning('Ignore cyclic dependency: %s -> %s',
+                                   key, upstream)
+                    removed.append((key, upstream))
+                    self.remove(key, upstream)
+                elif upstream not in done:
+                    _visit(upstream, stack)
+            stack.pop()
+            done.add(key)
+
+        for key in sorted(self._upstreams):
+            if key not in done:
+                _visit(key, [])
+        return removed
+
+    def released(self, key, confirmed):
+        """Frames that upstreams allow to render.
+
+        Args:
+            key (str): Script key.
+            confirmed (Callable): Get confirmed frames of a upstream key,
+                returns None when upstream is not holding (finished or not queued).
+
+        Returns:
+            FrameRange: Released frames, None if not held by any upstream.
+        """
+
+        ret = None
+        for upstream, patterns in self.upstreams(key).items():
+            frames = confirmed(upstream)
+            if frames is None:
+                continue
+            if not patterns:
+                # Declared dependency, wait for whole upstream.
+                frames = FrameRange()
+            ret = FrameRange(frames if ret is None else ret & frames)
+        return ret
+
+
+def _match(paths, pattern):
+    pattern = os.path.normcase(pattern)
+    return [i for i in paths
+            if fnmatch.fnmatch(os.path.basename(i), pattern)
+            or fnmatch.fnmatch(i, pattern)]
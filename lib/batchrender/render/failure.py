@@ -0,0 +1,159 @@
+# -*- coding=UTF-8 -*-
+"""Render failure classification and retry policy.
+
+Render output is matched against known error messages while streaming,
+failed render is sorted into one of:
+
+    permanent: Script problem that retry will not fix, disabled at once.
+    transient: Environment problem like licence or network,
+        retried with exponential backoff.
+    timeout: Aborted by render time out.
+    crash: Process exited abnormally without a known message,
+        retried with backoff.
+"""
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import logging
+import re
+from collections import OrderedDict, namedtuple
+
+from ..config import CONFIG
+
+LOGGER = logging.getLogger(__name__)
+
+PERMANENT = 'permanent'
+TRANSIENT = 'transient'
+TIMEOUT = 'timeout'
+CRASH = 'crash'
+
+LABELS = OrderedDict((
+    (PERMANENT, '永久错误'),
+    (TRANSIENT, '临时错误'),
+    (TIMEOUT, '超时'),
+    (CRASH, '崩溃'),
+))
+
+# Checked in order, first match wins for a line.
+PATTERNS = [(re.compile(k), v) for k, v in (
+    (r'There are no active Write operators', PERMANENT),
+    (r'Read error: No such file or directory', PERMANENT),
+    (r"Can't read .+?: (?:No such file or directory|Permission denied)",
+     PERMANENT),
+    (r'Error reading LUT file', PERMANENT),
+    (r'Unknown command', PERMANENT),
+    (r'No enabled write node', PERMANENT),
+    (r'(?i)(?:(?:unable|failed) to (?:get|obtain|check ?out)(?: an?)?'
+     r'|cannot find a valid|no valid|no available) licen[cs]es?', TRANSIENT),
+    (r'(?i)licen[cs]e (?:checkout |check out |request )?(?:failed|error|expired)',
+     TRANSIENT),
+    (r'(?i)(?:FLEXnet|FLEXlm|RLM) (?:licen[cs]ing )?error', TRANSIENT),
+    (r'Early end of file', TRANSIENT),
+    (r'Scan line .+? is missing', TRANSIENT),
+    (r'(?i)out of memory|bad_alloc', TRANSIENT),
+    (r'(?i)connection (?:refused|reset|timed out)'
+     r'|network is (?:unreachable|down)|no route to host', TRANSIENT),
+    (r'(?i)segmentation fault|access violation|core dumped', CRASH),
+)]
+
+Policy = namedtuple('Policy', ('max_retry', 'backoff'))
+
+POLICIES = {
+    PERMANENT: Policy(max_retry=0, backoff=False),
+    TRANSIENT: Policy(max_retry=5, backoff=True),
+    TIMEOUT: Policy(max_retry=2, backoff=False),
+    CRASH: Policy(max_retry=2, backoff=True),
+}
+
+MAX_BACKOFF = 3600
+
+
+def match(line):
+    """Error class of a output line.
+
+    >>> match('Write1: There are no active Write operators in this script.')
+    'permanent'
+    >>> match('Frame 1 (1 of 10)') is None
+    True
+
+    Args:
+        line (str): Render output line.
+
+    Returns:
+        str: Error class, None if not a known error.
+    """
+
+    for pattern, error_class in PATTERNS:
+        if pattern.search(line):
+            return error_class
+    return None
+
+
+def backoff(error_class, count):
+    """Seconds to wait before next retry.
+
+    Args:
+        error_class (str): Error class.
+        count (int): Failure count of this class, starts from 1.
+
+    Returns:
+        float: Delay in seconds.
+    """
+
+    if not POLICIES[error_class].backoff or count < 1:
+        return 0.0
+    return float(min(CONFIG['RETRY_BACKOFF'] * 2 ** (count - 1), MAX_BACKOFF))
+
+
+class Classifier(object):
+    """Collect error messages from render output.  """
+
+    def __init__(self):
+        self.matches = OrderedDict()
+
+    def feed(self, line):
+        """Check a output line, called from output handler threads.
+
+        Args:
+            line (str): Render output line.
+
+        Returns:
+            str: Error class, None if not a known error.
+        """
+
+        ret = match(line)
+        if ret and ret not in self.matches:
+            LOGGER.debug('Error line(%s): %s', ret, line)
+            self.matches[ret] = line.strip()
+        return ret
+
+    def classify(self, retcode, is_time_out=False):
+        """Error class of a failed render.
+
+        Args:
+            retcode (int): Process exit code.
+            is_time_out (bool, optional): Defaults to False.
+                Whether process is aborted by time out.
+
+        Returns:
+            str: Error class.
+        """
+
+        if is_time_out:
+            return TIMEOUT
+        for i in (PERMANENT, TRANSIENT, CRASH):
+            if i in self.matches:
+                return i
+        LOGGER.debug('Unknown error, retcode: %s', retcode)
+        return CRASH
+
+    def add(self, error_class, message):
+        """Record a error found outside render output.  """
+
+        self.matches.setdefault(error_class, message)
+
+    def message(self, error_class):
+        """First matched line of a error class.  """
+
+        return self.matches.get(error_class)
@@ -0,0 +1,381 @@
+# -*- coding=UTF-8 -*-
+"""Durable per frame completion record.
+
+Every written output is appended to a journal file and synced to disk
+in a background writer, entries queued together share one sync.
+A frame counts as completed only when its outputs still exist on disk.
+So frames rendered before a crash are skipped on next render,
+even if they did not reach the database.
+Completed frames are cached for each journal and updated by new entries,
+outputs are checked on disk again only when refreshed.
+
+Rebuild journal from output files on disk:
+    python -m batchrender.render.journal script.nk
+    python -m batchrender.render.journal script.nk --pattern "out/shot.%04d.exr"
+"""
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import argparse
+import io
+import json
+import logging
+import os
+import re
+import threading
+import time
+
+import six
+from six.moves import queue
+
+from .. import database, script
+from ..codectools import get_unicode as u
+from ..config import CONFIG
+from ..framerange import FrameRange
+
+LOGGER = logging.getLogger(__name__)
+
+
+class Writer(object):
+    """Background journal writer shared by all journals.  """
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def put(self, path, line):
+        """Append a line to journal file.
+
+        Args:
+            path (str): Journal file path.
+            line (str): Line content, None to remove the file.
+        """
+
+        self._queue.put((path, line))
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            thread = threading.Thread(target=self._run, name='journal-writer')
+            thread.daemon = True
+            thread.start()
+            self._thread = thread
+
+    def join(self):
+        """Wait queued lines written.  """
+
+        self._queue.join()
+
+    def _run(self):
+        while True:
+            jobs = [self._queue.get()]
+            while True:
+                try:
+                    jobs.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._write(jobs)
+            except Exception:  # pylint: disable=broad-except
+                LOGGER.error('Write journal failed.', exc_info=True)
+            finally:
+                for _ in jobs:
+                    self._queue.task_done()
+
+    @staticmethod
+    def _write(jobs):
+        lines = {}
+        for path, line in jobs:
+            if line is None:
+                lines.pop(path, None)
+                _try_remove(path)
+                continue
+            lines.setdefault(path, []).append(line)
+        for path, i in lines.items():
+            try:
+                os.makedirs(os.path.dirname(path))
+            except OSError:
+                pass
+            with io.open(path, 'a', encoding='utf-8') as f:
+                f.write(''.join(i))
+                f.flush()
+                os.fsync(f.fileno())
+
+
+_WRITER = []
+
+
+def writer():
+    """Shared writer.  """
+
+    if not _WRITER:
+        _WRITER.append(Writer())
+    return _WRITER[0]
+
+
+def flush():
+    """Wait all queued journal entries written.  """
+
+    if _WRITER:
+        _WRITER[0].join()
+
+
+# Journal path -> {frame: whether all outputs exist}.
+_STATES = {}
+_STATES_LOCK = threading.Lock()
+
+
+class FrameJournal(object):
+    """Append only output record of a file.
+
+    Args:
+        path (str): Journal file path.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    @classmethod
+    def for_file(cls, file_record, dirname='render'):
+        """Journal for a file record.
+
+        Args:
+            file_record (database.File): File record.
+            dirname (str, optional): Defaults to 'render'.
+                Directory name in render directory.
+
+        Returns:
+            FrameJournal: Journal object.
+        """
+
+        return cls(os.path.join(CONFIG['DIR'], dirname,
+                                file_record.filename_with_hash() + '.journal'))
+
+    def add(self, frame, path):
+        """Record a written output, ignored when output not on disk.
+
+        Args:
+            frame (int): Frame number.
+            path (str): Output file path.
+
+        Returns:
+            bool: Whether recorded.
+        """
+
+        line = _line(frame, path)
+        if line is None:
+            return False
+        writer().put(self.path, line)
+        with _STATES_LOCK:
+            states = _STATES.get(self.path)
+            if states is not None:
+                states[frame] = states.get(frame, True)
+        return True
+
+    def entries(self):
+        """Recorded outputs, wait queued entries written first.
+
+        Returns:
+            list[dict]: Entries with `frame`, `path`, `size`, `timestamp`.
+        """
+
+        flush()
+        ret = []
+        try:
+            with io.open(self.path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        ret.append(json.loads(line))
+                    except ValueError:
+                        # Broken last line when crashed during write.
+                        LOGGER.debug('Skip broken journal line: %r', line)
+        except (IOError, OSError):
+            pass
+        return ret
+
+    def completed(self, refresh=False):
+        """Frames that all recorded outputs exists on disk.
+
+        Args:
+            refresh (bool, optional): Defaults to False.
+                Check outputs on disk again instead of using cached result.
+
+        Returns:
+            FrameRange: Completed frames.
+        """
+
+        with _STATES_LOCK:
+            states = _STATES.get(self.path)
+            if states is not None and not refresh:
+                return FrameRange(k for k, v in states.items() if v)
+
+        states = {}
+        for i in self.entries():
+            frame = i['frame']
+            try:
+                is_exists = os.path.getsize(i['path']) > 0
+            except OSError:
+                is_exists = False
+            states[frame] = states.get(frame, True) and is_exists
+        with _STATES_LOCK:
+            _STATES[self.path] = states
+        return FrameRange(k for k, v in states.items() if v)
+
+    def rebuild(self, outputs):
+        """Replace journal content.
+
+        Args:
+            outputs (Iterable[tuple]): (frame, path) pairs.
+
+        Returns:
+            FrameRange: Completed frames.
+        """
+
+        flush()
+        lines = [_line(frame, path) for frame, path in outputs]
+        tmp_path = self.path + '.tmp'
+        try:
+            os.makedirs(os.path.dirname(self.path))
+        except OSError:
+            pass
+        with io.open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(''.join(i for i in lines if i))
+            f.flush()
+            os.fsync(f.fileno())
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        os.rename(tmp_path, self.path)
+        return self.completed(refresh=True)
+
+    def remove(self):
+        """Remove journal file.  """
+
+        writer().put(self.path, None)
+        with _STATES_LOCK:
+            _STATES[self.path] = {}
+
+
+def _line(frame, path):
+    try:
+        size = os.path.getsize(path)
+    except OSError:
+        return None
+    if not size:
+        return None
+    entry = dict(frame=frame, path=u(path), size=size, timestamp=time.time())
+    return six.text_type(json.dumps(entry)) + '\n'
+
+
+def _try_remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def is_resumable(path):
+    """Whether a script can render remaining frames only.
+
+    Container outputs like mov are written from first frame,
+    partial render would replace the whole file.
+
+    Args:
+        path (str): Script path.
+
+    Returns:
+        bool: True if all Write nodes output frame sequence.
+    """
+
+    try:
+        writes = script.parse(path).writes()
+    except (IOError, OSError):
+        return True
+    return all(re.search(r'%0?\d*d|#', i.file)
+               for i in writes if i.file)
+
+
+def scan(pattern):
+    """Scan output files on disk for a sequence pattern.
+
+    Args:
+        pattern (str): Sequence pattern like `shot.%04d.exr` or `shot.####.exr`.
+
+    Returns:
+        list[tuple]: (frame, path) pairs of not empty files.
+    """
+
+    pattern = u(pattern).replace('\\', '/')
+    dirname, basename = os.path.split(pattern)
+
+    def _repl(match):
+        value = match.group(0)
+        if value.startswith('#'):
+            return r'(-?\d{{{},}})'.format(len(value))
+        digits = match.group(1)
+        return r'(-?\d{{{},}})'.format(int(digits) if digits else 1)
+
+    regex = re.compile('^{}$'.format(re.sub(
+        r'%0?(\d*)d|#+',
+        _repl,
+        re.sub(r'([.^$*+?{}\[\]\\|()])', r'\\\1', basename))))
+    ret = []
+    try:
+        names = os.listdir(dirname or '.')
+    except OSError:
+        return ret
+    for name in names:
+        match = regex.match(name)
+        if not match:
+            continue
+        path = os.path.join(dirname, name)
+        try:
+            if not os.path.getsize(path):
+                continue
+        except OSError:
+            continue
+        ret.append((int(match.group(1)), path))
+    ret.sort()
+    return ret
+
+
+def rebuild(path, patterns=None):
+    """Rebuild journal of a script from output files on disk.
+
+    Args:
+        path (str): Script path.
+        patterns (list[str], optional): Defaults to None.
+            Output sequence patterns, from database when not given.
+
+    Returns:
+        FrameRange: Completed frames.
+    """
+
+    with database.util.session_scope() as sess:
+        record = sess.merge(database.File.from_path(path))
+        sess.flush()
+        if not patterns:
+            patterns = database.output.get_sequence_pattern(
+                sess.query(database.Output).filter(
+                    database.Output.files.contains(record)).all())
+        journal = FrameJournal.for_file(record)
+    outputs = [j for i in patterns for j in scan(i)]
+    ret = journal.rebuild(outputs)
+    LOGGER.info('Rebuilt journal %s from %d outputs of %s: %s',
+                journal.path, len(outputs), patterns, ret)
+    return ret
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Rebuild completed frames of a script from output files.')
+    parser.add_argument('path', help='Nuke script path.')
+    parser.add_argument('--pattern', action='append',
+                        help='Output sequence pattern, can be repeated.')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    print(rebuild(args.path, args.pattern))
+
+
+if __name__ == '__main__':
+    main()
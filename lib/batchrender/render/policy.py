@@ -0,0 +1,175 @@
+# -*- coding=UTF-8 -*-
+"""Scheduling policies for queue order.
+
+Config `SCHEDULE_POLICY` selects policy by name:
+
+    fifo: Queue order, higher priority first then older file first.
+    sef: Shortest estimated first in same priority.
+    aging: Like sef, waiting time raises priority
+        by config `AGING_RATE` per hour.
+    deadline: Least slack first in same priority for tasks have deadline,
+        config `DEADLINES` maps file name pattern to deadline time, e.g.
+        `{"ep01_*.nk": "2018-06-01 18:00"}`.
+
+Add a policy by subclass `Policy` and decorate it with `register`.
+Compare policies on render history with `python -m batchrender.render.simulate`.
+"""
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import fnmatch
+import logging
+import os
+import time
+from collections import namedtuple
+
+import pendulum
+
+from ..config import CONFIG
+
+LOGGER = logging.getLogger(__name__)
+
+INFINITY = float('inf')
+
+POLICIES = {}
+
+
+class Job(namedtuple('Job', ('key', 'priority', 'estimate', 'arrival', 'deadline'))):
+    """Schedule infomation of a task.
+
+    Args:
+        key (object): Task object or identity.
+        priority (int): User priority, higher first.
+        estimate (float): Estimated render seconds, None if unknown.
+        arrival (float): Timestamp that task joined queue.
+        deadline (float): Timestamp that task should finish, None if no deadline.
+    """
+
+    @property
+    def cost(self):
+        """Estimate for sort, unknown estimate sort last.  """
+
+        return INFINITY if self.estimate is None else self.estimate
+
+
+def register(cls):
+    """Class decorator for register a policy.  """
+
+    POLICIES[cls.name] = cls
+    return cls
+
+
+def get(name=None):
+    """Policy object by name.
+
+    Args:
+        name (str, optional): Defaults to config `SCHEDULE_POLICY`.
+
+    Returns:
+        Policy: Policy object, fifo for unknown name.
+    """
+
+    name = name or CONFIG['SCHEDULE_POLICY']
+    try:
+        return POLICIES[name]()
+    except KeyError:
+        LOGGER.warning('Unknown schedule policy: %s, use fifo.', name)
+        return FIFO()
+
+
+class Policy(object):
+    """Decide start order of jobs.  """
+
+    name = None
+
+    def key(self, job, now):
+        """Sort key of a job, smaller starts first.
+
+        Args:
+            job (Job): Job to sort.
+            now (float): Current timestamp.
+        """
+
+        raise NotImplementedError
+
+    def order(self, jobs, now=None):
+        """Jobs in start order.
+
+        Args:
+            jobs (Iterable[Job]): Jobs to sort.
+            now (float, optional): Defaults to current time.
+
+        Returns:
+            list[Job]: Sorted jobs.
+        """
+
+        now = time.time() if now is None else now
+        return sorted(jobs, key=lambda x: self.key(x, now))
+
+
+@register
+class FIFO(Policy):
+    """Higher priority first then earlier arrival first.  """
+
+    name = 'fifo'
+
+    def key(self, job, now):
+        return (-job.priority, job.arrival)
+
+
+@register
+class ShortestEstimateFirst(Policy):
+    """Shorter estimated cost first in same priority.  """
+
+    name = 'sef'
+
+    def key(self, job, now):
+        return (-job.priority, job.cost, job.arrival)
+
+
+@register
+class Aging(Policy):
+    """Shortest estimate first with priority raised by waiting time.  """
+
+    name = 'aging'
+
+    def __init__(self, rate=None):
+        self.rate = CONFIG['AGING_RATE'] if rate is None else rate
+
+    def key(self, job, now):
+        waited = max(now - job.arrival, 0) / 3600.0
+        return (-int(job.priority + waited * self.rate), job.cost, job.arrival)
+
+
+@register
+class Deadline(Policy):
+    """Least slack first in same priority, jobs without deadline last.  """
+
+    name = 'deadline'
+
+    def key(self, job, now):
+        slack = INFINITY
+        if job.deadline is not None:
+            slack = job.deadline - now - (job.estimate or 0)
+        return (-job.priority, slack, job.cost, job.arrival)
+
+
+def deadline(path):
+    """Deadline of a file from config `DEADLINES`.
+
+    Args:
+        path (str): File path.
+
+    Returns:
+        float: Timestamp, None if no deadline.
+    """
+
+    name = os.path.basename(path)
+    for pattern, value in CONFIG['DEADLINES'].items():
+        if fnmatch.fnmatch(name, pattern):
+            try:
+                return pendulum.parse(value, tz='local').timestamp()
+            except (ValueError, TypeError):
+                LOGGER.warning('Invalid deadline: %s: %s', pattern, value)
+    return None
@@ -0,0 +1,376 @@
+# -*- coding=UTF-8 -*-
+"""Prefetch Read node inputs to local disk cache.
+
+With config `PREFETCH_DIR`, input files of next config `PREFETCH_TASKS`
+queued tasks are copied to it in background while current tasks render.
+Cache is least recently used first evicted when over config `PREFETCH_SIZE` (GB),
+files used by a rendering task are never evicted.
+A cached file is valid only when source size and modified time not changed,
+stale files are removed when found, or when released if a rendering task uses it.
+
+A Read node is redirected to cache only when all files of its sequence hit,
+hit and miss file counts and bytes read from cache are reported for each task.
+"""
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import hashlib
+import io
+import json
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict, namedtuple
+
+from six.moves import queue
+
+from . import staging
+from .. import script
+from ..codectools import get_unicode as u
+from ..config import CONFIG
+
+LOGGER = logging.getLogger(__name__)
+
+INDEX_NAME = 'index.json'
+
+Stats = namedtuple('Stats', ('hits', 'misses', 'bytes', 'keys'))
+
+
+def _key(path):
+    return os.path.normcase(os.path.abspath(u(path))).replace('\\', '/')
+
+
+def sequence_files(path, cwd):
+    """Existing files of a sequence.
+
+    Args:
+        path (str): File path, frame number can be `%04d` or `####`.
+        cwd (str): Directory relative path based on.
+
+    Returns:
+        list[str]: Absolute file paths, sorted.
+    """
+
+    path = os.path.join(cwd, u(path))
+    dirname, basename = os.path.split(path)
+    parts = re.split(r'(%0?\d*d|#+)', basename)
+    if len(parts) == 1:
+        return [os.path.abspath(path)] if os.path.isfile(path) else []
+    pattern = re.compile('^{}$'.format(''.join(
+        r'-?\d+' if index % 2 else re.escape(i)
+        for index, i in enumerate(parts))))
+    try:
+        names = os.listdir(dirname)
+    except OSError:
+        return []
+    return sorted(os.path.abspath(os.path.join(dirname, i))
+                  for i in names if pattern.match(i))
+
+
+class Cache(object):
+    """Size bounded local file cache.
+
+    Args:
+        root (str): Cache directory.
+        max_size (float): Max total bytes.
+    """
+
+    def __init__(self, root, max_size):
+        self.root = os.path.abspath(root)
+        self.max_size = max_size
+        self._lock = threading.RLock()
+        # Source key -> (size, mtime), least recently used first.
+        self._entries = OrderedDict()
+        self._pinned = {}
+        # Keys of stale files still used by rendering task.
+        self._stale = set()
+        self._load()
+
+    @property
+    def size(self):
+        """Total bytes of cached files.  """
+
+        with self._lock:
+            return sum(i[0] for i in self._entries.values())
+
+    def dirname(self, dirname):
+        """Cache directory for a source directory.  """
+
+        digest = hashlib.md5(_key(dirname).encode('utf-8')).hexdigest()
+        return '{}/{}'.format(self.root.replace('\\', '/'), digest[:16])
+
+    def path(self, src):
+        """Cache path for a source file.  """
+
+        dirname, basename = os.path.split(_key(src))
+        return '{}/{}'.format(self.dirname(dirname), basename)
+
+    def lookup(self, src):
+        """Check a cached file.
+
+        Args:
+            src (str): Source file path.
+
+        Returns:
+            int: Cached file size, None if not cached or stale.
+        """
+
+        key = _key(src)
+        try:
+            stat = os.stat(src)
+        except OSError:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if (entry != (stat.st_size, stat.st_mtime)
+                    or not os.path.exists(self.path(key))):
+                LOGGER.debug('Stale cache: %s', key)
+                if key in self._pinned:
+                    # Rendering task still reads it, remove when released.
+                    self._entries.pop(key)
+                    self._stale.add(key)
+                else:
+                    self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def fetch(self, src):
+        """Copy a source file into cache.
+
+        Args:
+            src (str): Source file path.
+
+        Returns:
+            bool: Whether file is cached.
+        """
+
+        if self.lookup(src) is not None:
+            return True
+        key = _key(src)
+        try:
+            stat = os.stat(src)
+        except OSError:
+            return False
+        with self._lock:
+            if key in self._stale:
+                return False
+            if not self._evict(stat.st_size):
+                return False
+        dst = self.path(key)
+        try:
+            staging.copy(src, dst)
+            changed = os.stat(src)
+        except (IOError, OSError):
+            LOGGER.warning('Prefetch failed: %s', src, exc_info=True)
+            return False
+        if (changed.st_size, changed.st_mtime) != (stat.st_size, stat.st_mtime):
+            # Source changed during copy.
+            _try_remove(dst)
+            return False
+        with self._lock:
+            self._entries[key] = (stat.st_size, stat.st_mtime)
+            self._evict(0)
+        return True
+
+    def _evict(self, size):
+        """Remove least recently used files until `size` bytes can be added.
+
+        Returns:
+            bool: Whether enough space.
+        """
+
+        if size > self.max_size:
+            return False
+        total = self.size
+        for key in list(self._entries):
+            if total + size <= self.max_size:
+                break
+            if key in self._pinned:
+                continue
+            total -= self._entries[key][0]
+            self._remove(key)
+        return total + size <= self.max_size
+
+    def _remove(self, key):
+        self._entries.pop(key, None)
+        _try_remove(self.path(key))
+
+    def remap(self, path, cwd):
+        """Redirect Read nodes of a script to cached files.
+
+        Used files are pinned until `release`.
+
+        Args:
+            path (str): Script path, modified in place.
+            cwd (str): Directory relative paths based on.
+
+        Returns:
+            Stats: File counts and bytes.
+        """
+
+        counts = dict(hits=0, misses=0, bytes=0)
+        keys = []
+
+        def _remap(value):
+            if not value or '[' in value or '{' in value:
+                return None
+            files = sequence_files(value, cwd)
+            sizes = [self.lookup(i) for i in files]
+            if not files or None in sizes:
+                counts['misses'] += len(files)
+                return None
+            counts['hits'] += len(files)
+            counts['bytes'] += sum(sizes)
+            keys.extend(_key(i) for i in files)
+            dirname, basename = os.path.split(os.path.join(cwd, value))
+            return '{}/{}'.format(self.dirname(dirname), basename)
+
+        with self._lock:
+            with io.open(path, encoding='utf-8') as f:
+                text = f.read()
+            text = script.remap_reads(text, _remap)
+            with io.open(path, 'w', encoding='utf-8') as f:
+                f.write(text)
+            for i in keys:
+                self._pinned[i] = self._pinned.get(i, 0) + 1
+        return Stats(keys=keys, **counts)
+
+    def release(self, keys):
+        """Unpin files used by a finished task.  """
+
+        with self._lock:
+            for i in keys:
+                count = self._pinned.pop(i, 0) - 1
+                if count > 0:
+                    self._pinned[i] = count
+                elif i in self._stale:
+                    self._stale.discard(i)
+                    _try_remove(self.path(i))
+            # Pinned files can keep cache over size limit.
+            self._evict(0)
+            self.save()
+
+    def _load(self):
+        try:
+            with io.open(os.path.join(self.root, INDEX_NAME), encoding='utf-8') as f:
+                data = json.load(f)
+        except (IOError, OSError, ValueError):
+            return
+        for key, size, mtime in data:
+            self._entries[key] = (size, mtime)
+
+    def save(self):
+        """Save cache index.  """
+
+        with self._lock:
+            data = [(k, v[0], v[1]) for k, v in self._entries.items()]
+        try:
+            os.makedirs(self.root)
+        except OSError:
+            pass
+        path = os.path.join(self.root, INDEX_NAME)
+        with io.open(path + '.part', 'w', encoding='utf-8') as f:
+            f.write(u(json.dumps(data)))
+        if os.path.exists(path):
+            os.remove(path)
+        os.rename(path + '.part', path)
+
+
+def _try_remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+_CACHE = []
+
+
+def cache():
+    """Shared cache for config `PREFETCH_DIR`.  """
+
+    root = os.path.abspath(CONFIG['PREFETCH_DIR'])
+    max_size = CONFIG['PREFETCH_SIZE'] * 2 ** 30
+    if not _CACHE or _CACHE[0].root != root:
+        _CACHE[:] = [Cache(root, max_size)]
+    _CACHE[0].max_size = max_size
+    return _CACHE[0]
+
+
+class Prefetcher(object):
+    """Fill cache with inputs of scripts in background.  """
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._queued = set()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def put(self, paths):
+        """Add scripts to prefetch, already queued scripts are skipped.
+
+        Args:
+            paths (Iterable[str]): Script paths.
+        """
+
+        with self._lock:
+            for i in paths:
+                if i in self._queued:
+                    continue
+                self._queued.add(i)
+                self._queue.put(i)
+            if self._thread and self._thread.is_alive():
+                return
+            thread = threading.Thread(target=self._run, name='input-prefetcher')
+            thread.daemon = True
+            thread.start()
+            self._thread = thread
+
+    def _run(self):
+        while True:
+            path = self._queue.get()
+            try:
+                self.prefetch(path)
+            except Exception:  # pylint: disable=broad-except
+                LOGGER.error('Prefetch failed: %s', path, exc_info=True)
+            finally:
+                with self._lock:
+                    self._queued.discard(path)
+                self._queue.task_done()
+
+    @staticmethod
+    def prefetch(path):
+        """Cache inputs of a script.
+
+        Returns:
+            int: Cached file count.
+        """
+
+        cwd = CONFIG['DIR']
+        target = cache()
+        ret = 0
+        for node in script.parse(os.path.join(cwd, path)).reads():
+            if not node.file:
+                continue
+            for i in sequence_files(node.file, cwd):
+                if target.fetch(i):
+                    ret += 1
+        target.save()
+        LOGGER.debug('Prefetched %d files for: %s', ret, path)
+        return ret
+
+
+_PREFETCHER = []
+
+
+def prefetcher():
+    """Shared prefetcher.  """
+
+    if not _PREFETCHER:
+        _PREFETCHER.append(Prefetcher())
+    return _PREFETCHER[0]
@@ -23,6 +23,27 @@ from ..translator import ConsoleTranslator
 LOGGER = logging.getLogger(__name__)
 
 
+def parse_output(line):
+    """Parse written output from a nuke stdout line.
+
+    >>> parse_output('Writing /tmp/a.0001.exr took 0.25 seconds')
+    {'path': '/tmp/a.0001.exr', 'cost': '0.25'}
+    >>> parse_output('Frame 1 (1 of 10)') is None
+    True
+
+    Args:
+        line (str): Output line.
+
+    Returns:
+        dict: `path` and `cost`, None if line is not a output line.
+    """
+
+    match = re.match('Writing (.+?) took (.+?) seconds', line)
+    if not match:
+        return None
+    return {'path': match.group(1), 'cost': match.group(2)}
+
+
 class BaseHandler(QObject):
     """Base class for process output handler.  """
 
@@ -36,9 +57,14 @@ class BaseHandler(QObject):
 class NukeHandler(BaseHandler):
     """Process output handler for nuke.  """
 
-    def __init__(self, proc):
+    def __init__(self, proc, classifier=None):
         super(NukeHandler, self).__init__()
         self.proc = proc
+        self.classifier = classifier
+
+    def _classify(self, line):
+        if self.classifier is not None:
+            self.classifier.feed(line)
 
     def start(self):
         """Start handler output.  """
@@ -51,13 +77,9 @@ class NukeHandler(BaseHandler):
     def parse_stdout(self, text, **context):
         """Find output file.  """
 
-        match = re.match('Writing (.+?) took (.+?) seconds', text)
-        if match:
-            payload = {
-                'path': match.group(1),
-                'cost': match.group(2),
-                'frame': context['frame']
-            }
+        payload = parse_output(text)
+        if payload:
+            payload['frame'] = context['frame']
             self.output_updated.emit(payload)
 
     @run_async
@@ -68,6 +90,7 @@ class NukeHandler(BaseHandler):
             if not line:
                 break
 
+            self._classify(line)
             line = ConsoleTranslator.translate(line)
             msg = 'STDERR: {}\n'.format(line)
             with open(CONFIG.log_path, 'a') as f:
@@ -80,7 +103,7 @@ class NukeHandler(BaseHandler):
     @run_async
     def _handle_stdout(self, **context):
         LOGGER.debug('Start handle stdout.')
-        start_time = time.clock()
+        start_time = time.perf_counter()
         context['last_frame_time'] = start_time
 
         frame_lines = []
@@ -90,6 +113,7 @@ class NukeHandler(BaseHandler):
             if not line:
                 break
 
+            self._classify(line)
             self.stdout.emit(
                 stylize(ConsoleTranslator.translate(line), 'stdout'))
             if self._match_frame_finish(line, context):
@@ -104,7 +128,7 @@ class NukeHandler(BaseHandler):
         match = re.match(r'Frame (\d+) \((\d+) of (\d+)\)', line)
 
         if match:
-            now = time.clock()
+            now = time.perf_counter()
 
             data['frame'] = int(match.group(1))
             data['current'] = int(match.group(2))
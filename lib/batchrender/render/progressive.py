@@ -0,0 +1,66 @@
+# -*- coding=UTF-8 -*-
+"""Progressive coarse to fine frame order.
+
+With config `PROGRESSIVE` > 1, frames are rendered in passes,
+first pass renders every `PROGRESSIVE` frame like `1-1000x10`,
+following passes halve the stride and fill the gaps.
+Each pass is a render run, completed frames are tracked by frame journal,
+so a frame is never rendered twice.
+"""
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import logging
+
+from ..framerange import FrameRange
+
+LOGGER = logging.getLogger(__name__)
+
+
+def strides(stride):
+    """Stride of each pass.
+
+    >>> strides(10)
+    [10, 5, 2, 1]
+    >>> strides(1)
+    [1]
+
+    Args:
+        stride (int): First pass stride.
+
+    Returns:
+        list[int]: Strides, last one is always 1.
+    """
+
+    ret = []
+    while stride > 1:
+        ret.append(stride)
+        stride //= 2
+    ret.append(1)
+    return ret
+
+
+def next_pass(frames, anchor, stride):
+    """Frames of next pass.
+
+    >>> print(*next_pass(range(1, 31), 1, 10))
+    1 1-21x10
+    >>> print(*next_pass([3, 4, 7], 1, 4))
+    2 3 7
+
+    Args:
+        frames (Iterable[int]): Frames not rendered yet.
+        anchor (int): First frame of whole range, keeps grid stable between passes.
+        stride (int): First pass stride.
+
+    Returns:
+        tuple: (pass number starts from 1, FrameRange).
+    """
+
+    frames = FrameRange(frames)
+    for index, i in enumerate(strides(stride), 1):
+        ret = FrameRange(j for j in frames if (j - anchor) % i == 0)
+        if ret:
+            return index, ret
+    return 0, frames
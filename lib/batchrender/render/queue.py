@@ -5,41 +5,205 @@ from __future__ import (absolute_import, division, print_function,
                         unicode_literals)
 
 import logging
+import os
+import time
+from collections import Counter, OrderedDict
+from itertools import islice
+from pathlib import PurePath
 
-from . import core
-from .. import model
+from PySide2.QtCore import QPersistentModelIndex, QTimer, Signal
+from sqlalchemy.exc import SQLAlchemyError
+
+from . import core, dependency, journal, policy, validation
+from .. import database, metrics, model
+from ..config import CONFIG
+from ..framerange import FrameRange
+from ..threadtools import run_async
 from .task import NukeTask
 
 LOGGER = logging.getLogger(__name__)
 
+STATE_NAMES = OrderedDict((
+    (model.DOING, 'doing'),
+    (model.DISABLED, 'disabled'),
+    (model.FINISHED, 'finished'),
+    (model.PARTIAL, 'partial'),
+))
+
 
 class Queue(core.RenderObject):
     """Task render quene.  """
 
+    estimate_chunk_size = 50
+    max_task_cache = 32
+    estimates_updated = Signal(list)
+
     def __init__(self, data_model):
         from ..model import FilesProxyModel
         assert isinstance(data_model, FilesProxyModel), type(data_model)
 
         self.model = data_model
-        self._task_cache = {}
+        self._records = {}
+        self._task_cache = OrderedDict()
+        self._remains_parts = {}
+        self._states = {}
+        self._state_counts = Counter()
+        self._estimating = set()
+        # File key -> (arrival, deadline) for scheduling policy.
+        self._schedules = {}
+        self._schedule_deadlines = None
+        self._graph = None
+        self._graph_keys = None
         super(Queue, self).__init__()
 
+        # Coalesce model changes during one event loop iteration.
+        timer = QTimer(self)
+        timer.setSingleShot(True)
+        timer.setInterval(0)
+        timer.timeout.connect(self.update_remains)
+        self._update_remains_timer = timer
+
+        self.estimates_updated.connect(self.on_estimates_updated)
+        self.remains_changed.connect(metrics.QUEUE_REMAINS.set)
         self.model.layoutChanged.connect(self.changed)
         self.model.rowsRemoved.connect(self.changed)
+        source_model = self.model.sourceModel()
+        source_model.rowsAboutToBeRemoved.connect(self.on_rows_about_removed)
+        source_model.modelAboutToBeReset.connect(self.clear_cache)
 
     def __bool__(self):
         return any(self.enabled_tasks())
     __nonzero__ = __bool__
 
     def get(self):
-        """Get first task from queue.  """
+        """Get first task from queue.
+
+        Returns:
+            NukeTask: Render task for the first avaliable task record.
+        """
 
         try:
-            return next(i for i in self.enabled_tasks()
-                        if i.is_file_exists())
+            record = next(self.candidates())
         except StopIteration:
             self.finished.emit()
             raise
+        return self.render_task(record)
+
+    def candidates(self, limit=None):
+        """Iterator for tasks that can start rendering.
+
+        Args:
+            limit (int, optional): Defaults to None. Max count.
+
+        Returns:
+            Iterator: Task records in order of config `SCHEDULE_POLICY`.
+        """
+
+        now = time.time()
+        ret = (i for i in self.enabled_tasks()
+               if not i.state & model.DOING
+               and (i.retry_time or 0) <= now
+               and i.is_file_exists())
+        if dependency.is_enabled():
+            ret = (i for i in ret if not self._is_held(i))
+        if CONFIG['SCHEDULE_POLICY'] != policy.FIFO.name:
+            # Policy needs all tasks to decide order.
+            ret = (i.key for i in policy.get().order(
+                [self._job(i) for i in ret], now))
+        return islice(ret, limit)
+
+    def batch_members(self, head, candidates):
+        """Small tasks to render with head task in one nuke process.
+
+        Args:
+            head (Task): Task to start.
+            candidates (list[Task]): Tasks can start.
+
+        Returns:
+            list[Task]: Tasks estimated within config `BATCH_COST`,
+                empty if head is not small enough.
+        """
+
+        limit = CONFIG['BATCH_COST']
+
+        def _is_small(task):
+            value = _task_remains(task)
+            return value is not None and value <= limit
+
+        if limit <= 0 or CONFIG['BATCH_SIZE'] < 2 or not _is_small(head):
+            return []
+        ret = [i for i in candidates if i.path != head.path and _is_small(i)]
+        return ret[:CONFIG['BATCH_SIZE'] - 1]
+
+    def retry_delay(self):
+        """Seconds until next failed task can retry.
+
+        Returns:
+            float: Delay in seconds, None if no task is waiting for retry.
+        """
+
+        now = time.time()
+        times = [i.retry_time for i in self.enabled_tasks()
+                 if not i.state & model.DOING and (i.retry_time or 0) > now]
+        if not times:
+            return None
+        return min(times) - now
+
+    def dependencies(self):
+        """Dependency graph of enabled tasks.
+
+        Returns:
+            dependency.Graph: Graph, None if dependency is not enabled.
+        """
+
+        if not dependency.is_enabled():
+            return None
+        keys = frozenset(_file_key(i.path) for i in self.enabled_tasks())
+        if self._graph is None or keys != self._graph_keys:
+            self._graph = dependency.Graph.build(keys)
+            self._graph_keys = keys
+            if self._graph:
+                LOGGER.debug('Dependency graph: %d edges', len(self._graph))
+        return self._graph
+
+    def released_frames(self, task):
+        """Frames of task that upstream tasks allow to render.
+
+        Args:
+            task (Task): Task record.
+
+        Returns:
+            FrameRange: Released frames, None if not held by upstream.
+        """
+
+        graph = self.dependencies()
+        if graph is None:
+            return None
+        return graph.released(_file_key(task.path), self._confirmed_frames)
+
+    def _confirmed_frames(self, key):
+        """Frames upstream task rendered in journal, None if not holding.  """
+
+        task = self._task_cache.get(key) or self._records.get(key)
+        if task is None or task.state & model.FINISHED:
+            return None
+        record = _task_journal(task)
+        if record is None:
+            return FrameRange()
+        return record.completed()
+
+    def _is_held(self, task):
+        released = self.released_frames(task)
+        if released is None:
+            return False
+        frames = FrameRange(task.range or validation.script_frames(task.path))
+        if not frames:
+            # Range unknown.
+            return not released
+        record = _task_journal(task)
+        if record is not None:
+            frames = FrameRange(frames - record.completed())
+        return not frames & released
 
     def enabled_tasks(self):
         """Iterator for enabled tasks in queue.  """
@@ -71,23 +235,260 @@ class Queue(core.RenderObject):
         return (self._get_task(i) for i in indexes)
 
     def _get_task(self, index):
-        if index not in self._task_cache:
-            source_model = self.model.sourceModel()
-            self._task_cache[index] = NukeTask(
-                self.model.mapToSource(index), source_model)
-        return self._task_cache[index]
+        source_model = self.model.sourceModel()
+        source_index = self.model.mapToSource(index)
+        key = _file_key(source_model.filePath(source_index))
+        try:
+            return self._task_cache[key]
+        except KeyError:
+            pass
+        if key not in self._records:
+            self._records[key] = model.Task(
+                QPersistentModelIndex(source_index), source_model)
+        return self._records[key]
+
+    def render_task(self, record):
+        """Get render task for a task record, create it when needed.
+
+        Args:
+            record (Task): Task record.
+
+        Returns:
+            NukeTask: Render task.
+        """
+
+        task = record
+        if not isinstance(task, NukeTask):
+            key = _file_key(record.path)
+            task = self._task_cache.pop(key, None) or NukeTask.from_record(record)
+            self._task_cache[key] = task
+            self._records.pop(key, None)
+            self._shrink_cache()
+        task.upstream_frames = self.released_frames(task)
+        return task
+
+    def _shrink_cache(self):
+        for key, task in list(self._task_cache.items()):
+            if len(self._task_cache) <= self.max_task_cache:
+                break
+            if task.is_locked:
+                continue
+            self._evict(key)
+
+    def _job(self, task):
+        if self._schedule_deadlines != CONFIG['DEADLINES']:
+            self._schedules.clear()
+            self._schedule_deadlines = dict(CONFIG['DEADLINES'])
+        key = _file_key(task.path)
+        try:
+            arrival, deadline = self._schedules[key]
+        except KeyError:
+            try:
+                arrival = os.path.getmtime(task.path)
+            except OSError:
+                arrival = time.time()
+            deadline = policy.deadline(task.path)
+            self._schedules[key] = (arrival, deadline)
+        return policy.Job(task, task.priority, _task_remains(task),
+                          arrival, deadline)
+
+    def _evict(self, key):
+        task = self._task_cache.get(key)
+        if task is not None and task.is_locked:
+            # Rebuilt task would lose render state.
+            return
+        self._schedules.pop(key, None)
+        self._records.pop(key, None)
+        if self._task_cache.pop(key, None) is not None:
+            task.deleteLater()
+
+    def clear_cache(self):
+        """Remove all cached task objects, except ones used by render.  """
+
+        for key in list(self._records) + list(self._task_cache):
+            self._evict(key)
+
+    def on_rows_about_removed(self, parent, first, last):
+        source_model = self.model.sourceModel()
+        for row in range(first, last + 1):
+            index = source_model.index(row, 0, parent)
+            self._evict(_file_key(source_model.filePath(index)))
+
+    def on_file_added(self, path, mtime):
+        key = _file_key(path)
+        if key in self._schedules:
+            self._schedules[key] = (mtime, self._schedules[key][1])
+
+    def on_file_modified(self, path, mtime):
+        key = _file_key(path)
+        self._graph = None
+        if key in self._schedules:
+            self._schedules[key] = (mtime, self._schedules[key][1])
+        record = self._task_cache.get(key) or self._records.get(key)
+        if record is None or record.state & model.DOING:
+            return
+        record._estimate = None  # pylint: disable=protected-access
+        if record.path in self._remains_parts:
+            self.refresh_estimates([record])
+
+    def on_file_removed(self, path):
+        self._evict(_file_key(path))
+
+    def diagnostics(self):
+        """Queue diagnostics infomation.
+
+        Returns:
+            dict: Diagnostics data.
+        """
+
+        return {
+            'task_records': len(self._records),
+            'task_objects': len(self._task_cache),
+            'estimating': len(self._estimating),
+            'states': {v: self._state_counts[k]
+                       for k, v in STATE_NAMES.items()},
+        }
 
     def update_remains(self):
-        """Caculate remains time.  """
+        """Recaculate remains time from all enabled tasks.
+
+        Only cached estimates are used,
+        missing estimates are refreshed in background.
+        """
 
-        ret = 0
-        for i in self.enabled_tasks():
+        parts = {}
+        pending = []
+        states = {}
+        for i in self.all_tasks():
             assert isinstance(i, model.Task)
-            if i.state & model.DOING and i.remains is not None:
-                ret += i.remains
-            else:
-                ret += i.estimate
-        self.remains = ret
+            state = i.state
+            states[i.path] = state
+            if state & model.DISABLED:
+                continue
+            value = _task_remains(i)
+            if value is None:
+                pending.append(i)
+            parts[i.path] = value or 0
+        self._remains_parts = parts
+        self._states = states
+        self._state_counts = Counter(
+            bit for state in states.values() for bit in STATE_NAMES
+            if state & bit)
+        self._update_metrics()
+        self.remains = sum(parts.values())
+        self.refresh_estimates(pending)
+
+    def update_task(self, task):
+        """Apply remains time change of a single task.  """
+
+        assert isinstance(task, model.Task)
+        self._update_state(task.path, task.state)
+        self._update_part(task.path, _task_remains(task) or 0)
+
+    def _update_state(self, key, state):
+        old = self._states.get(key)
+        if old is None or old == state:
+            return
+        self._states[key] = state
+        for bit in STATE_NAMES:
+            self._state_counts[bit] += bool(state & bit) - bool(old & bit)
+        self._update_metrics()
+
+    def _update_metrics(self):
+        metrics.QUEUE_TASKS.set(len(self._states), state='all')
+        for bit, name in STATE_NAMES.items():
+            metrics.QUEUE_TASKS.set(self._state_counts[bit], state=name)
+        metrics.TASK_CACHE.set(len(self._task_cache))
+
+    def _update_part(self, key, value):
+        old = self._remains_parts.get(key)
+        if old is None or old == value:
+            return
+        self._remains_parts[key] = value
+        self.remains = max((self.remains or 0) + value - old, 0)
+
+    def refresh_estimates(self, tasks):
+        """Refresh estimate of tasks in background.
+
+        Args:
+            tasks (list[Task]): Tasks to refresh.
+        """
+
+        jobs = [(i.path, i.frames) for i in tasks
+                if i.path not in self._estimating]
+        if not jobs:
+            return
+        self._estimating.update(path for path, _ in jobs)
+        self._estimate_worker(jobs)
+
+    @run_async
+    def _estimate_worker(self, jobs):
+        results = []
+        for path, frames in jobs:
+            try:
+                with database.util.session_scope() as sess:
+                    # Read only, new file is inserted by render task
+                    # in main thread, insert here races with it.
+                    record = database.File.from_path(path)
+                    record = sess.query(database.File).get(record.hash) or record
+                    results.append((path,
+                                    record.estimate_cost(frames, session=sess),
+                                    record.statistics(sess)))
+            except (IOError, OSError, SQLAlchemyError):
+                LOGGER.debug('Estimate failed: %s', path, exc_info=True)
+                results.append((path, None, None))
+            if len(results) >= self.estimate_chunk_size:
+                self.estimates_updated.emit(results)
+                results = []
+        if results:
+            self.estimates_updated.emit(results)
+
+    def on_estimates_updated(self, results):
+        source_model = self.model.sourceModel()
+        for path, value, stats in results:
+            self._estimating.discard(path)
+            if value is None:
+                continue
+            source_model.set_file_stats(stats)
+            index = source_model.index(path)
+            if not index.isValid():
+                continue
+            source_model.setData(index, value, model.ROLE_ESTIMATE)
+            source_model.setData(index, stats['hash'], model.ROLE_FILE_HASH)
+            state = source_model.data(index, model.ROLE_STATE)
+            if not state & model.DOING:
+                self._update_part(path, value)
 
     def on_changed(self):
-        self.update_remains()
+        self._update_remains_timer.start()
+
+
+def _task_journal(task):
+    """Frame journal of a task, also for records and evicted tasks.
+
+    Returns:
+        journal.FrameJournal: Journal, None if file hash not known yet.
+    """
+
+    ret = getattr(task, 'journal', None)
+    if isinstance(ret, journal.FrameJournal):
+        return ret
+    file_hash = task.file_hash
+    if not file_hash:
+        return None
+    return journal.FrameJournal.for_file(
+        database.File(hash=file_hash, path=PurePath(task.path)))
+
+
+def _file_key(path):
+    """Stable identity for task file.  """
+
+    return os.path.normcase(os.path.abspath(path))
+
+
+def _task_remains(task):
+    """Remains time of task without touching database.  """
+
+    if task.state & model.DOING and task.remains is not None:
+        return task.remains
+    return task._estimate  # pylint: disable=protected-access
@@ -0,0 +1,149 @@
+# -*- coding=UTF-8 -*-
+"""Restart render process to contain memory growth.
+
+With config `RECYCLE_FRAMES` > 0, render process is restarted
+after rendering that many frames.
+With config `RECYCLE_MEMORY` > 0, render process is restarted
+once its process tree RSS is over that many GB.
+Restarted render continues from next unrendered frame by frame journal,
+so process is only restarted when journal completed frames increased
+since it started, at most `Recycler.max_restarts` times for each render.
+
+Average frame cost before and after each restart
+is recorded to `database.Recycle`.
+"""
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import logging
+from collections import deque
+
+from ..config import CONFIG
+
+LOGGER = logging.getLogger(__name__)
+
+FRAMES = 'frames'
+MEMORY = 'memory'
+
+LABELS = {
+    FRAMES: '帧数',
+    MEMORY: '内存',
+}
+
+
+def _average(values):
+    values = list(values)
+    if not values:
+        return None
+    return sum(values) / len(values)
+
+
+class Recycler(object):
+    """Decide and record render process restarts of a task.  """
+
+    window = 5
+    max_restarts = 10
+
+    def __init__(self):
+        self.frames = 0
+        self.restarts = 0
+        self._journaled = 0
+        self._costs = deque(maxlen=self.window)
+        self._after = []
+        self._pending = None
+        self._is_stopping = False
+        self._records = []
+
+    def start(self, journaled=0, is_restart=False):
+        """Mark a new render process started.
+
+        Args:
+            journaled (int, optional): Defaults to 0. Completed frame count in journal.
+            is_restart (bool, optional): Defaults to False. Whether started by recycle.
+        """
+
+        self.frames = 0
+        self._journaled = journaled
+        if not is_restart:
+            self.restarts = 0
+        self._costs.clear()
+        self._is_stopping = False
+
+    def add_frame(self, cost):
+        """Record a rendered frame.
+
+        Args:
+            cost (float): Frame cost in seconds.
+        """
+
+        if self._is_stopping:
+            return
+        self.frames += 1
+        if self.frames == 1:
+            # Includes process startup.
+            return
+        self._costs.append(cost)
+        if self._pending is not None:
+            self._after.append(cost)
+            if len(self._after) >= self.window:
+                self.finish()
+
+    def check(self, rss=None, journaled=None):
+        """Whether render process should restart.
+
+        Args:
+            rss (int, optional): Defaults to None. Process tree RSS in bytes.
+            journaled (int, optional): Defaults to None. Completed frame count in journal,
+                restarted process would render same frames again if not increased.
+
+        Returns:
+            str: Reason, None if not needed.
+        """
+
+        if self._is_stopping or self.restarts >= self.max_restarts:
+            return None
+        if journaled is not None and journaled <= self._journaled:
+            return None
+        if CONFIG['RECYCLE_FRAMES'] and self.frames >= CONFIG['RECYCLE_FRAMES']:
+            return FRAMES
+        if (CONFIG['RECYCLE_MEMORY'] and rss
+                and rss > CONFIG['RECYCLE_MEMORY'] * 2 ** 30):
+            return MEMORY
+        return None
+
+    def recycle(self, reason, **data):
+        """Mark current render process is restarting.
+
+        Args:
+            reason (str): Restart reason.
+            **data: Other columns of `database.Recycle`.
+
+        Returns:
+            dict: Recycle record, `cost_after` is filled after restart.
+        """
+
+        self.finish()
+        self._is_stopping = True
+        self.restarts += 1
+        self._pending = dict(data,
+                             reason=reason,
+                             frames=self.frames,
+                             cost_before=_average(self._costs))
+        return self._pending
+
+    def finish(self):
+        """Complete pending record with frames rendered after restart.  """
+
+        if self._pending is None:
+            return
+        self._pending['cost_after'] = _average(self._after)
+        self._records.append(self._pending)
+        self._pending = None
+        self._after = []
+
+    def pop_records(self):
+        """Completed records for `database.Recycle`.  """
+
+        ret, self._records = self._records, []
+        return ret
@@ -0,0 +1,244 @@
+# -*- coding=UTF-8 -*-
+"""Render process resource usage sampling.  """
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import logging
+import threading
+
+import psutil
+
+LOGGER = logging.getLogger(__name__)
+
+
+class Usage(object):
+    """Aggregated resource usage of samples.  """
+
+    def __init__(self):
+        self.samples = 0
+        self.cpu_total = 0.0
+        self.cpu_max = 0.0
+        self.rss_total = 0
+        self.rss_peak = 0
+        self.threads = 0
+        self.io_read = 0
+        self.io_write = 0
+
+    def add(self, sample):
+        """Add a sample.
+
+        Args:
+            sample (dict): Sample from `ResourceSampler.sample`.
+        """
+
+        self.samples += 1
+        self.cpu_total += sample['cpu']
+        self.cpu_max = max(self.cpu_max, sample['cpu'])
+        self.rss_total += sample['rss']
+        self.rss_peak = max(self.rss_peak, sample['rss'])
+        self.threads = max(self.threads, sample['threads'])
+        self.io_read += sample['io_read']
+        self.io_write += sample['io_write']
+
+    def as_dict(self):
+        """Mapping for `database.Resource`.  """
+
+        samples = self.samples or 1
+        return dict(
+            samples=self.samples,
+            cpu_average=self.cpu_total / samples,
+            cpu_max=self.cpu_max,
+            rss_average=self.rss_total // samples,
+            rss_peak=self.rss_peak,
+            io_read=self.io_read,
+            io_write=self.io_write,
+            threads=self.threads,
+        )
+
+
+class ResourceSampler(object):
+    """Sample resource usage of a process and its children in a thread.
+
+    Args:
+        pid (int): Process id.
+        interval (float, optional): Defaults to 1. Sample interval in seconds.
+    """
+
+    def __init__(self, pid, interval=1):
+        self.pid = pid
+        self.interval = interval
+        self.frame_usage = Usage()
+        self.task_usage = Usage()
+        self._processes = {}
+        self._last_io = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start sampling.  """
+
+        thread = threading.Thread(target=self._run, name='resource-sampler')
+        thread.daemon = True
+        thread.start()
+        self._thread = thread
+
+    def stop(self):
+        """Stop sampling.
+
+        Returns:
+            Usage: Usage of whole task.
+        """
+
+        self._stop.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join()
+        return self.task_usage
+
+    def mark_frame(self):
+        """Start usage of next frame.
+
+        Returns:
+            Usage: Usage since last mark.
+        """
+
+        with self._lock:
+            ret, self.frame_usage = self.frame_usage, Usage()
+        return ret
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                sample = self.sample()
+            except psutil.NoSuchProcess:
+                break
+            except psutil.Error:
+                LOGGER.debug('Sample failed.', exc_info=True)
+                continue
+            with self._lock:
+                self.frame_usage.add(sample)
+                self.task_usage.add(sample)
+
+    def _iter_processes(self):
+        root = self._processes.get(self.pid)
+        if root is None:
+            root = psutil.Process(self.pid)
+            self._processes[self.pid] = root
+        processes = [root]
+        try:
+            processes.extend(root.children(recursive=True))
+        except psutil.Error:
+            pass
+        for i in processes:
+            # Reuse process object to keep cpu percent state.
+            yield self._processes.setdefault(i.pid, i)
+
+    def sample(self):
+        """Current resource usage of process tree.
+
+        Returns:
+            dict: Sample data, io bytes are increment since last sample.
+        """
+
+        ret = dict(cpu=0.0, rss=0, threads=0, io_read=0, io_write=0)
+        alive = set()
+        for i in self._iter_processes():
+            try:
+                with i.oneshot():
+                    ret['cpu'] += i.cpu_percent(interval=None)
+                    ret['rss'] += i.memory_info().rss
+                    ret['threads'] += i.num_threads()
+                    io_counters = _io_counters(i)
+            except psutil.NoSuchProcess:
+                if i.pid == self.pid:
+                    raise
+                continue
+            alive.add(i.pid)
+            if io_counters is None:
+                continue
+            last = self._last_io.get(i.pid, (0, 0))
+            ret['io_read'] += io_counters[0] - last[0]
+            ret['io_write'] += io_counters[1] - last[1]
+            self._last_io[i.pid] = io_counters
+        for pid in set(self._processes) - alive:
+            self._processes.pop(pid, None)
+            self._last_io.pop(pid, None)
+        return ret
+
+
+def _io_counters(process):
+    try:
+        counters = process.io_counters()
+    except (AttributeError, psutil.AccessDenied):
+        # Not avaliable on macOS.
+        return None
+    return (counters.read_bytes, counters.write_bytes)
+
+
+def process_tree_rss(pid):
+    """Resident memory of a process and its children.
+
+    Args:
+        pid (int): Process id.
+
+    Returns:
+        int: Memory in bytes, 0 if process not exists.
+    """
+
+    ret = 0
+    for i in _process_tree(pid):
+        try:
+            ret += i.memory_info().rss
+        except psutil.Error:
+            continue
+    return ret
+
+
+def _process_tree(pid):
+    try:
+        root = psutil.Process(pid)
+        return [root] + root.children(recursive=True)
+    except psutil.Error:
+        return []
+
+
+def suspend_tree(pid):
+    """Suspend a process and its children.
+
+    Args:
+        pid (int): Process id.
+
+    Returns:
+        int: Suspended process count.
+    """
+
+    ret = 0
+    # Parent first, so it can not start new children.
+    for i in _process_tree(pid):
+        try:
+            i.suspend()
+            ret += 1
+        except psutil.Error:
+            LOGGER.debug('Suspend failed: %s', i, exc_info=True)
+    return ret
+
+
+def resume_tree(pid):
+    """Resume a process and its children.
+
+    Args:
+        pid (int): Process id.
+
+    Returns:
+        int: Resumed process count.
+    """
+
+    ret = 0
+    for i in reversed(_process_tree(pid)):
+        try:
+            i.resume()
+            ret += 1
+        except psutil.Error:
+            LOGGER.debug('Resume failed: %s', i, exc_info=True)
+    return ret
@@ -0,0 +1,175 @@
+# -*- coding=UTF-8 -*-
+"""Replay render history with scheduling policies.
+
+Each rendered file in `Frame` history becomes a job,
+render time is frame count multiply average frame cost.
+Jobs start at recorded first frame time, or all at once with `--arrival batch`.
+Policies see the estimate, use `--noise` to make it differ from render time.
+
+    python -m batchrender.render.simulate
+    python -m batchrender.render.simulate --slots 2 --arrival batch --noise 0.5
+"""
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import argparse
+import heapq
+import logging
+import math
+import random
+import time
+from collections import namedtuple
+
+from sqlalchemy import distinct, func
+
+from .. import database
+from . import policy as policy_
+
+LOGGER = logging.getLogger(__name__)
+
+Result = namedtuple('Result', ('policy', 'jobs', 'makespan', 'mean_wait',
+                               'max_wait', 'mean_turnaround', 'late'))
+
+
+def load_jobs(session, since=None, arrival='history', noise=0.0,
+              deadline_factor=None, seed=0):
+    """Jobs from render history.
+
+    Args:
+        session (Session): Database session.
+        since (float, optional): Defaults to None.
+            Only use frames rendered after this timestamp.
+        arrival (str, optional): Defaults to 'history'.
+            'history' for recorded start time, 'batch' for all at once.
+        noise (float, optional): Defaults to 0.
+            Standard deviation of log estimate error.
+        deadline_factor (float, optional): Defaults to None.
+            Give each job deadline at arrival + render time * factor.
+        seed (int, optional): Defaults to 0. Random seed for noise.
+
+    Returns:
+        tuple: (list[Job], dict render seconds by job key).
+    """
+
+    Frame = database.Frame
+    query = session.query(
+        Frame.file_hash,
+        func.count(distinct(Frame.frame)),
+        func.avg(Frame.cost),
+        func.min(Frame.timestamp),
+    ).group_by(Frame.file_hash)
+    if since is not None:
+        query = query.filter(Frame.timestamp >= since)
+
+    rows = [i for i in query.all() if i[1] and i[2] is not None]
+    rng = random.Random(seed)
+    first_start = min((i[3] - i[2] for i in rows), default=0)
+    jobs = []
+    durations = {}
+    for file_hash, frames, cost, timestamp in sorted(rows, key=lambda x: x[3]):
+        duration = frames * cost
+        start = first_start if arrival == 'batch' else timestamp - cost
+        estimate = duration
+        if noise:
+            estimate *= math.exp(rng.gauss(0, noise))
+        deadline = None
+        if deadline_factor:
+            deadline = start + duration * deadline_factor
+        jobs.append(policy_.Job(file_hash, 0, estimate, start, deadline))
+        durations[file_hash] = duration
+    return jobs, durations
+
+
+def simulate(jobs, durations, policy, slots=1):
+    """Replay jobs on render slots.
+
+    Args:
+        jobs (list[Job]): Jobs to render.
+        durations (dict): Render seconds by job key.
+        policy (Policy): Scheduling policy.
+        slots (int, optional): Defaults to 1. Concurrent render count.
+
+    Returns:
+        Result: Simulation result.
+    """
+
+    pending = sorted(jobs, key=lambda x: x.arrival)
+    pending.reverse()
+    if not pending:
+        return Result(policy.name, 0, 0.0, 0.0, 0.0, 0.0, 0)
+    waiting = []
+    running = []
+    now = first = pending[-1].arrival
+    waits = []
+    turnarounds = []
+    late = 0
+    while pending or waiting or running:
+        while pending and pending[-1].arrival <= now:
+            waiting.append(pending.pop())
+        while waiting and len(running) < slots:
+            job = policy.order(waiting, now)[0]
+            waiting.remove(job)
+            finish = now + durations[job.key]
+            heapq.heappush(running, (finish, id(job), job))
+            waits.append(now - job.arrival)
+            turnarounds.append(finish - job.arrival)
+            if job.deadline is not None and finish > job.deadline:
+                late += 1
+        events = [running[0][0]] if running else []
+        if pending:
+            events.append(pending[-1].arrival)
+        if not events:
+            break
+        now = max(now, min(events))
+        while running and running[0][0] <= now:
+            heapq.heappop(running)
+
+    return Result(
+        policy=policy.name,
+        jobs=len(waits),
+        makespan=now - first,
+        mean_wait=sum(waits) / len(waits),
+        max_wait=max(waits),
+        mean_turnaround=sum(turnarounds) / len(turnarounds),
+        late=late,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Compare scheduling policies on render history.')
+    parser.add_argument('--policy', action='append',
+                        choices=sorted(policy_.POLICIES),
+                        help='Policy to replay, can be repeated, defaults to all.')
+    parser.add_argument('--slots', type=int, default=1)
+    parser.add_argument('--days', type=float,
+                        help='Only replay history in recent days.')
+    parser.add_argument('--arrival', choices=('history', 'batch'),
+                        default='history')
+    parser.add_argument('--noise', type=float, default=0.0,
+                        help='Standard deviation of log estimate error.')
+    parser.add_argument('--deadline-factor', type=float,
+                        help='Deadline as multiple of render time after arrival.')
+    parser.add_argument('--database', help='Database uri, defaults to config.')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    if args.database:
+        database.core.setup(args.database)
+    since = time.time() - args.days * 86400 if args.days else None
+    with database.util.session_scope() as sess:
+        jobs, durations = load_jobs(sess, since, args.arrival, args.noise,
+                                    args.deadline_factor)
+    results = [simulate(jobs, durations, policy_.get(i), args.slots)
+               for i in args.policy or sorted(policy_.POLICIES)]
+    print('{:<10} {:>6} {:>12} {:>12} {:>12} {:>12} {:>6}'.format(
+        'policy', 'jobs', 'makespan', 'mean wait', 'max wait',
+        'turnaround', 'late'))
+    for i in results:
+        print('{0.policy:<10} {0.jobs:>6} {0.makespan:>12.1f} {0.mean_wait:>12.1f} '
+              '{0.max_wait:>12.1f} {0.mean_turnaround:>12.1f} {0.late:>6}'.format(i))
+
+
+if __name__ == '__main__':
+    main()
@@ -5,87 +5,280 @@ from __future__ import (absolute_import, division, print_function,
                         unicode_literals)
 
 import logging
+import time
+from functools import partial
 
 from PySide2.QtCore import QTimer, Signal
+from sqlalchemy.exc import SQLAlchemyError
 
-from . import core
-from .. import model
+from . import core, dependency, prefetch
+from .. import metrics, model
 from ..config import CONFIG
-from ..exceptions import AlreadyRendering
+from ..exceptions import (AlreadyCompleted, AlreadyRendering, DependencyHeld,
+                          ValidationFailed)
+from .admission import AdmissionController
+from .resource import process_tree_rss
 from .task import NukeTask
 
 LOGGER = logging.getLogger(__name__)
 
 
 class Slave(core.RenderObject):
-    """Render slave.  """
+    """Render slave, renders up to config `MAX_CONCURRENT` tasks at same time.
+
+    With config `PREEMPT`, a lower priority render is suspended
+    when a higher priority task is waiting, and resumed when a slot is free.
+    At most config `MAX_SUSPENDED` tasks that hold at most
+    config `SUSPENDED_MEMORY` (GB) can be suspended at same time.
+    """
 
-    _task = None
     task_stopped = Signal()
+    admission_interval = 5000
 
     def __init__(self, queue):
         super(Slave, self).__init__()
         self.is_rendering = False
         self.queue = queue
+        self.tasks = {}
+        self.suspended = []
+        self.members = []
+        self.admission = AdmissionController()
+        self._progress = {}
+        self._time_out_timers = {}
+        self._time_out_decisions = {}
+
+        # Check again when tasks wait for memory.
+        timer = QTimer(self)
+        timer.setSingleShot(True)
+        timer.setInterval(self.admission_interval)
+        timer.timeout.connect(self._fill)
+        self._admission_timer = timer
 
-        # Time out timer.
-        timer = QTimer()
+        # Wake up when failed tasks can retry.
+        timer = QTimer(self)
         timer.setSingleShot(True)
-        timer.timeout.connect(self.time_out)
-        self._time_out_timer = timer
+        timer.timeout.connect(self._fill)
+        self._retry_timer = timer
+
+        # Check waiting tasks for preemption when slots are full.
+        timer = QTimer(self)
+        timer.setInterval(self.admission_interval)
+        timer.timeout.connect(self._fill)
+        self._preempt_timer = timer
+
         self._task_signals = [
-            ('progressed', self.progressed),
+            ('started', self.on_task_started),
+            ('progressed', self.on_task_progressed),
             ('frame_finished', self.on_frame_finished),
-            ('finished', self._start_next),
+            ('finished', self.on_task_finished),
             ('stdout', self.stdout),
             ('stderr', self.stderr),
-            ('aborted', self.aborted),
-            ('stopped', self.task_stopped),
-            ('remains_changed', self.queue.update_remains),
+            ('aborted', self.on_task_aborted),
+            ('stopped', self.on_task_stopped),
+            ('remains_changed', self.on_task_remains_changed),
         ]
 
-        self.task_stopped.connect(self.on_task_stopped)
-
     @property
     def task(self):
-        """Current render task.  """
-
-        return self._task
-
-    @task.setter
-    def task(self, value):
-        assert value is None or isinstance(value, NukeTask), value
-
-        def _apply_on_signals(task, method):
-            if not isinstance(task, NukeTask):
+        """Render task in first slot.  """
+
+        if not self.tasks:
+            return None
+        return self.tasks[min(self.tasks)]
+
+    def _apply_on_signals(self, task, method):
+        for signal, slot in self._task_signals:
+            getattr(getattr(task, signal), method)(slot)
+
+    def _free_slot(self):
+        return next(i for i in range(len(self.tasks) + 1)
+                    if i not in self.tasks)
+
+    def _fill(self):
+        """Start tasks until slots are full or memory is not enough.  """
+
+        while self.is_rendering and not self.is_aborting:
+            slots = max(CONFIG['MAX_CONCURRENT'], 1) - len(self.tasks)
+            limit = max(slots, 0) * 2 + 8
+            if CONFIG['BATCH_COST'] > 0:
+                limit += max(slots, 0) * CONFIG['BATCH_SIZE']
+            candidates = list(self.queue.candidates(limit=limit))
+            if slots > 0 and self._resume_suspended(candidates):
+                continue
+            if slots <= 0:
+                if self._preempt(candidates):
+                    continue
                 return
-            for i in self._task_signals:
-                signal, slot = i
-                getattr(getattr(task, signal), method)(slot)
-
-        if value == self._task:
+            if not candidates:
+                delay = self.queue.retry_delay()
+                if delay is not None:
+                    if not self.tasks and not self._retry_timer.isActive():
+                        self.info('等待重试: {:.0f}秒'.format(delay))
+                    self._retry_timer.start(int(delay * 1000) + 1)
+                elif not self.tasks:
+                    self.finished.emit()
+                return
+            selected = self.admission.select(
+                candidates, list(self.tasks.values()), slots)
+            if not selected:
+                if slots > 0:
+                    self._admission_timer.start()
+                return
+            taken = set(i.path for i in selected)
+            for i in selected:
+                members = self.queue.batch_members(
+                    i, [j for j in candidates if j.path not in taken])
+                taken.update(j.path for j in members)
+                self._start_task(self.queue.render_task(i),
+                                 [self.queue.render_task(j) for j in members])
+            if CONFIG['PREFETCH_DIR'] and CONFIG['PREFETCH_TASKS'] > 0:
+                prefetch.prefetcher().put(
+                    [i.path for i in candidates if i.path not in taken]
+                    [:CONFIG['PREFETCH_TASKS']])
+
+    def _preempt(self, candidates):
+        """Suspend lowest priority task for first candidate.
+
+        Returns:
+            bool: Whether a task suspended.
+        """
+
+        if not CONFIG['PREEMPT'] or not candidates or not self.tasks:
+            return False
+        head = candidates[0]
+        victim = min(self.tasks.values(), key=lambda x: x.priority)
+        if head.priority <= victim.priority or victim.proc is None:
+            return False
+        if len(self.suspended) >= CONFIG['MAX_SUSPENDED']:
+            LOGGER.debug('Not preempt: suspended tasks reach limit.')
+            return False
+        held = sum(process_tree_rss(i.proc.pid) for i in self.suspended)
+        need = process_tree_rss(victim.proc.pid)
+        if held + need > CONFIG['SUSPENDED_MEMORY'] * 2 ** 30:
+            LOGGER.debug('Not preempt: suspended memory reach limit: %.2fGB',
+                         (held + need) / 2.0 ** 30)
+            return False
+        if not victim.suspend():
+            return False
+        self.info('优先渲染: {} (优先级 {}), 暂停 {} (优先级 {})'.format(
+            head.path, head.priority, victim.path, victim.priority))
+        metrics.PREEMPTIONS.inc()
+        slot = victim.slot
+        del self.tasks[slot]
+        self._progress.pop(slot, None)
+        self._stop_timeout_timer(slot)
+        self.suspended.append(victim)
+        metrics.SUSPENDED_TASKS.set(len(self.suspended))
+        return True
+
+    def _resume_suspended(self, candidates):
+        """Resume highest priority suspended task if no candidate is higher.
+
+        Returns:
+            bool: Whether a task resumed.
+        """
+
+        if not self.suspended:
+            return False
+        task = max(self.suspended, key=lambda x: x.priority)
+        if candidates and candidates[0].priority > task.priority:
+            return False
+        self.suspended.remove(task)
+        metrics.SUSPENDED_TASKS.set(len(self.suspended))
+        slot = self._free_slot()
+        task.slot = slot
+        self.tasks[slot] = task
+        task.resume()
+        self._start_timeout_timer(slot, task.time_outs.frame)
+        return True
+
+    def _start_task(self, task, members=()):
+        """Start a task in a free slot.
+
+        Args:
+            task (NukeTask): Task to start.
+            members (list[NukeTask], optional): Defaults to ().
+                Small tasks render in same nuke process, see `render.batch`.
+        """
+
+        assert isinstance(task, NukeTask)
+        slot = self._free_slot()
+        task.slot = slot
+        self.tasks[slot] = task
+        self._apply_on_signals(task, 'connect')
+        if not self._prepare(task):
             return
-        old = self._task
-        _apply_on_signals(value, 'connect')
-        self._task = value
-        _apply_on_signals(old, 'disconnect')
+        task.batch = []
+        for i in members:
+            i.slot = slot
+            self.members.append(i)
+            self._apply_on_signals(i, 'connect')
+            if self._prepare(i):
+                i.state |= model.core.DOING
+                task.batch.append(i)
+                self.queue.update_task(i)
+        task.run()
+        self.queue.update_task(task)
+
+    def _prepare(self, task):
+        """Prepare task for render, release it on failure.
+
+        Returns:
+            bool: Whether task can render.
+        """
 
-    def _start_next(self):
         try:
-            task = self.queue.get()
-            assert isinstance(task, NukeTask)
-            self.task = task
-            try:
-                task.start()
-            except AlreadyRendering:
-                task.state |= model.core.DISABLED
-                self.on_task_stopped()
-                self.info('任务可能正由其他进程渲染, 自动跳过')
-                self.info('如果想强制渲染请手动再次勾选此任务')
-                self._start_next()
-        except StopIteration:
-            self.task = None
-            self.finished.emit()
+            task.prepare()
+        except AlreadyRendering:
+            task.state |= model.core.DISABLED
+            self._release(task)
+            self.info('任务可能正由其他进程渲染, 自动跳过')
+            self.info('如果想强制渲染请手动再次勾选此任务')
+            return False
+        except ValidationFailed:
+            task.state |= model.core.DISABLED
+            self._release(task)
+            self.info('脚本检查未通过, 自动跳过')
+            return False
+        except AlreadyCompleted:
+            task.finish_completed()
+            self._release(task)
+            return False
+        except DependencyHeld:
+            self._release(task)
+            self.info('等待上游任务: {}'.format(task.path))
+            return False
+        except SQLAlchemyError:
+            LOGGER.error('Prepare task failed: %s', task.path, exc_info=True)
+            task.cleanup()
+            delay = max(CONFIG['RETRY_BACKOFF'], 1)
+            task.retry_time = time.time() + delay
+            self._release(task)
+            self.error('数据库出错, {:.0f}秒后重试: {}'.format(delay, task.path))
+            return False
+        return True
+
+    def _release(self, task):
+        if task in self.members:
+            self.members.remove(task)
+            self._apply_on_signals(task, 'disconnect')
+            self.admission.invalidate(task.file_hash)
+            return
+        if task in self.suspended:
+            # Process ended during suspended.
+            self.suspended.remove(task)
+            metrics.SUSPENDED_TASKS.set(len(self.suspended))
+            self._apply_on_signals(task, 'disconnect')
+            self.admission.invalidate(task.file_hash)
+            return
+        slot = task.slot
+        if self.tasks.get(slot) is not task:
+            return
+        del self.tasks[slot]
+        self._progress.pop(slot, None)
+        self._stop_timeout_timer(slot)
+        self._apply_on_signals(task, 'disconnect')
+        self.admission.invalidate(task.file_hash)
 
     def start(self):
         """Overridde.  """
@@ -94,24 +287,69 @@ class Slave(core.RenderObject):
             return
 
         self.started.emit()
-        self._start_next()
+        if CONFIG['PREEMPT']:
+            self._preempt_timer.start()
+        self._fill()
 
     def abort(self):
         """Abort rendering.  """
 
         self.is_aborting = True
-        task = self.task
-        if isinstance(task, NukeTask):
-            task.abort()
+        self._admission_timer.stop()
+        self._retry_timer.stop()
+        self._preempt_timer.stop()
+        if not self.tasks and not self.suspended:
+            self.aborted.emit()
+            return
+        for i in list(self.tasks.values()) + self.suspended:
+            i.abort()
+
+    def on_task_started(self):
+        task = self.sender()
+        if isinstance(task, NukeTask) and task.slot in self.tasks:
+            # Restart for each script in a batch.
+            self._start_timeout_timer(task.slot, task.time_outs.first_frame)
 
     def on_task_stopped(self):
         LOGGER.debug('Task stopped')
-        self._stop_timeout_timer()
+        task = self.sender()
+        if isinstance(task, NukeTask):
+            self._stop_timeout_timer(task.slot)
+            self.queue.update_task(task)
+        self.task_stopped.emit()
+
+    def on_task_finished(self):
+        task = self.sender()
+        if isinstance(task, NukeTask):
+            self._release(task)
+            if (task.is_recycling
+                    and self.is_rendering
+                    and not self.is_aborting):
+                # Restart process before other tasks take the slot.
+                self._start_task(task)
+        self._fill()
+
+    def on_task_aborted(self):
+        task = self.sender()
+        if isinstance(task, NukeTask):
+            self._release(task)
+        if not self.is_aborting:
+            # Aborted by time out.
+            self._fill()
+        elif not self.tasks and not self.suspended:
+            self.aborted.emit()
+
+    def on_task_progressed(self, value):
+        task = self.sender()
+        if isinstance(task, NukeTask):
+            self._progress[task.slot] = value
+        if self._progress:
+            value = sum(self._progress.values()) / len(self._progress)
+        self.progressed.emit(int(value))
 
     def on_started(self):
         LOGGER.debug('Render start')
         self.is_rendering = True
-        self._start_timeout_timer()
 
     def on_aborted(self):
         LOGGER.debug('Render aborted.')
@@ -120,33 +358,64 @@ class Slave(core.RenderObject):
         LOGGER.debug('Render stopped.')
         self.is_rendering = False
         self.is_aborting = False
-        self.task = None
+        self._admission_timer.stop()
+        self._retry_timer.stop()
+        self._preempt_timer.stop()
+        for i in list(self.tasks.values()) + self.suspended + self.members:
+            self._release(i)
 
     def on_finished(self):
         LOGGER.debug('Render finished.')
+        LOGGER.debug('Queue diagnostics: %s', self.queue.diagnostics())
 
     def on_time_out(self):
-        task = self.task
+        LOGGER.debug('Render time out.')
+
+    def _on_slot_time_out(self, slot):
+        task = self.tasks.get(slot)
         if isinstance(task, NukeTask):
-            task.priority -= 1
-            task.abort()
+            decision = self._time_out_decisions[slot]
+            LOGGER.warning('Render time out: %s: %s', task.path, decision)
+            self.error('{}: 渲染超时 {:.0f}秒 ({})'.format(
+                task.path, decision.seconds, decision.source))
+            self.time_out.emit()
+            task.abort(is_time_out=True)
+
+    def on_task_remains_changed(self):
+        task = self.sender()
+        if isinstance(task, NukeTask):
+            self.queue.update_task(task)
 
     def on_frame_finished(self, payload):
         # Restart timeout timer.
 
+        task = self.sender()
+        if not isinstance(task, NukeTask):
+            return
         frame = payload['frame']
         total = payload['total']
 
-        self._stop_timeout_timer()
+        self._stop_timeout_timer(task.slot)
         if frame != total:
-            self._start_timeout_timer()
-
-    def _start_timeout_timer(self):
-        time_out = CONFIG['TIME_OUT']
-        if time_out > 0:
-            self._time_out_timer.start(time_out * 1000)
-
-    def _stop_timeout_timer(self):
-        timer = self._time_out_timer
-        if timer.isActive():
+            self._start_timeout_timer(task.slot, task.time_outs.frame)
+        if (dependency.is_enabled()
+                and len(self.tasks) < max(CONFIG['MAX_CONCURRENT'], 1)):
+            # Upstream frame may release a held task.
+            self._fill()
+
+    def _start_timeout_timer(self, slot, decision):
+        if decision.seconds <= 0:
+            return
+        timer = self._time_out_timers.get(slot)
+        if timer is None:
+            timer = QTimer(self)
+            timer.setSingleShot(True)
+            timer.timeout.connect(partial(self._on_slot_time_out, slot))
+            self._time_out_timers[slot] = timer
+        self._time_out_decisions[slot] = decision
+        timer.start(int(decision.seconds * 1000))
+
+    def _stop_timeout_timer(self, slot):
+        timer = self._time_out_timers.get(slot)
+        if timer and timer.isActive():
             timer.stop()
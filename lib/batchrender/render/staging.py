@@ -0,0 +1,283 @@
+# -*- coding=UTF-8 -*-
+"""Stage render outputs on local scratch directory.
+
+With config `STAGING_DIR`, Write nodes of frame sequence in render tempfile
+are redirected to a directory under it, nuke writes to fast local disk.
+A background mover copies each written file to the original path,
+at most config `STAGING_BANDWIDTH` MB/s for all tasks (0 for unlimited),
+then verifies size and checksum before removing the staged file.
+Output is recorded and frame journal updated only after verified,
+render process end waits all moves.
+"""
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import hashlib
+import io
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+
+from PySide2.QtCore import QObject, Signal
+from six.moves import queue
+
+from .. import script
+from ..codectools import get_unicode as u
+from ..config import CONFIG
+
+LOGGER = logging.getLogger(__name__)
+
+CHUNK_SIZE = 2 ** 20
+MAX_RETRY = 2
+
+
+def _normpath(path):
+    return os.path.normpath(u(path)).replace('\\', '/')
+
+
+def _key(path):
+    # For comparison only, normcase lowers path on windows.
+    return os.path.normcase(_normpath(path))
+
+
+def _checksum(path):
+    ret = hashlib.md5()
+    with io.open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            ret.update(chunk)
+    return ret.hexdigest()
+
+
+def copy(src, dst, bandwidth=0):
+    """Copy file with bandwidth limit, replace destination when completed.
+
+    Args:
+        src (str): Source path.
+        dst (str): Destination path.
+        bandwidth (float, optional): Defaults to 0. Bytes per second, 0 for unlimited.
+
+    Returns:
+        tuple: (size, md5 hex digest) of copied data.
+    """
+
+    try:
+        os.makedirs(os.path.dirname(dst))
+    except OSError:
+        pass
+    tmp = dst + '.part'
+    digest = hashlib.md5()
+    size = 0
+    start = time.time()
+    with io.open(src, 'rb') as f_src, io.open(tmp, 'wb') as f_dst:
+        for chunk in iter(lambda: f_src.read(CHUNK_SIZE), b''):
+            f_dst.write(chunk)
+            digest.update(chunk)
+            size += len(chunk)
+            if bandwidth:
+                delay = size / bandwidth - (time.time() - start)
+                if delay > 0:
+                    time.sleep(delay)
+    if os.path.exists(dst):
+        os.remove(dst)
+    os.rename(tmp, dst)
+    return size, digest.hexdigest()
+
+
+def move(src, dst, bandwidth=0):
+    """Move file, source is removed only after destination verified.
+
+    Args:
+        src (str): Source path.
+        dst (str): Destination path.
+        bandwidth (float, optional): Defaults to 0. Bytes per second, 0 for unlimited.
+
+    Returns:
+        str: Error message, None if succeed.
+    """
+
+    error = None
+    for _ in range(MAX_RETRY + 1):
+        try:
+            size, digest = copy(src, dst, bandwidth)
+            if os.path.getsize(dst) != size or size != os.path.getsize(src):
+                error = '大小不一致'
+                continue
+            if _checksum(dst) != digest:
+                error = '校验和不一致'
+                continue
+            os.remove(src)
+            return None
+        except (IOError, OSError) as ex:
+            LOGGER.warning('Move failed: %s -> %s', src, dst, exc_info=True)
+            error = u(str(ex))
+    return error
+
+
+class Mover(QObject):
+    """Background mover shared by all tasks, so bandwidth limit is global.  """
+
+    finished = Signal(dict)
+
+    def __init__(self):
+        super(Mover, self).__init__()
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def put(self, job):
+        """Add a move job.
+
+        Args:
+            job (dict): Has `src` and `dst`, emitted back with `error` by `finished`.
+        """
+
+        self._queue.put(job)
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            thread = threading.Thread(target=self._run, name='output-mover')
+            thread.daemon = True
+            thread.start()
+            self._thread = thread
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            try:
+                job['error'] = move(job['src'], job['dst'],
+                                    CONFIG['STAGING_BANDWIDTH'] * 2 ** 20)
+            except Exception as ex:  # pylint: disable=broad-except
+                LOGGER.error('Move output failed.', exc_info=True)
+                job['error'] = u(str(ex))
+            finally:
+                self._queue.task_done()
+            self.finished.emit(job)
+
+
+_MOVER = []
+
+
+def mover():
+    """Shared mover.  """
+
+    if not _MOVER:
+        _MOVER.append(Mover())
+    return _MOVER[0]
+
+
+class Stager(QObject):
+    """Staged outputs of a render task.
+
+    Args:
+        root (str): Staging directory for this task.
+    """
+
+    moved = Signal(dict)
+    idle = Signal()
+
+    def __init__(self, root):
+        super(Stager, self).__init__()
+        self.root = os.path.abspath(root)
+        self._token = uuid.uuid4().hex
+        self.dirs = {}
+        self.pending = 0
+        self.failed = []
+        mover().finished.connect(self.on_move_finished)
+
+    def remap(self, path, cwd):
+        """Redirect Write nodes of a script to staging directory.
+
+        Args:
+            path (str): Script path, modified in place.
+            cwd (str): Directory relative paths based on.
+
+        Returns:
+            int: Redirected Write node count.
+        """
+
+        def _remap(value):
+            if not value or '[' in value or '{' in value:
+                # Expression, can not know where it goes.
+                return None
+            dirname, basename = os.path.split(value)
+            if not re.search(r'%0?\d*d|#', basename):
+                # Container format like mov is written across frames.
+                return None
+            final = _normpath(os.path.join(cwd, dirname))
+            staged = self.dirs_by_final.get(_key(final))
+            if staged is None:
+                staged = _normpath(os.path.join(self.root, str(len(self.dirs))))
+                self.dirs[staged] = final
+            return '{}/{}'.format(staged, basename)
+
+        with io.open(path, encoding='utf-8') as f:
+            text = f.read()
+        text = script.remap_writes(text, _remap)
+        with io.open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        return len(self.dirs)
+
+    @property
+    def dirs_by_final(self):
+        """Staged directory by final directory key.  """
+
+        return {_key(v): k for k, v in self.dirs.items()}
+
+    def final_path(self, path):
+        """Final path of a staged file.
+
+        Returns:
+            str: Final path, None if not a staged file.
+        """
+
+        dirname, basename = os.path.split(_normpath(path))
+        final = {_key(k): v for k, v in self.dirs.items()}.get(_key(dirname))
+        if final is None:
+            return None
+        return '{}/{}'.format(final, basename)
+
+    def submit(self, payload):
+        """Move staged output in background.
+
+        Args:
+            payload (dict): Output payload from handler.
+
+        Returns:
+            bool: Whether submitted, False if not a staged file.
+        """
+
+        src = payload['path']
+        dst = self.final_path(src)
+        if dst is None:
+            return False
+        self.pending += 1
+        mover().put(dict(payload, src=src, dst=dst, stager=self._token))
+        return True
+
+    def on_move_finished(self, job):
+        if job.get('stager') != self._token:
+            return
+        self.pending -= 1
+        error = job.get('error')
+        if error:
+            LOGGER.error('Move output failed: %s -> %s: %s',
+                         job['src'], job['dst'], error)
+            self.failed.append('{}: {}'.format(job['dst'], error))
+        else:
+            payload = {k: v for k, v in job.items()
+                       if k not in ('src', 'dst', 'stager', 'error')}
+            payload['path'] = job['dst']
+            self.moved.emit(payload)
+        if not self.pending:
+            self.idle.emit()
+
+    def clean(self):
+        """Remove staging directory, moved files are already removed.  """
+
+        mover().finished.disconnect(self.on_move_finished)
+        shutil.rmtree(self.root, ignore_errors=True)
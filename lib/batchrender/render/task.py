@@ -4,6 +4,7 @@
 from __future__ import (absolute_import, division, print_function,
                         unicode_literals)
 
+import io
 import logging
 import os
 import sys
@@ -14,13 +15,16 @@ import pendulum
 import six
 from PySide2.QtCore import Signal
 
-from .. import database, model, texttools
+from .. import database, events, metrics, model, texttools
 from ..codectools import get_encoded as e
 from ..codectools import get_unicode as u
 from ..config import CONFIG
-from ..exceptions import AlreadyRendering
+from ..exceptions import (AlreadyCompleted, AlreadyRendering, DependencyHeld,
+                          ValidationFailed)
+from ..framerange import FrameRange
 from ..threadtools import run_async
-from . import core
+from . import (batch, core, failure, journal, prefetch, progressive, recycle,
+               resource, staging, timeout, timing, tuning, validation)
 from .proc_handler import NukeHandler
 
 LOGGER = logging.getLogger(__name__)
@@ -34,7 +38,7 @@ class NukeTask(model.Task, core.RenderObject):
     frame_finished = Signal(dict)
     process_finished = Signal(int)
 
-    max_retry = 3
+    slot = 0
     # Signals.
 
     changed = Signal()
@@ -59,20 +63,76 @@ class NukeTask(model.Task, core.RenderObject):
         self._last_timestamp_time = None
         self._frames_records = []
         self._output_records = []
+        self._resource_records = []
         self._last_commit_time = None
-
+        self.timer = timing.PhaseTimer()
+        self.sampler = None
+        self.settings = None
+        self.time_outs = None
+        self.journal = None
+        self.smoke_frames = None
+        self.pass_frames = None
+        self.upstream_frames = None
+        self.release_frames = None
+        self.batch = []
+        self._entries = []
+        self._entry = None
+        self._entry_results = {}
+        self._driver = None
+        self.leader = None
+        self.recycler = recycle.Recycler()
+        self.is_recycling = False
+        self.stager = None
+        self.prefetch = None
+        self._finish_retcode = None
+        self.is_suspended = False
+        self._suspend_time = None
+        self._suspended_cost = 0.0
+        self.classifier = failure.Classifier()
+        self._is_time_out = False
+
+        self.remains_changed.connect(self.on_changed)
         self.frame_finished.connect(self.on_frame_finished)
         self.process_finished.connect(self.on_process_finished)
 
+    @classmethod
+    def from_record(cls, record):
+        """Create render task from a task record.  """
+
+        assert isinstance(record, model.Task), type(record)
+        return cls(record.index, record.model)
+
+    @property
+    def is_locked(self):
+        """Whether task is used by render, from prepare until finished.  """
+
+        proc = self.proc
+        return bool(self.state & model.DOING
+                    or self._tempfile
+                    or self.is_suspended
+                    or (proc is not None and proc.poll() is None))
+
     def __eq__(self, other):
         if isinstance(other, model.Task):
             other = other.path
         return self.path == other
 
-    def abort(self):
-        """Abort rendering.  """
+    def abort(self, is_time_out=False):
+        """Abort rendering.
+
+        Args:
+            is_time_out (bool, optional): Defaults to False.
+                Whether abort is caused by time out, counted as render error.
+        """
 
         self.is_aborting = True
+        self._is_time_out = is_time_out and self._entry_task() is self
+        for index, task in enumerate(self.batch):
+            if index not in self._entry_results:
+                task.is_aborting = True
+                task._is_time_out = is_time_out and index == self._entry
+        # Terminate signal is not handled by stopped process.
+        self.resume()
         self.state &= ~model.DOING
         proc = self.proc
         if proc is not None:
@@ -80,16 +140,70 @@ class NukeTask(model.Task, core.RenderObject):
             proc.terminate()
             proc.wait()
 
+    def suspend(self):
+        """Suspend render process tree.
+
+        Returns:
+            bool: Whether suspended.
+        """
+
+        proc = self.proc
+        if self.is_suspended or proc is None or proc.poll() is not None:
+            return False
+        resource.suspend_tree(proc.pid)
+        self.is_suspended = True
+        self._suspend_time = time.time()
+        self.timer.begin(timing.SUSPENDED)
+        self.info('暂停渲染: {}'.format(self.path))
+        self._emit_event(events.SUSPENDED, priority=self.priority)
+        return True
+
+    def resume(self):
+        """Resume suspended render process tree.
+
+        Returns:
+            float: Suspended seconds, None if not suspended.
+        """
+
+        if not self.is_suspended:
+            return None
+        resource.resume_tree(self.proc.pid)
+        self.is_suspended = False
+        cost = time.time() - self._suspend_time
+        self._suspended_cost += cost
+        self.timer.end(timing.SUSPENDED)
+        metrics.SUSPENDED_SECONDS.inc(cost)
+        self.info('继续渲染: {} 暂停了 {:.0f}秒'.format(self.path, cost))
+        self._emit_event(events.RESUMED, cost=cost)
+        return cost
+
+    def on_estimate_changed(self):
+        self.changed.emit()
+
     def reset(self):
         """Reset this task.  """
 
         self.state &= model.DOING
         self.error_count = 0
+        self.error_counts = None
+        self.retry_time = None
 
     def handle_output(self, proc):
         """handle process output."""
 
-        handler = NukeHandler(proc)
+        if self.batch:
+            handler = batch.BatchHandler(
+                proc, [i.classifier for i in self._entries])
+            handler.stdout.connect(self.on_entry_stdout)
+            handler.stderr.connect(self.on_entry_stderr)
+            handler.frame_finished.connect(self.on_entry_frame_finished)
+            handler.output_updated.connect(self.on_entry_output_updated)
+            handler.entry_started.connect(self.on_entry_started)
+            handler.entry_finished.connect(self.on_entry_finished)
+            handler.start()
+            return
+
+        handler = NukeHandler(proc, self.classifier)
         handler.stdout.connect(self.stdout)
         handler.stderr.connect(self.stderr)
         handler.frame_finished.connect(self.frame_finished)
@@ -99,48 +213,218 @@ class NukeTask(model.Task, core.RenderObject):
     def start(self):
         """Start rendering.  """
 
+        self.prepare()
+        self.run()
+
+    def run(self):
+        """Start render process for prepared task.  """
+
+        self.start_process()
+        self.started.emit()
+
+    def prepare(self):
+        """Prepare files and settings before render process.  """
+
         self.start_time = time.time()
         self.is_aborting = False
+        is_restart, self.is_recycling = self.is_recycling, False
+        self.leader = None
+        self._is_time_out = False
+        self._suspended_cost = 0.0
+        self.classifier = failure.Classifier()
+        self.timer = timing.PhaseTimer(self.slot)
+        self.timer.begin(timing.TASK)
 
         with database.util.session_scope() as sess:
-            self.update_file(sess)
+            with self.timer.phase(timing.HASH):
+                self.update_file(sess)
             if self.file.is_rendering():
                 raise AlreadyRendering
-            self._tempfile = self.file.create_tempfile()
             self._filehash = self.file.hash
-
-        self.start_process()
-        self.started.emit()
+            self.timer.file_hash = self._filehash
+            if CONFIG['VALIDATE']:
+                with self.timer.phase(timing.VALIDATE):
+                    self._validate()
+            self._resume()
+            self.recycler.start(len(self.journal.completed()), is_restart)
+            self.release_frames = None
+            if self.upstream_frames is not None:
+                self._prepare_release()
+            with self.timer.phase(timing.TEMPFILE):
+                self._tempfile = self.file.create_tempfile()
+            self.stager = None
+            if CONFIG['STAGING_DIR']:
+                self._prepare_staging()
+            self.prefetch = None
+            if CONFIG['PREFETCH_DIR']:
+                with self.timer.phase(timing.PREFETCH):
+                    self._prepare_prefetch()
+            self.smoke_frames = None
+            if (CONFIG['VALIDATE'] > 1
+                    and not self.release_frames
+                    and not validation.is_validated(self._filehash)):
+                self._prepare_smoke_test()
+            self.pass_frames = None
+            if (CONFIG['PROGRESSIVE'] > 1
+                    and not self.smoke_frames
+                    and not self.release_frames):
+                self._prepare_pass()
+            self.time_outs = timeout.decide(sess, self._filehash, self.path)
+            # Progress only scales it, so no database access during render.
+            self._update_estimate(sess)
+            self.settings = None
+            if CONFIG['AUTO_TUNE']:
+                self.settings = tuning.choose(
+                    sess, self._filehash, explore=CONFIG['AUTO_TUNE'] > 1)
+                self.info('自动调优({0.reason}): 线程 {0.threads}, '
+                          '内存限制 {0.memory_limit:.2f}GB'.format(self.settings))
 
     @run_async
     def start_process(self):
         """Start render process.  """
 
-        proc = nuke_process(self._tempfile, self.range)
+        overrides = self.settings.overrides() if self.settings else None
+        with self.timer.phase(timing.SPAWN):
+            if self.batch:
+                proc = self._batch_process(overrides)
+            else:
+                proc = nuke_process(
+                    self._tempfile, self._render_range(), overrides)
+        self.timer.begin(timing.FIRST_FRAME)
         self.proc = proc
+        for i in self.batch:
+            i.proc = proc
+            i.leader = self
+        if CONFIG['SAMPLE_INTERVAL'] > 0 and not self.batch:
+            # Sampler can not tell scripts apart in a batch.
+            self.sampler = resource.ResourceSampler(
+                proc.pid, CONFIG['SAMPLE_INTERVAL'])
+            self.sampler.start()
         self.handle_output(proc)
         self.info(
             '执行任务: {0.path} 优先级:{0.priority} pid: {1}'.format(self, proc.pid))
         self.process_finished.emit(proc.wait())
 
+    def _batch_process(self, overrides):
+        self._entries = self.batch + [self]
+        self._entry = None
+        self._entry_results = {}
+        self._driver = self._tempfile + '.batch.py'
+        with io.open(self._driver, 'w', encoding='utf-8') as f:
+            f.write(batch.driver_script(
+                [(i._tempfile, i._render_range())  # pylint: disable=protected-access
+                 for i in self._entries],
+                CONFIG['PROXY'], CONFIG['CONTINUE']))
+        self.info('批量渲染: {} 个文件'.format(len(self._entries)))
+        return batch_process(self._driver, overrides)
+
+    def _entry_task(self, index=None):
+        """Task of batch entry, defaults to current entry.  """
+
+        index = self._entry if index is None else index
+        if index is None or not self.batch:
+            return self
+        return self._entries[index]
+
+    def on_entry_started(self, index):
+        self._entry = index
+        task = self._entry_task(index)
+        task.start_time = time.time()
+        task.timer.begin(timing.FIRST_FRAME)
+        if task is not self:
+            task.started.emit()
+
+    def on_entry_finished(self, index, retcode):
+        self._entry_results[index] = retcode
+        task = self._entry_task(index)
+        if task is not self:
+            task.process_finished.emit(retcode)
+
+    def on_entry_stdout(self, text):
+        self._entry_task().stdout.emit(text)
+
+    def on_entry_stderr(self, text):
+        self._entry_task().stderr.emit(text)
+
+    def on_entry_frame_finished(self, data):
+        self._entry_task(data['entry']).frame_finished.emit(data)
+
+    def on_entry_output_updated(self, payload):
+        self._entry_task(payload['entry']).on_output_updated(payload)
+
+    def _finish_batch(self, retcode):
+        """Finish entries without end marker.
+
+        Args:
+            retcode (int): Process exit code.
+
+        Returns:
+            int: Exit code for this task's own entry.
+        """
+
+        for index, task in enumerate(self.batch):
+            if index in self._entry_results:
+                continue
+            if index != self._entry:
+                # Not reached, render again later without error.
+                task.is_aborting = True
+            task.process_finished.emit(retcode or 1)
+        own = len(self.batch)
+        if own in self._entry_results:
+            return self._entry_results[own]
+        if self._entry != own:
+            self.is_aborting = True
+        return retcode or 1
+
     def on_process_finished(self, retcode):
+        if self.stager and self.stager.pending:
+            if self._finish_retcode is None:
+                self.info('等待 {} 个输出移动完成'.format(self.stager.pending))
+                self.timer.begin(timing.STAGING)
+            self._finish_retcode = retcode
+            return
+        if self.batch:
+            retcode = self._finish_batch(retcode)
+        self.resume()
+        self.timer.begin(timing.TEARDOWN)
+        if self.sampler:
+            self._add_resource_record(None, self.sampler.stop())
+            self.sampler = None
         self.info('渲染进程结束: ' + '退出码: {}'.format(retcode)
                   if retcode else '正常退出')
 
+        if not self.is_recycling:
+            self.recycler.finish()
         with database.util.session_scope() as sess:
             self.update_file(sess, is_recreate=False)
             if self.is_aborting:
                 self.info('中途终止进程 pid: {}'.format(self.proc.pid))
+                if self._is_time_out:
+                    self._handle_render_error(retcode)
             elif self.file.hash != self._filehash:
                 self.info('文件有更改, 重新加入队列.')
+            elif self.is_recycling:
+                self.info('重启渲染进程, 从下一个未渲染帧继续')
             elif retcode:
-                self._handle_render_error()
+                self._handle_render_error(retcode)
+            elif self.stager and self.stager.failed:
+                self._handle_staging_error()
+            elif self.smoke_frames:
+                self._handle_smoke_test()
+            elif self.pass_frames:
+                self._handle_pass()
+            elif self.release_frames:
+                self._handle_release()
             else:
                 self._handle_normal_ext()
 
-        self._try_remove_tempfile()
+        self.cleanup()
+        if self.state & model.FINISHED:
+            self.journal.remove()
         self.state &= ~model.DOING
+        self.batch = []
         self._commit_records()
+        self.timer.end(timing.TEARDOWN)
         if self.is_aborting:
             self.aborted.emit()
         else:
@@ -153,16 +437,29 @@ class NukeTask(model.Task, core.RenderObject):
                                        data['cost'],
                                        data['current'],
                                        data['total'])
-        if current == 1:
+        if self._suspended_cost:
+            # Frame cost without suspended time.
+            cost = max(cost - self._suspended_cost, 0.0)
+            self._suspended_cost = 0.0
+        self.timer.end(timing.FIRST_FRAME)
+        metrics.on_frame_finished(cost)
+        self._emit_event(events.FRAME_FINISHED, frame=frame, cost=cost,
+                         current=current, total=total)
+        if current == 1 and not self.smoke_frames:
             first_frame = frame
             last_frame = first_frame + total - 1
-            self.frames = total
+            if self.range:
+                # Range may have holes after resume.
+                last_frame = max(last_frame, max(self.range))
+            self.frames = (len(self.range)
+                           if self.pass_frames or self.release_frames
+                           else total)
 
             with database.util.session_scope() as sess:
-                self.update_file(sess, is_recreate=False)
+                # Frame count is known now, also updates file record.
+                self._update_estimate(sess)
                 self._update_file_range(first_frame, last_frame)
-                self._set_state(model.PARTIAL,
-                                self.range != self.file.range())
+                self._set_state(model.PARTIAL, self._is_partial())
 
         self.progressed.emit(current * 100 / total)
         self._info_timestamp()
@@ -173,37 +470,90 @@ class NukeTask(model.Task, core.RenderObject):
             cost=cost,
             timestamp=time.time())
         self._frames_records.append(frame_record)
+        if self.sampler:
+            self._add_resource_record(frame, self.sampler.mark_frame())
+        self.recycler.add_frame(cost)
+        if current < total:
+            self._check_recycle(frame)
         if not self._last_commit_time or time.time() - self._last_commit_time > 5:
             self._commit_records()
 
     def _commit_records(self):
         records, self._frames_records = self._frames_records, []
+        self.timer.begin(timing.COMMIT)
         with database.util.session_scope() as sess:
             self.update_file(sess, is_recreate=False)
             sess.bulk_insert_mappings(database.Frame, records)
+            sess.bulk_insert_mappings(database.Phase, self.timer.pop_records())
+            resource_records, self._resource_records = self._resource_records, []
+            sess.bulk_insert_mappings(database.Resource, resource_records)
+            sess.bulk_insert_mappings(database.Recycle,
+                                      self.recycler.pop_records())
             while self._output_records:
                 output_record = sess.merge(
                     database.Output(**self._output_records.pop(0)))
                 output_record.files.append(self.file)
+            sess.flush()
+            self.model.update_file_stats(self.file)
+        self.timer.end(timing.COMMIT)
         self._last_commit_time = time.time()
 
     def on_started(self):
         self.state |= model.DOING
         self._info_timestamp()
+        self._emit_event(events.STARTED, range=six.text_type(self._render_range() or ''),
+                         priority=self.priority)
+
+    def on_aborted(self):
+        self._emit_event(events.ABORTED,
+                         cost=time.time() - self.start_time)
+
+    def on_stopped(self):
+        self.timer.end(timing.TASK)
+        with database.util.session_scope() as sess:
+            sess.bulk_insert_mappings(database.Phase, self.timer.pop_records())
+            summary = database.Phase.summary(
+                sess, file_hash=self._filehash, since=self.start_time)
+            usage = database.Resource.summary(
+                sess, file_hash=self._filehash, since=self.start_time)
+            tuning_record = None
+            if self.settings:
+                tuning_record = tuning.record(
+                    sess, self.timer.run, self._filehash, self.settings,
+                    since=self.start_time).serialize()
+        self.info('阶段耗时: {}'.format(', '.join(
+            '{}: {:.1f}s'.format(k, v['total']) for k, v in summary.items())))
+        if usage['runs']:
+            self.info('资源占用: CPU 平均 {:.0f}% 峰值 {:.0f}%, 内存峰值 {:.2f}GB, '
+                      '读取 {:.1f}MB, 写入 {:.1f}MB, 线程 {}'.format(
+                          usage['cpu_average'] or 0,
+                          usage['cpu_max'] or 0,
+                          (usage['rss_peak'] or 0) / 2.0 ** 30,
+                          (usage['io_read'] or 0) / 2.0 ** 20,
+                          (usage['io_write'] or 0) / 2.0 ** 20,
+                          usage['threads']))
+        if tuning_record and tuning_record['frame_cost']:
+            self.info('调优结果: 平均帧耗时 {:.2f}s{}'.format(
+                tuning_record['frame_cost'],
+                ', 加速 {:.2f} 倍'.format(tuning_record['speedup'])
+                if tuning_record['speedup'] else ''))
 
     def on_progressed(self, value):
-        now = time.clock()
+        now = time.perf_counter()
         if (self.last_progress_time
                 and now - self.last_progress_time < self.min_progress_interval):
             return
 
         self.last_progress_time = now
-        with database.util.session_scope() as sess:
-            self._update_estimate(sess)
         self.remains = (1.0 - value / 100.0) * self.estimate
+        self.remains_changed.emit(self.remains)
 
     def on_finished(self):
-        if self.is_aborting:
+        if (self.is_aborting
+                or self.is_recycling
+                or self.smoke_frames
+                or self.pass_frames
+                or self.release_frames):
             return
         now = time.time()
         cost = now - self.start_time
@@ -212,12 +562,18 @@ class NukeTask(model.Task, core.RenderObject):
             self.update_file(sess, is_recreate=False)
             self.file.last_finish_time = now
             self.file.last_cost = cost
+        self._emit_event(events.FINISHED, cost=cost, state=self.state)
 
         self.info('{}: 结束渲染 耗时 {}'.format(
             self.path,
             pendulum.duration(seconds=cost).in_words()))
 
     def on_output_updated(self, payload):
+        if self.stager and self.stager.submit(payload):
+            return
+        self._record_output(payload)
+
+    def _record_output(self, payload):
         path = payload['path']
         frame = payload['frame']
 
@@ -227,15 +583,114 @@ class NukeTask(model.Task, core.RenderObject):
             frame=frame,
         )
         self._output_records.append(record)
+        self.journal.add(frame, os.path.join(CONFIG['DIR'], path))
+        self._emit_event(events.OUTPUT, path=path, frame=frame)
+
+    def _check_recycle(self, frame):
+        """Restart render process when frames or memory over limit.  """
+
+        proc = self.proc
+        if (self.batch or self.leader or self.is_aborting or self.is_suspended
+                or proc is None or proc.poll() is not None):
+            # Process is shared or stopping.
+            return
+        rss = None
+        if CONFIG['RECYCLE_MEMORY']:
+            rss = resource.process_tree_rss(proc.pid)
+        reason = self.recycler.check(rss, len(self.journal.completed()))
+        if not reason:
+            return
+        self.is_recycling = True
+        record = self.recycler.recycle(
+            reason,
+            run=self.timer.run,
+            file_hash=self._filehash,
+            timestamp=time.time(),
+            frame=frame,
+            rss=rss)
+        metrics.RECYCLES.inc(reason=reason)
+        self.info('回收渲染进程({}): 已渲染 {} 帧{}'.format(
+            recycle.LABELS[reason], record['frames'],
+            ', 内存 {:.2f}GB'.format(rss / 2.0 ** 30) if rss else ''))
+        self._emit_event(events.RECYCLED, reason=reason,
+                         frames=record['frames'], rss=rss,
+                         cost_before=record['cost_before'])
+        proc.terminate()
+
+    def _prepare_staging(self):
+        """Redirect outputs to local staging directory.  """
+
+        stager = staging.Stager(os.path.join(
+            CONFIG['STAGING_DIR'], self.file.filename_with_hash()))
+        if not stager.remap(self._tempfile, CONFIG['DIR']):
+            stager.clean()
+            return
+        stager.moved.connect(self._record_output)
+        stager.idle.connect(self._on_staging_idle)
+        self.stager = stager
+        self.info('输出暂存到: {}'.format(stager.root))
+
+    def _prepare_prefetch(self):
+        """Redirect inputs to prefetched cache.  """
 
-    def _handle_render_error(self):
+        stats = prefetch.cache().remap(self._tempfile, CONFIG['DIR'])
+        if not stats.hits and not stats.misses:
+            return
+        self.prefetch = stats
+        metrics.PREFETCH_FILES.inc(stats.hits, result='hit')
+        metrics.PREFETCH_FILES.inc(stats.misses, result='miss')
+        metrics.PREFETCH_BYTES.inc(stats.bytes)
+        self.info('输入缓存: 命中 {} 个文件, 未命中 {} 个, 节省读取 {:.1f}MB'.format(
+            stats.hits, stats.misses, stats.bytes / 2 ** 20))
+        self._emit_event(events.PREFETCHED, hits=stats.hits,
+                         misses=stats.misses, bytes=stats.bytes)
+
+    def _on_staging_idle(self):
+        if self._finish_retcode is None:
+            return
+        retcode, self._finish_retcode = self._finish_retcode, None
+        self.timer.end(timing.STAGING)
+        self.on_process_finished(retcode)
+
+    def _handle_staging_error(self):
+        for i in self.stager.failed:
+            self.error('输出移动失败: {}'.format(i))
+        self.classifier.add(failure.TRANSIENT,
+                            '输出移动失败: {}'.format(self.stager.failed[0]))
+        self._handle_render_error(0)
+
+    def _handle_render_error(self, retcode):
+        error_class = self.classifier.classify(retcode, self._is_time_out)
+        label = failure.LABELS[error_class]
         self.error_count += 1
+        # Kept in model, task object can be rebuilt after evicted from cache.
+        counts = dict(self.error_counts or {})
+        counts[error_class] = counts.get(error_class, 0) + 1
+        self.error_counts = counts
+        count = counts[error_class]
         self.priority -= 1
-        self.error('{}: 渲染出错 第{}次'.format(
-            self.path, self.error_count))
-        if self.error_count >= self.max_retry:
-            self.error('渲染错误达到{}次,不再进行重试。'.format(self.max_retry))
+        metrics.RENDER_ERRORS.inc(error_class=error_class)
+        self.error('{}: 渲染出错({}) 第{}次'.format(self.path, label, count))
+        self._emit_event(events.ERROR, retcode=retcode,
+                         error_class=error_class,
+                         message=self.classifier.message(error_class),
+                         error_count=self.error_count)
+        policy = failure.POLICIES[error_class]
+        if count > policy.max_retry:
+            if policy.max_retry:
+                self.error('{}达到{}次,不再进行重试。'.format(label, count))
+            else:
+                self.error('重试无法解决此错误, 不再进行重试。')
             self.state |= model.DISABLED
+            return
+
+        delay = failure.backoff(error_class, count)
+        self.retry_time = time.time() + delay if delay else None
+        if delay:
+            self.info('{:.0f}秒后重试'.format(delay))
+        self._emit_event(events.RETRY, error_count=self.error_count,
+                         error_class=error_class, delay=delay,
+                         priority=self.priority)
 
     def _handle_normal_ext(self):
         if self.state & model.PARTIAL or CONFIG['PROXY']:
@@ -243,17 +698,197 @@ class NukeTask(model.Task, core.RenderObject):
         else:
             self.state |= model.FINISHED
             self.info('任务完成')
-            self.file.archive()
+            with self.timer.phase(timing.ARCHIVE):
+                self.file.archive()
+
+    def cleanup(self):
+        """Remove files and release caches created by `prepare`.  """
+
+        self._try_remove_tempfile()
+        if self.stager:
+            self.stager.clean()
+            self.stager = None
+        if self.prefetch:
+            prefetch.cache().release(self.prefetch.keys)
+            self.prefetch = None
 
     def _try_remove_tempfile(self):
-        try:
-            os.remove(self._tempfile)
-        except OSError:
-            self.error('移除临时文件失败: {}'.format(self._tempfile))
-            LOGGER.warning('Remove temprory file failed.', exc_info=True)
+        for i in (self._tempfile, self._driver):
+            if not i:
+                continue
+            try:
+                os.remove(i)
+            except OSError:
+                self.error('移除临时文件失败: {}'.format(i))
+                LOGGER.warning('Remove temprory file failed.', exc_info=True)
+        self._tempfile = None
+        self._driver = None
+
+    def _resume(self):
+        """Skip frames completed in journal.  """
+
+        self.journal = journal.FrameJournal.for_file(self.file)
+        # Outputs may be removed since last render.
+        completed = self.journal.completed(refresh=True)
+        if not completed or not self.range:
+            return
+        if not journal.is_resumable(self.path):
+            self.info('输出包含视频容器格式, 从头渲染')
+            return
+        remains = FrameRange(self.range - completed)
+        if not remains:
+            # Crashed after last frame.
+            raise AlreadyCompleted
+        self.info('从中断处继续: 已完成 {} 剩余 {}'.format(completed, remains))
+        self.range = remains
+
+    def finish_completed(self):
+        """Finish task without render, when journal has all frames.  """
+
+        self.info('所有帧已在中断前完成, 跳过渲染')
+        with database.util.session_scope() as sess:
+            self.update_file(sess, is_recreate=False)
+            self._set_state(model.PARTIAL, self._is_partial())
+            self._handle_normal_ext()
+        if self.state & model.FINISHED:
+            self.journal.remove()
+        self._emit_event(events.FINISHED, cost=0.0, state=self.state)
+
+    def _is_partial(self):
+        """Whether file range is not covered by render range and done frames.  """
+
+        covered = FrameRange(self.range or ()) | self.journal.completed()
+        if self.file.has_sequence():
+            covered |= self.file.rendered_frames()
+        return bool(FrameRange(self.file.range() or ()) - covered)
+
+    def _validate(self):
+        # Read may not connect to any Write, let nuke decide.
+        for i in validation.missing_inputs(self.path, CONFIG['DIR']):
+            self.info('{}: {}'.format(self.path, i))
+        problems = validation.check(self.path)
+        if not problems:
+            return
+        for i in problems:
+            self.error('{}: {}'.format(self.path, i))
+        metrics.RENDER_ERRORS.inc(error_class=failure.PERMANENT)
+        self._emit_event(events.ERROR, retcode=None,
+                         error_class=failure.PERMANENT,
+                         message='; '.join(problems),
+                         error_count=self.error_count)
+        raise ValidationFailed(problems)
+
+    def _prepare_smoke_test(self):
+        """Render sample frames first if not validated.  """
+
+        samples = validation.sample_frames(
+            self.range or validation.script_frames(self.path))
+        if not samples:
+            return
+        remains = FrameRange(samples - self.journal.completed())
+        if not remains:
+            validation.set_validated(self._filehash)
+            return
+        self.smoke_frames = remains
+        self.info('试渲染: {}'.format(remains))
+
+    def _prepare_pass(self):
+        """Render a strided subset first when range is large enough.  """
+
+        frames = self.range or validation.script_frames(self.path)
+        if not frames:
+            return
+        self.range = frames
+        number, selected = progressive.next_pass(
+            frames,
+            min(FrameRange(frames) | self.journal.completed()),
+            CONFIG['PROGRESSIVE'])
+        if selected == frames:
+            return
+        self.pass_frames = selected
+        self.info('渐进渲染: 第{}遍 {}'.format(number, selected))
+
+    def _prepare_release(self):
+        """Render only frames released by upstream tasks.  """
+
+        released = self.upstream_frames
+        frames = self.range or validation.script_frames(self.path)
+        if not frames:
+            # Range unknown, render released frames only.
+            if not released:
+                raise DependencyHeld
+            self.release_frames = released
+        else:
+            self.range = frames
+            remains = FrameRange(frames - self.journal.completed())
+            selected = FrameRange(remains & released)
+            if not selected:
+                raise DependencyHeld
+            if selected == remains:
+                return
+            self.release_frames = selected
+        self.info('上游任务已完成部分帧, 先渲染: {}'.format(self.release_frames))
+
+    def _render_range(self):
+        return (self.smoke_frames
+                or self.pass_frames
+                or self.release_frames
+                or self.range)
+
+    def _check_outputs(self, frames):
+        """Handle missing outputs of a partial run as render error.  """
+
+        expected = validation.output_frames(self.path, frames)
+        missing = FrameRange(expected - self.journal.completed())
+        if missing:
+            # May be a incomplete write, retry before disable.
+            self.classifier.add(failure.TRANSIENT,
+                                '渲染未生成输出: {}'.format(missing))
+            self._handle_render_error(0)
+        return not missing
+
+    def _handle_pass(self):
+        if not self._check_outputs(self.pass_frames):
+            return
+        completed = self.journal.completed()
+        total = FrameRange(self.range) | completed
+        self.info('渐进渲染: 已完成 {}/{} 帧'.format(
+            len(completed & total), len(total)))
+
+    def _handle_release(self):
+        if not self._check_outputs(self.release_frames):
+            return
+        self.info('已渲染上游确认的帧: {}, 等待上游继续'.format(
+            self.release_frames))
+
+    def _handle_smoke_test(self):
+        if not self._check_outputs(self.smoke_frames):
+            return
+        validation.set_validated(self._filehash)
+        if not self.range:
+            # Let full range render skip rendered samples.
+            self.range = validation.script_frames(self.path) or None
+        self.info('试渲染通过, 开始完整渲染')
+
+    def _add_resource_record(self, frame, usage):
+        record = usage.as_dict()
+        record.update(
+            run=self.timer.run,
+            file_hash=self._filehash,
+            frame=frame,
+            timestamp=time.time())
+        self._resource_records.append(record)
+
+    def _emit_event(self, event, **data):
+        events.emit(event,
+                    file=self.path,
+                    file_hash=self._filehash,
+                    run=self.timer.run,
+                    slot=self.slot,
+                    **data)
 
     def _info_timestamp(self):
-        now = time.clock()
+        now = time.perf_counter()
         if (self._last_timestamp_time
                 and now - self._last_timestamp_time < self.min_timestamp_interval):
             return
@@ -262,14 +897,15 @@ class NukeTask(model.Task, core.RenderObject):
         self.stdout.emit(texttools.stylize(time.strftime('[%x %X]'), 'info'))
 
 
-def nuke_process(filepath, range_):
+def nuke_process(filepath, range_, overrides=None):
     """Nuke render process for file @f.  """
 
     filepath = os.path.normpath(u(filepath))
 
-    options = _options_from_config()
+    options = _options_from_config(overrides)
     if range_:
-        options.extend(('-F', range_))
+        for i in FrameRange(range_).parts():
+            options.extend(('-F', i))
     args = [CONFIG['NUKE'], '-x'] + options + [filepath]
     args = [u(i) for i in args]  # int, bytes -> str
     LOGGER.debug('Popen: %s', args)
@@ -287,16 +923,28 @@ def nuke_process(filepath, range_):
     return proc
 
 
-def _options_from_config():
-    ret = ['-p' if CONFIG['PROXY'] else '-f']
+def batch_process(driver, overrides=None):
+    """Nuke process that runs batch driver script.  """
+
+    options = [i for i in _options_from_config(overrides)[1:]
+               if i != '--cont']
+    args = [CONFIG['NUKE'], '-t'] + options + [os.path.normpath(u(driver))]
+    args = [u(i) for i in args]
+    LOGGER.debug('Popen: %s', args)
+    return Popen(args, stdout=PIPE, stderr=PIPE, cwd=CONFIG['DIR'])
+
+
+def _options_from_config(overrides=None):
+    config = dict(CONFIG, **(overrides or {}))
+    ret = ['-p' if config['PROXY'] else '-f']
     conditional_options = {
         'CONTINUE': ('--cont',),
         'LOW_PRIORITY': ('--priority', 'low'),
-        'THREADS': ('-m', CONFIG['THREADS']),
-        'MEMORY_LIMIT': ('-c', '{}M'.format(int(CONFIG['MEMORY_LIMIT'] * 1024)))
+        'THREADS': ('-m', config['THREADS']),
+        'MEMORY_LIMIT': ('-c', '{}M'.format(int(config['MEMORY_LIMIT'] * 1024)))
     }
 
     for k, v in list(conditional_options.items()):
-        if CONFIG[k]:
+        if config[k]:
             ret.extend(v)
     return ret
@@ -0,0 +1,123 @@
+# -*- coding=UTF-8 -*-
+"""Render time out from frame cost history.
+
+Time out of a frame is `p99 * TIME_OUT_FACTOR` of recorded frame cost,
+clamped between `TIME_OUT_MIN` and `TIME_OUT`.
+First frame uses recorded first frame phase cost, so startup is included.
+`TIME_OUT` is used directly when `TIME_OUT_FACTOR` is 0 (default)
+or history is too short, `TIME_OUT` <= 0 disables time out regardless of history.
+
+`TIME_OUT_OVERRIDES` maps file name pattern to time out seconds, e.g.
+`{"*_heavy_*.nk": 3600}`.
+"""
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import fnmatch
+import logging
+import os
+from collections import namedtuple
+
+from .. import database
+from ..config import CONFIG
+from . import timing
+
+LOGGER = logging.getLogger(__name__)
+
+QUANTILE = 0.99
+MIN_SAMPLES = 10
+
+# Sources.
+CONFIG_SOURCE = 'config'
+OVERRIDE_SOURCE = 'override'
+HISTORY_SOURCE = 'history'
+
+
+class Decision(namedtuple('Decision', ('seconds', 'source', 'quantile', 'samples'))):
+    """Time out decision and its inputs.  """
+
+    def __str__(self):
+        ret = '{:.0f}s from {}'.format(self.seconds, self.source)
+        if self.source == HISTORY_SOURCE:
+            ret += ' (p{:.0f}={:.1f}s of {} samples, factor={}, min={}, max={})'.format(
+                QUANTILE * 100, self.quantile, self.samples,
+                CONFIG['TIME_OUT_FACTOR'], CONFIG['TIME_OUT_MIN'],
+                CONFIG['TIME_OUT'])
+        return ret
+
+
+TimeOuts = namedtuple('TimeOuts', ('first_frame', 'frame'))
+
+
+def quantile(query, column, value=QUANTILE):
+    """Quantile of column in query.
+
+    Args:
+        query (Query): Query to filter rows.
+        column (Column): Column to order.
+        value (float, optional): Defaults to `QUANTILE`.
+
+    Returns:
+        tuple: (quantile, sample count), quantile is None if no samples.
+    """
+
+    count = query.count()
+    if not count:
+        return None, 0
+    offset = min(int(count * value), count - 1)
+    ret = query.order_by(column).offset(offset).limit(1).scalar()
+    return ret, count
+
+
+def _override(path):
+    name = os.path.basename(path)
+    for pattern, seconds in CONFIG['TIME_OUT_OVERRIDES'].items():
+        if fnmatch.fnmatch(name, pattern):
+            return float(seconds)
+    return None
+
+
+def _from_history(value, count):
+    if (CONFIG['TIME_OUT'] <= 0
+            or not CONFIG['TIME_OUT_FACTOR']
+            or value is None
+            or count < MIN_SAMPLES):
+        return Decision(float(CONFIG['TIME_OUT']), CONFIG_SOURCE, value, count)
+    seconds = max(value * CONFIG['TIME_OUT_FACTOR'], CONFIG['TIME_OUT_MIN'])
+    seconds = min(seconds, CONFIG['TIME_OUT'])
+    return Decision(seconds, HISTORY_SOURCE, value, count)
+
+
+def decide(session, file_hash, path):
+    """Decide time outs for a render run.
+
+    Args:
+        session (Session): Database session.
+        file_hash (str): File hash.
+        path (str): File path, for overrides.
+
+    Returns:
+        TimeOuts: Decisions for first frame and other frames,
+            seconds <= 0 means no time out.
+    """
+
+    override = _override(path)
+    if override is not None:
+        decision = Decision(override, OVERRIDE_SOURCE, None, 0)
+        ret = TimeOuts(decision, decision)
+    else:
+        Frame, Phase = database.Frame, database.Phase
+        ret = TimeOuts(
+            _from_history(*quantile(
+                session.query(Phase.cost).filter(
+                    Phase.file_hash == file_hash,
+                    Phase.name == timing.FIRST_FRAME),
+                Phase.cost)),
+            _from_history(*quantile(
+                session.query(Frame.cost).filter(Frame.file_hash == file_hash),
+                Frame.cost)),
+        )
+    LOGGER.info('Time out for %s: first frame %s, frame %s',
+                path, ret.first_frame, ret.frame)
+    return ret
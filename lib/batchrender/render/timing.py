@@ -0,0 +1,110 @@
+# -*- coding=UTF-8 -*-
+"""Render phase timing.  """
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import logging
+import socket
+import time
+import uuid
+from contextlib import contextmanager
+
+LOGGER = logging.getLogger(__name__)
+
+HOST = socket.gethostname()
+
+# Phase names.
+TASK = 'task'
+HASH = 'hash'
+TEMPFILE = 'tempfile'
+VALIDATE = 'validate'
+SPAWN = 'spawn'
+FIRST_FRAME = 'first_frame'
+COMMIT = 'commit'
+ARCHIVE = 'archive'
+TEARDOWN = 'teardown'
+SUSPENDED = 'suspended'
+STAGING = 'staging'
+PREFETCH = 'prefetch'
+
+
+class PhaseTimer(object):
+    """Collect phase timing for one render run.
+
+    Args:
+        slot (int, optional): Defaults to 0. Render slot index.
+    """
+
+    def __init__(self, slot=0):
+        self.run = uuid.uuid4().hex
+        self.slot = slot
+        self.file_hash = None
+        self._records = []
+        self._started = {}
+
+    @contextmanager
+    def phase(self, name):
+        """Context for timing a phase.  """
+
+        self.begin(name)
+        try:
+            yield
+        finally:
+            self.end(name)
+
+    def begin(self, name):
+        """Mark phase start.  """
+
+        self._started[name] = (time.time(), time.perf_counter())
+
+    def end(self, name):
+        """Mark phase end.
+
+        Returns:
+            float: Phase cost, `None` if phase not started.
+        """
+
+        try:
+            start, counter = self._started.pop(name)
+        except KeyError:
+            return None
+        cost = time.perf_counter() - counter
+        self.add(name, start, cost)
+        return cost
+
+    def is_running(self, name):
+        """Whether phase is started but not ended.  """
+
+        return name in self._started
+
+    def add(self, name, start, cost):
+        """Add a phase record.
+
+        Args:
+            name (str): Phase name.
+            start (float): Start timestamp.
+            cost (float): Phase time cost in seconds.
+        """
+
+        LOGGER.debug('Phase %s: %.3fs', name, cost)
+        self._records.append(dict(
+            run=self.run,
+            name=name,
+            start=start,
+            cost=cost,
+            host=HOST,
+            slot=self.slot,
+        ))
+
+    def pop_records(self):
+        """Pop records for database insert.
+
+        Returns:
+            list[dict]: Mappings for `database.Phase`.
+        """
+
+        ret, self._records = self._records, []
+        for i in ret:
+            i['file_hash'] = self.file_hash
+        return ret
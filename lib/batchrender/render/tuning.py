@@ -0,0 +1,167 @@
+# -*- coding=UTF-8 -*-
+"""Choose nuke thread count and memory limit from render history.
+
+Config `AUTO_TUNE`:
+    0: Always use `THREADS` and `MEMORY_LIMIT` from config.
+    1: Use best known options of the file.
+    2: Same as 1, but try untested nearby thread count first.
+"""
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import logging
+import math
+import time
+from collections import namedtuple
+
+import psutil
+from sqlalchemy import func
+
+from .. import database
+from ..config import CONFIG
+
+LOGGER = logging.getLogger(__name__)
+
+# Reasons.
+CONFIG_REASON = 'config'
+RESOURCE_REASON = 'resource'
+BEST_REASON = 'best'
+EXPLORE_REASON = 'explore'
+
+# Memory limit as multiple of recorded peak rss.
+MEMORY_LIMIT_FACTOR = 1.5
+MIN_MEMORY_LIMIT = 1.0
+
+
+class Settings(namedtuple('Settings', ('threads', 'memory_limit', 'reason'))):
+    """Render options for one run.  """
+
+    def overrides(self):
+        """Config overrides for `_options_from_config`.  """
+
+        return {'THREADS': self.threads, 'MEMORY_LIMIT': self.memory_limit}
+
+
+def _max_threads():
+    return CONFIG['THREADS'] or psutil.cpu_count(logical=True)
+
+
+def _max_memory_limit():
+    return (CONFIG['MEMORY_LIMIT']
+            or psutil.virtual_memory().total / 2.0 ** 30)
+
+
+def default_settings():
+    """Settings from config.  """
+
+    return Settings(CONFIG['THREADS'], CONFIG['MEMORY_LIMIT'], CONFIG_REASON)
+
+
+def from_resource(usage):
+    """Settings that fit recorded resource usage.
+
+    Args:
+        usage (dict): Result of `database.Resource.summary`.
+
+    Returns:
+        Settings: Suggested settings, None if no data.
+    """
+
+    if not usage['runs'] or not usage['cpu_max'] or not usage['rss_peak']:
+        return None
+    max_threads = _max_threads()
+    threads = min(max(int(math.ceil(usage['cpu_max'] / 100.0)) + 1, 1),
+                  max_threads)
+    # Round up to 0.25GB.
+    memory_limit = math.ceil(
+        usage['rss_peak'] * MEMORY_LIMIT_FACTOR / 2.0 ** 30 * 4) / 4.0
+    memory_limit = min(max(memory_limit, MIN_MEMORY_LIMIT),
+                       _max_memory_limit())
+    return Settings(threads, memory_limit, RESOURCE_REASON)
+
+
+def neighbors(threads):
+    """Nearby thread counts to explore.  """
+
+    # 0 means nuke default, which uses all cores.
+    threads = threads or _max_threads()
+    step = max(threads // 4, 1)
+    return [i for i in (threads - step, threads + step)
+            if 1 <= i <= _max_threads()]
+
+
+def choose(session, file_hash, explore=False):
+    """Choose render settings for next run of a file.
+
+    First run uses config to get a baseline,
+    then settings fit recorded resource usage,
+    then the tried settings with lowest frame cost.
+
+    Args:
+        session (Session): Database session.
+        file_hash (str): File hash.
+        explore (bool, optional): Defaults to False.
+            Try untested nearby thread count of the best settings.
+
+    Returns:
+        Settings: Chosen settings.
+    """
+
+    history = database.Tuning.history(session, file_hash)
+    if not history:
+        return default_settings()
+
+    (threads, memory_limit), _ = min(history.items(), key=lambda x: x[1])
+    tried = {i[0] for i in history}
+    suggested = from_resource(
+        database.Resource.summary(session, file_hash=file_hash))
+    if suggested and suggested.threads not in tried:
+        return suggested
+    if suggested:
+        # Memory limit follows latest usage.
+        memory_limit = suggested.memory_limit
+    if explore:
+        for i in neighbors(threads):
+            if i not in tried:
+                return Settings(i, memory_limit, EXPLORE_REASON)
+    return Settings(threads, memory_limit, BEST_REASON)
+
+
+def record(session, run, file_hash, settings, since):
+    """Record settings and result of a run.
+
+    Args:
+        session (Session): Database session.
+        run (str): Render run id.
+        file_hash (str): File hash.
+        settings (Settings): Used settings.
+        since (float): Run start timestamp.
+
+    Returns:
+        database.Tuning: Created record.
+    """
+
+    frames, frame_cost = session.query(
+        func.count(database.Frame.id), func.avg(database.Frame.cost)
+    ).filter(
+        database.Frame.file_hash == file_hash,
+        database.Frame.timestamp >= since,
+    ).one()
+    ret = database.Tuning(
+        run=run,
+        file_hash=file_hash,
+        timestamp=time.time(),
+        reason=settings.reason,
+        threads=settings.threads,
+        memory_limit=settings.memory_limit,
+        frames=frames,
+        frame_cost=frame_cost,
+    )
+    session.add(ret)
+    session.flush()
+    baseline = database.Tuning.baseline(session, file_hash, CONFIG_REASON)
+    if baseline and frame_cost:
+        ret.speedup = baseline / frame_cost
+    LOGGER.debug('Tuning result: %s', ret.serialize())
+    return ret
@@ -0,0 +1,165 @@
+# -*- coding=UTF-8 -*-
+"""Script validation before full range render.
+
+With config `VALIDATE` >= 1, script is parsed for active Write nodes
+before starting nuke, missing Read inputs are only warned,
+since the Read may not be connected to any Write.
+With config `VALIDATE` >= 2, sample frames (first, middle, last)
+are rendered in a short render first, full range is only rendered
+after all sample outputs appear. Rendered sample frames are recorded
+in frame journal, so they are skipped by full range render.
+"""
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import logging
+import os
+import re
+
+from .. import script
+from ..framerange import FrameRange
+from .journal import scan
+
+LOGGER = logging.getLogger(__name__)
+
+_VALIDATED = set()
+
+
+def sample_frames(frames):
+    """First, middle and last frame.
+
+    >>> list(sample_frames(range(1, 101)))
+    [1, 51, 100]
+    >>> list(sample_frames([3, 4]))
+    [3, 4]
+
+    Args:
+        frames (Iterable[int]): Frames to render.
+
+    Returns:
+        FrameRange: Sample frames.
+    """
+
+    frames = sorted(frames)
+    if not frames:
+        return FrameRange()
+    return FrameRange((frames[0], frames[len(frames) // 2], frames[-1]))
+
+
+def _exists(path):
+    if re.search(r'%0?\d*d|#', path):
+        return bool(scan(path))
+    return os.path.exists(path)
+
+
+def check(path):
+    """Find problems that make render fail, without starting nuke.
+
+    Args:
+        path (str): Script path.
+
+    Returns:
+        list[str]: Problem messages, empty if no problem found.
+    """
+
+    try:
+        parsed = script.parse(path)
+    except (IOError, OSError):
+        LOGGER.warning('Can not parse script: %s', path, exc_info=True)
+        return []
+    if not parsed.writes():
+        return ['没有启用的输出节点']
+    return []
+
+
+def missing_inputs(path, cwd):
+    """Read nodes that input file not exists.
+
+    Args:
+        path (str): Script path.
+        cwd (str): Directory relative paths based on.
+
+    Returns:
+        list[str]: Warning messages, empty if all inputs exist.
+    """
+
+    try:
+        parsed = script.parse(path)
+    except (IOError, OSError):
+        return []
+    ret = []
+    for i in parsed.reads():
+        filename = i.file
+        if not filename or re.search(r'%[Vv]', filename):
+            # Expression or view dependent path, can not check.
+            continue
+        if not _exists(os.path.join(cwd, filename)):
+            ret.append('{}: 输入文件不存在: {}'.format(i.name, filename))
+    return ret
+
+
+def script_frames(path):
+    """Frames of script root range.
+
+    Args:
+        path (str): Script path.
+
+    Returns:
+        FrameRange: Frames, empty if root range not found.
+    """
+
+    try:
+        frame_range = script.parse(path).frame_range()
+    except (IOError, OSError):
+        frame_range = None
+    if not frame_range:
+        return FrameRange()
+    first, last = frame_range
+    return FrameRange(range(first, last + 1))
+
+
+def output_frames(path, frames):
+    """Frames that Write nodes with known path and range should output.
+
+    Writes with expression or non-sequence path are skipped,
+    so are limited range Writes that range can not be parsed.
+
+    Args:
+        path (str): Script path.
+        frames (Iterable[int]): Rendered frames.
+
+    Returns:
+        FrameRange: Expected frames, empty if no Write can be resolved.
+    """
+
+    try:
+        writes = script.parse(path).writes()
+    except (IOError, OSError):
+        return FrameRange()
+    frames = FrameRange(frames)
+    ret = set()
+    for i in writes:
+        if not i.file or not re.search(r'%0?\d*d|#', i.file):
+            continue
+        if i.knobs.get('use_limit') == 'true':
+            try:
+                first, last = int(i.knobs['first']), int(i.knobs['last'])
+            except (KeyError, ValueError):
+                continue
+            ret.update(frames & FrameRange(range(first, last + 1)))
+        else:
+            ret.update(frames)
+    return FrameRange(ret)
+
+
+def is_validated(file_hash):
+    """Whether sample render passed for file.  """
+
+    return file_hash in _VALIDATED
+
+
+def set_validated(file_hash):
+    """Mark sample render passed for file.  """
+
+    _VALIDATED.add(file_hash)
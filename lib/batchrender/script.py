@@ -0,0 +1,250 @@
+# -*- coding=UTF-8 -*-
+"""Lightweight nuke script parser for Read and Write nodes.  """
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import io
+import logging
+import os
+import re
+from collections import OrderedDict, namedtuple
+
+from .codectools import get_unicode as u
+
+LOGGER = logging.getLogger(__name__)
+
+READ_CLASSES = ('Read', 'DeepRead', 'ReadGeo', 'ReadGeo2')
+
+_CACHE = OrderedDict()
+_CACHE_SIZE = 256
+
+
+class Node(namedtuple('Node', ('class_', 'knobs'))):
+    """Node in script.  """
+
+    @property
+    def name(self):
+        """Node name.  """
+
+        return self.knobs.get('name')
+
+    @property
+    def file(self):
+        """File knob value, None when it is a expression.  """
+
+        ret = self.knobs.get('file')
+        if not ret or '[' in ret or '{' in ret:
+            return None
+        return ret
+
+    @property
+    def is_disabled(self):
+        """Whether node is disabled.  """
+
+        return self.knobs.get('disable') == 'true'
+
+
+class Script(object):
+    """Parsed nuke script.
+
+    Args:
+        nodes (list[Node]): Nodes in script order.
+    """
+
+    def __init__(self, nodes):
+        self.nodes = nodes
+
+    def root(self):
+        """Root node, None if not found.  """
+
+        return next((i for i in self.nodes if i.class_ == 'Root'), None)
+
+    def reads(self):
+        """Enabled read nodes.  """
+
+        return [i for i in self.nodes
+                if i.class_ in READ_CLASSES and not i.is_disabled]
+
+    def writes(self):
+        """Enabled write nodes, also include write gizmos.  """
+
+        return [i for i in self.nodes
+                if 'Write' in i.class_ and not i.is_disabled]
+
+    def frame_range(self):
+        """Root frame range.
+
+        Returns:
+            tuple: (first, last), None if not found.
+        """
+
+        root = self.root()
+        try:
+            return (int(root.knobs['first_frame']),
+                    int(root.knobs['last_frame']))
+        except (AttributeError, KeyError, ValueError):
+            return None
+
+    def resolution(self):
+        """Root format size.
+
+        Returns:
+            tuple: (width, height), None if not found.
+        """
+
+        root = self.root()
+        try:
+            width, height = root.knobs['format'].split()[:2]
+            return (int(width), int(height))
+        except (AttributeError, KeyError, ValueError):
+            return None
+
+
+def _unquote(value):
+    value = value.strip()
+    if len(value) >= 2 and value[0] == value[-1] == '"':
+        value = re.sub(r'\\(.)', r'\1', value[1:-1])
+    return value
+
+
+def _walk(lines):
+    """Iterate node knobs in script lines.
+
+    Yields:
+        tuple: (line index, node class, knob name, knob value) for knob lines,
+            (None, node class, None, None) when a node ends.
+    """
+
+    class_ = None
+    depth = 0
+    for index, line in enumerate(lines):
+        if class_ is None:
+            match = re.match(r'^\s*(\w+) \{\s*$', line)
+            if match:
+                class_, depth = match.group(1), 1
+            continue
+        if depth == 1:
+            if line.strip() == '}':
+                yield None, class_, None, None
+                class_ = None
+                continue
+            match = re.match(r'^\s*(\w+) (.*)$', line)
+            if match:
+                yield index, class_, match.group(1), _unquote(match.group(2))
+        # Multiline knob values.
+        depth += line.count('{') - line.count('}')
+        if depth <= 0:
+            yield None, class_, None, None
+            class_ = None
+
+
+def parse_text(text):
+    """Parse nuke script text.
+
+    >>> script = parse_text('Root {\\n first_frame 1\\n last_frame 10\\n}\\n'
+    ...                     'Read {\\n file "a b/c.%04d.exr"\\n name Read1\\n}\\n')
+    >>> script.frame_range()
+    (1, 10)
+    >>> [(i.name, i.file) for i in script.reads()]
+    [('Read1', 'a b/c.%04d.exr')]
+
+    Args:
+        text (str): Script content.
+
+    Returns:
+        Script: Parsed script.
+    """
+
+    nodes = []
+    knobs = OrderedDict()
+    for index, class_, name, value in _walk(text.splitlines()):
+        if index is None:
+            nodes.append(Node(class_, knobs))
+            knobs = OrderedDict()
+        else:
+            knobs[name] = value
+    return Script(nodes)
+
+
+def _remap_files(text, func, is_match):
+    lines = text.splitlines(True)
+    for index, class_, name, value in list(_walk(lines)):
+        if index is None or name != 'file' or not is_match(class_):
+            continue
+        new = func(value)
+        if new is None or new == value:
+            continue
+        indent = re.match(r'^(\s*)', lines[index]).group(1)
+        lines[index] = '{}file "{}"\n'.format(
+            indent, re.sub(r'(["\\])', r'\\\1', new))
+    return ''.join(lines)
+
+
+def remap_writes(text, func):
+    """Replace file knob of write nodes.
+
+    >>> print(remap_writes('Write {\\n file "a b/c.%04d.exr"\\n}\\n',
+    ...                    lambda x: x.replace('a b', '/tmp')), end='')
+    Write {
+     file "/tmp/c.%04d.exr"
+    }
+
+    Args:
+        text (str): Script content.
+        func (Callable): Get new path from old path, returns None to keep.
+
+    Returns:
+        str: Modified script content.
+    """
+
+    return _remap_files(text, func, lambda x: 'Write' in x)
+
+
+def remap_reads(text, func):
+    """Replace file knob of read nodes.
+
+    >>> print(remap_reads('Read {\\n file a/c.%04d.exr\\n}\\n'
+    ...                   'Write {\\n file a/d.%04d.exr\\n}\\n',
+    ...                   lambda x: x.replace('a/', '/tmp/')), end='')
+    Read {
+     file "/tmp/c.%04d.exr"
+    }
+    Write {
+     file a/d.%04d.exr
+    }
+
+    Args:
+        text (str): Script content.
+        func (Callable): Get new path from old path, returns None to keep.
+
+    Returns:
+        str: Modified script content.
+    """
+
+    return _remap_files(text, func, lambda x: x in READ_CLASSES)
+
+
+def parse(path):
+    """Parse nuke script file, cached by path, size and modified time.
+
+    Args:
+        path (str): Script path.
+
+    Returns:
+        Script: Parsed script.
+    """
+
+    path = u(path)
+    stat = os.stat(path)
+    key = (os.path.normcase(os.path.abspath(path)), stat.st_size, stat.st_mtime)
+    try:
+        ret = _CACHE.pop(key)
+    except KeyError:
+        with io.open(path, encoding='utf-8', errors='replace') as f:
+            ret = parse_text(f.read())
+        LOGGER.debug('Parsed script: %s, nodes: %d', path, len(ret.nodes))
+    _CACHE[key] = ret
+    while len(_CACHE) > _CACHE_SIZE:
+        _CACHE.popitem(last=False)
+    return ret
@@ -0,0 +1,181 @@
+# -*- coding=UTF-8 -*-
+"""Export render history as chrome trace event format.
+
+Result can be opened with `chrome://tracing` or https://ui.perfetto.dev
+
+Usage:
+    python -m batchrender.trace trace.json --hours 24
+"""
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import argparse
+import bisect
+import json
+import logging
+import time
+from collections import namedtuple
+
+from . import database
+from .codectools import get_unicode as u
+
+LOGGER = logging.getLogger(__name__)
+
+_Run = namedtuple('_Run', ('start', 'end', 'pid', 'tid'))
+
+
+def _us(seconds):
+    return int(round(seconds * 1e6))
+
+
+class _Tracks(object):
+    """Map host and slot to trace pid and tid.  """
+
+    def __init__(self):
+        self.hosts = {}
+        self.slots = set()
+
+    def get(self, host, slot):
+        host = host or 'unknown'
+        pid = self.hosts.setdefault(host, len(self.hosts) + 1)
+        tid = (slot or 0) + 1
+        self.slots.add((pid, tid))
+        return pid, tid
+
+    def metadata(self):
+        ret = []
+        for host, pid in self.hosts.items():
+            ret.append(dict(ph='M', pid=pid, name='process_name',
+                            args=dict(name=host)))
+        for pid, tid in sorted(self.slots):
+            ret.append(dict(ph='M', pid=pid, tid=tid, name='thread_name',
+                            args=dict(name='slot {}'.format(tid - 1))))
+        return ret
+
+
+def export(session, since=None, until=None):
+    """Render history as trace data.
+
+    Args:
+        session (Session): Database session.
+        since (float, optional): Defaults to None. Start timestamp.
+        until (float, optional): Defaults to None. End timestamp.
+
+    Returns:
+        dict: Chrome trace event format data.
+    """
+
+    tracks = _Tracks()
+    events = []
+    runs = {}
+    labels = dict(session.query(database.File.hash, database.File.label))
+
+    query = session.query(database.Phase).order_by(database.Phase.start)
+    if since is not None:
+        query = query.filter(database.Phase.start >= since)
+    if until is not None:
+        query = query.filter(database.Phase.start <= until)
+    for i in query:
+        pid, tid = tracks.get(i.host, i.slot)
+        label = labels.get(i.file_hash) or i.file_hash
+        is_task = i.name == 'task'
+        events.append(dict(
+            ph='X',
+            cat='task' if is_task else 'phase',
+            name=label if is_task else i.name,
+            ts=_us(i.start),
+            dur=_us(i.cost or 0),
+            pid=pid,
+            tid=tid,
+            args=dict(file_hash=i.file_hash, run=i.run, file=label),
+        ))
+        if is_task:
+            runs.setdefault(i.file_hash, []).append(
+                _Run(i.start, i.start + (i.cost or 0), pid, tid))
+
+    starts = {k: [j.start for j in v] for k, v in runs.items()}
+
+    def _track(file_hash, timestamp):
+        items = runs.get(file_hash, ())
+        index = bisect.bisect_right(starts.get(file_hash, ()), timestamp) - 1
+        if index >= 0 and timestamp <= items[index].end + 1:
+            return items[index].pid, items[index].tid
+        return tracks.get(None, 0)
+
+    query = session.query(database.Frame).order_by(database.Frame.timestamp)
+    if since is not None:
+        query = query.filter(database.Frame.timestamp >= since)
+    if until is not None:
+        query = query.filter(database.Frame.timestamp <= until)
+    for i in query:
+        pid, tid = _track(i.file_hash, i.timestamp)
+        cost = i.cost or 0
+        events.append(dict(
+            ph='X',
+            cat='frame',
+            name='frame {}'.format(i.frame),
+            ts=_us(i.timestamp - cost),
+            dur=_us(cost),
+            pid=pid,
+            tid=tid,
+            args=dict(file_hash=i.file_hash, frame=i.frame),
+        ))
+
+    query = session.query(database.Output)
+    if since is not None:
+        query = query.filter(database.Output.timestamp >= since)
+    if until is not None:
+        query = query.filter(database.Output.timestamp <= until)
+    for i in query:
+        if i.timestamp is None:
+            continue
+        timestamp = i.timestamp.timestamp()
+        file_hash = i.files[0].hash if i.files else None
+        pid, tid = _track(file_hash, timestamp)
+        events.append(dict(
+            ph='i',
+            s='t',
+            cat='output',
+            name=i.path.name,
+            ts=_us(timestamp),
+            pid=pid,
+            tid=tid,
+            args=dict(path=i.as_posix(), frame=i.frame),
+        ))
+
+    events.sort(key=lambda x: x['ts'])
+    return dict(traceEvents=tracks.metadata() + events,
+                displayTimeUnit='ms')
+
+
+def dump(path, since=None, until=None):
+    """Write render history trace to file.
+
+    Args:
+        path (str): Output json file path.
+        since (float, optional): Defaults to None. Start timestamp.
+        until (float, optional): Defaults to None. End timestamp.
+    """
+
+    with database.util.session_scope() as sess:
+        data = export(sess, since, until)
+    with open(u(path), 'w') as f:
+        json.dump(data, f)
+    LOGGER.info('Exported %d trace events: %s', len(data['traceEvents']), path)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Export render history as chrome trace event format.')
+    parser.add_argument('path', help='Output json file path.')
+    parser.add_argument('--hours', type=float, default=24,
+                        help='Export history in these hours, 0 for all.')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    since = time.time() - args.hours * 3600 if args.hours else None
+    dump(args.path, since)
+
+
+if __name__ == '__main__':
+    main()
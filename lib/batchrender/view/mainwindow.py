@@ -14,7 +14,7 @@ from functools import wraps
 
 import pendulum
 from PySide2 import QtUiTools
-from PySide2.QtCore import Qt, QUrl, Signal, Slot
+from PySide2.QtCore import Qt, QTimer, QUrl, Signal, Slot
 from PySide2.QtWidgets import (QApplication, QCheckBox, QComboBox,
                                QDoubleSpinBox, QFileDialog, QInputDialog,
                                QLineEdit, QMainWindow, QMessageBox, QSpinBox,
@@ -67,6 +67,7 @@ class MainWindow(UnicodeTrMixin, QMainWindow):
     """Main GUI window.  """
 
     file_dropped = Signal(list)
+    change_root_delay = 500
 
     def _setup_icon(self):
         _stdicon = self.style().standardIcon
@@ -106,7 +107,14 @@ class MainWindow(UnicodeTrMixin, QMainWindow):
         self.on_model_changed()
 
     def _setup_signals(self):
-        self.lineEditDir.textChanged.connect(self.control.change_root)
+        # Change root after typing stopped, not for every keystroke.
+        timer = QTimer(self)
+        timer.setSingleShot(True)
+        timer.setInterval(self.change_root_delay)
+        timer.timeout.connect(
+            lambda: self.control.change_root(self.lineEditDir.text()))
+        self._change_root_timer = timer
+        self.lineEditDir.textChanged.connect(lambda: timer.start())
         self.comboBoxAfterFinish.currentIndexChanged.connect(
             self.on_after_render_changed)
 
@@ -0,0 +1,349 @@
+# -*- coding=UTF-8 -*-
+"""Directory watcher for task files.
+
+Use inotify when avaliable, otherwise fallback to a `os.scandir` poller.
+Events are only sent after file stopped changing,
+so the receiver can safely hash the file.
+"""
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import ctypes
+import ctypes.util
+import errno
+import logging
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from collections import namedtuple
+
+from .codectools import get_unicode as u
+
+LOGGER = logging.getLogger(__name__)
+
+ADDED = 'added'
+MODIFIED = 'modified'
+REMOVED = 'removed'
+
+Event = namedtuple('Event', ('type', 'path', 'mtime', 'size'))
+
+
+def scan(root, suffix=None):
+    """Stat files in directory with one `os.scandir` pass.
+
+    Args:
+        root (str): Directory path.
+        suffix (str, optional): Defaults to None. Only include filename with this suffix.
+
+    Returns:
+        dict: Normalized path as key, (mtime, size) as value.
+    """
+
+    ret = {}
+    try:
+        entries = list(os.scandir(root))
+    except OSError:
+        LOGGER.debug('Scan failed: %s', root, exc_info=True)
+        return ret
+    for i in entries:
+        if suffix and not i.name.lower().endswith(suffix):
+            continue
+        try:
+            if not i.is_file():
+                continue
+            stat = i.stat()
+        except OSError:
+            continue
+        ret[os.path.normpath(u(i.path))] = (stat.st_mtime, stat.st_size)
+    return ret
+
+
+def _stat(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime, stat.st_size)
+
+
+class BaseWatcher(object):
+    """Watch files in a directory.
+
+    Args:
+        root (str): Directory to watch.
+        callback (callable): Called with `Event` from watcher thread.
+        suffix (str, optional): Defaults to '.nk'. Filename suffix to watch.
+        debounce (float, optional): Defaults to 1.0.
+            Seconds that a file need to stay unchanged before send event.
+        interval (float, optional): Defaults to 2.0. Poll interval in seconds.
+    """
+
+    def __init__(self, root, callback, suffix='.nk', debounce=1.0, interval=2.0):
+        self.root = os.path.normpath(u(root))
+        self.callback = callback
+        self.suffix = suffix
+        self.debounce = debounce
+        self.interval = interval
+        self._known = {}
+        self._pending = {}
+        self._thread = None
+        self._stop_event = threading.Event()
+
+    def __contains__(self, path):
+        return os.path.normpath(u(path)) in self._known
+
+    @property
+    def files(self):
+        """Settled files.  """
+
+        return set(self._known)
+
+    def start(self):
+        """Start watch in a thread.
+
+        Directory is scanned in the thread, existed files are sent as `ADDED` first.
+        """
+
+        self._known = {}
+        self._pending = {}
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._run, name='{}({})'.format(type(self).__name__, self.root))
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self, wait=True):
+        """Stop watching.
+
+        Args:
+            wait (bool, optional): Defaults to True.
+                Wait thread to exit, otherwise it exits in background.
+        """
+
+        self._stop_event.set()
+        thread = self._thread
+        if wait and thread is not None and thread is not threading.current_thread():
+            thread.join()
+        self._thread = None
+
+    def _scan(self):
+        self._known = scan(self.root, self.suffix)
+        for path, (mtime, size) in sorted(self._known.items()):
+            self._emit(ADDED, path, mtime, size)
+
+    def _close(self):
+        """Release resources when thread exits.  """
+
+    def check(self, now=None):
+        """Send events for files that stopped changing.
+
+        Args:
+            now (float, optional): Defaults to None. Current time.
+        """
+
+        now = time.time() if now is None else now
+        for path, (stat, since) in list(self._pending.items()):
+            if now - since < self.debounce:
+                continue
+            current = _stat(path)
+            if current is None:
+                self.observe(path, None)
+            elif current != stat:
+                self._pending[path] = (current, now)
+            else:
+                del self._pending[path]
+                if self._known.get(path) == stat:
+                    continue
+                event_type = MODIFIED if path in self._known else ADDED
+                self._known[path] = stat
+                self._emit(event_type, path, *stat)
+
+    def observe(self, path, stat, now=None):
+        """Record a file change.
+
+        Args:
+            path (str): Normalized file path.
+            stat (tuple, optional): (mtime, size), `None` if file removed.
+            now (float, optional): Defaults to None. Current time.
+        """
+
+        now = time.time() if now is None else now
+        if stat is None:
+            self._pending.pop(path, None)
+            old = self._known.pop(path, None)
+            if old is not None:
+                self._emit(REMOVED, path, *old)
+            return
+
+        pending = self._pending.get(path)
+        if pending is None or pending[0] != stat:
+            self._pending[path] = (stat, now)
+
+    def diff(self, snapshot, now=None):
+        """Observe changes between snapshot and current state.
+
+        Args:
+            snapshot (dict): Data from `scan`.
+            now (float, optional): Defaults to None. Current time.
+        """
+
+        for path, stat in snapshot.items():
+            if self._known.get(path) != stat:
+                self.observe(path, stat, now)
+        for path in set(self._known).union(self._pending) - set(snapshot):
+            self.observe(path, None, now)
+
+    def _emit(self, event_type, path, mtime, size):
+        try:
+            self.callback(Event(event_type, path, mtime, size))
+        except Exception:  # pylint: disable=broad-except
+            LOGGER.error('Watcher callback failed.', exc_info=True)
+
+    def _run(self):
+        LOGGER.debug('Start watching: %s', self.root)
+        try:
+            self._scan()
+            while not self._stop_event.is_set():
+                try:
+                    self.poll()
+                    self.check()
+                except Exception:  # pylint: disable=broad-except
+                    LOGGER.error('Watcher error.', exc_info=True)
+                    self._stop_event.wait(self.interval)
+        finally:
+            self._close()
+        LOGGER.debug('Stop watching: %s', self.root)
+
+    def poll(self):
+        """Wait and collect changes.  """
+
+        raise NotImplementedError
+
+
+class PollingWatcher(BaseWatcher):
+    """Watcher that compare stat snapshots.  """
+
+    def poll(self):
+        self._stop_event.wait(self.interval)
+        self.diff(scan(self.root, self.suffix))
+
+
+_IN_MODIFY = 0x00000002
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_DELETE_SELF = 0x00000400
+_IN_MOVE_SELF = 0x00000800
+_IN_Q_OVERFLOW = 0x00004000
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+_INOTIFY_EVENT = struct.Struct(str('iIII'))
+
+
+def _load_libc():
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library(
+            'c') or 'libc.so.6', use_errno=True)
+        _ = libc.inotify_init1, libc.inotify_add_watch
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+
+_LIBC = _load_libc()
+
+
+class InotifyWatcher(BaseWatcher):
+    """Watcher use linux inotify.  """
+
+    mask = (_IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO
+            | _IN_CREATE | _IN_DELETE | _IN_DELETE_SELF | _IN_MOVE_SELF)
+
+    def __init__(self, *args, **kwargs):
+        super(InotifyWatcher, self).__init__(*args, **kwargs)
+        self._fd = None
+
+    @classmethod
+    def is_avaliable(cls):
+        """Whether inotify can be used on this platform.  """
+
+        return _LIBC is not None
+
+    def start(self):
+        fd = _LIBC.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        path = self.root.encode(sys.getfilesystemencoding())
+        if _LIBC.inotify_add_watch(fd, path, self.mask) < 0:
+            err = ctypes.get_errno()
+            os.close(fd)
+            raise OSError(err, 'inotify_add_watch failed', self.root)
+        self._fd = fd
+        super(InotifyWatcher, self).start()
+
+    def _close(self):
+        # Closed by watcher thread, so `poll` never selects a closed fd.
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def poll(self):
+        timeout = min(self.debounce, self.interval) / 2.0
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except OSError as ex:
+            if ex.errno == errno.EAGAIN:
+                return
+            raise
+
+        names = set()
+        offset = 0
+        while offset < len(data):
+            _, mask, _, length = _INOTIFY_EVENT.unpack_from(data, offset)
+            offset += _INOTIFY_EVENT.size
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+            if mask & (_IN_DELETE_SELF | _IN_MOVE_SELF):
+                LOGGER.warning('Watched directory removed: %s', self.root)
+                self._stop_event.set()
+                return
+            if mask & _IN_Q_OVERFLOW:
+                # Events dropped by kernel.
+                LOGGER.warning('Inotify queue overflow, rescan: %s', self.root)
+                self.diff(scan(self.root, self.suffix))
+                return
+            names.add(u(name))
+
+        for name in names:
+            if self.suffix and not name.lower().endswith(self.suffix):
+                continue
+            path = os.path.normpath(os.path.join(self.root, name))
+            self.observe(path, _stat(path))
+
+
+def create(root, callback, **kwargs):
+    """Create best avaliable watcher for the platform.
+
+    Args:
+        root (str): Directory to watch.
+        callback (callable): Called with `Event` from watcher thread.
+        **kwargs: Keyword arguments for watcher.
+
+    Returns:
+        BaseWatcher: Watcher, not started.
+    """
+
+    if InotifyWatcher.is_avaliable():
+        return InotifyWatcher(root, callback, **kwargs)
+    return PollingWatcher(root, callback, **kwargs)
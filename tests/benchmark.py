@@ -0,0 +1,263 @@
+#! /usr/bin/env python
+# -*- coding=UTF-8 -*-
+"""Render benchmark with fake nuke.
+
+Usage:
+    python tests/benchmark.py --tasks 20 --frames 50
+
+Config, database and log are created in a temporary home directory,
+user data is not touched.
+"""
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from subprocess import PIPE, Popen
+
+__dirname__ = os.path.abspath(os.path.dirname(__file__))
+HOME = tempfile.mkdtemp(prefix='batchrender-benchmark-')
+os.environ['HOME'] = os.environ['USERPROFILE'] = HOME
+os.makedirs(os.path.join(HOME, '.nuke', 'batchrender'))
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.insert(0, os.path.join(__dirname__, '..', 'lib'))
+sys.path.insert(0, __dirname__)
+
+# pylint: disable=wrong-import-position
+import fake_nuke
+from PySide2.QtCore import QTimer
+from PySide2.QtWidgets import QApplication
+from sqlalchemy import event
+
+from batchrender import database, model, render
+from batchrender.config import CONFIG
+from batchrender.render.proc_handler import NukeHandler
+
+
+class Counter(object):
+    """Count calls and time spent.  """
+
+    def __init__(self):
+        self.count = 0
+        self.cost = 0.0
+
+    def wrap(self, func):
+        """Wrap a function to count it.  """
+
+        def _func(*args, **kwargs):
+            start = time.time()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.count += 1
+                self.cost += time.time() - start
+        return _func
+
+
+def _create_scripts(dirname, count, frames=100, chain=False):
+    for i in range(count):
+        with open(os.path.join(dirname, 'bench_{:04d}_v1.nk'.format(i)), 'w') as f:
+            f.write('Root {{\n name bench_{0}\n first_frame 1\n last_frame {1}\n}}\n'
+                    .format(i, frames))
+            if chain and i:
+                # Read output of previous script.
+                f.write('Read {{\n file output/bench_{0}.%04d.exr\n name Read1\n}}\n'
+                        .format(i - 1))
+            f.write('Write {{\n file output/bench_{0}.%04d.exr\n name Write1\n}}\n'
+                    .format(i))
+
+
+def _setup_models(dirname):
+    source_model = model.DirectoryModel()
+    proxy_model = model.FilesProxyModel(None)
+    proxy_model.setSourceModel(source_model)
+    watcher = model.DirectoryWatcher()
+    proxy_model.set_watcher(watcher)
+    watcher.set_root(dirname)
+    source_model.setRootPath(dirname)
+    return source_model, proxy_model, watcher
+
+
+def _wait(app, condition, timeout):
+    start = time.time()
+    while not condition() and time.time() - start < timeout:
+        app.processEvents()
+        time.sleep(0.001)
+    return condition()
+
+
+def bench_handler(app, args):
+    """Lines per second handled by `NukeHandler`.  """
+
+    dirname = tempfile.mkdtemp(dir=HOME)
+    script = os.path.join(dirname, 'handler.nk')
+    with open(script, 'w') as f:
+        f.write('Root {}\n')
+    env = dict(os.environ,
+               FAKE_NUKE_FRAME_TIME='0',
+               FAKE_NUKE_NOISE_LINES=str(args.noise_lines))
+    frames = args.frames * 10
+    start = time.time()
+    proc = Popen(
+        [CONFIG['NUKE'], '-x', '-F', '1-{}'.format(frames), script],
+        stdout=PIPE, stderr=PIPE, cwd=dirname, env=env)
+    handler = NukeHandler(proc)
+    received = []
+    handler.frame_finished.connect(lambda data: received.append(data))
+    handler.start()
+    _wait(app, lambda: len(received) >= frames, args.timeout)
+    cost = time.time() - start
+    lines = frames * (args.noise_lines + 2)
+    return [
+        ('handler lines', lines),
+        ('handler lines/s', lines / cost),
+        ('handler frames/s', len(received) / cost),
+    ]
+
+
+def bench_queue(app, args):
+    """Scheduler overhead on a large queue.  """
+
+    dirname = tempfile.mkdtemp(dir=HOME)
+    _create_scripts(dirname, args.queue_size)
+    _, proxy_model, watcher = _setup_models(dirname)
+    queue = render.Queue(proxy_model)
+    _wait(app, lambda: proxy_model.rowCount(proxy_model.root_index()) >= args.queue_size,
+          args.timeout)
+    _wait(app, lambda: not queue.diagnostics()['estimating'], args.timeout)
+
+    start = time.time()
+    queue.update_remains()
+    resync_cost = time.time() - start
+
+    start = time.time()
+    task = queue.get()
+    get_cost = time.time() - start
+
+    start = time.time()
+    for _ in range(1000):
+        queue.update_task(task)
+    update_cost = (time.time() - start) / 1000
+
+    start = time.time()
+    list(proxy_model.old_version_files())
+    old_version_cost = time.time() - start
+    watcher.stop()
+
+    return [
+        ('queue size', args.queue_size),
+        ('queue resync (ms)', resync_cost * 1000),
+        ('queue get (ms)', get_cost * 1000),
+        ('queue update task (ms)', update_cost * 1000),
+        ('old version files (ms)', old_version_cost * 1000),
+    ]
+
+
+def bench_render(app, args):
+    """End to end render with slave.  """
+
+    dirname = tempfile.mkdtemp(dir=HOME)
+    dict.__setitem__(CONFIG, 'DIR', dirname)
+    os.environ['FAKE_NUKE_FRAME_TIME'] = str(args.frame_time)
+    os.environ['FAKE_NUKE_NOISE_LINES'] = str(args.noise_lines)
+    os.environ['FAKE_NUKE_RANGE'] = '1-{}'.format(args.frames)
+    _create_scripts(dirname, args.tasks, args.frames, args.chain)
+    source_model, proxy_model, watcher = _setup_models(dirname)
+    queue = render.Queue(proxy_model)
+    slave = render.Slave(queue)
+    _wait(app, lambda: proxy_model.rowCount(proxy_model.root_index()) >= args.tasks,
+          args.timeout)
+
+    commits = Counter()
+    event.listen(database.core.Session, 'after_commit',
+                 lambda _: setattr(commits, 'count', commits.count + 1))
+    set_data = Counter()
+    source_model.setData = set_data.wrap(source_model.setData)
+    frames = Counter()
+    slave.progressed.connect(lambda _: setattr(
+        frames, 'count', frames.count + 1))
+
+    is_finished = []
+    slave.finished.connect(lambda: is_finished.append(True))
+    start = time.time()
+    QTimer.singleShot(0, slave.start)
+    _wait(app, lambda: is_finished, args.timeout)
+    cost = time.time() - start
+    watcher.stop()
+
+    frame_count = args.tasks * args.frames
+    render_cost = frame_count * args.frame_time / args.concurrent
+    return [
+        ('render tasks', args.tasks),
+        ('render frames', frame_count),
+        ('render wall time (s)', cost),
+        ('scheduler overhead per task (s)', (cost - render_cost) / args.tasks),
+        ('db commits', commits.count),
+        ('db commits per frame', commits.count / frame_count),
+        ('model setData per frame', set_data.count / frame_count),
+        ('model update cost per frame (ms)',
+         set_data.cost / frame_count * 1000),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tasks', type=int, default=10)
+    parser.add_argument('--frames', type=int, default=50)
+    parser.add_argument('--frame-time', type=float, default=0.01)
+    parser.add_argument('--noise-lines', type=int, default=5)
+    parser.add_argument('--concurrent', type=int, default=1)
+    parser.add_argument('--validate', type=int, default=0,
+                        help='Config `VALIDATE` for render.')
+    parser.add_argument('--progressive', type=int, default=0,
+                        help='Config `PROGRESSIVE` for render.')
+    parser.add_argument('--batch-cost', type=float, default=0,
+                        help='Config `BATCH_COST` for render.')
+    parser.add_argument('--recycle-frames', type=int, default=0,
+                        help='Config `RECYCLE_FRAMES` for render.')
+    parser.add_argument('--chain', action='store_true',
+                        help='Each render task reads output of previous one.')
+    parser.add_argument('--queue-size', type=int, default=2000)
+    parser.add_argument('--timeout', type=float, default=600)
+    parser.add_argument('--keep', action='store_true',
+                        help='Keep temporary home directory.')
+    args = parser.parse_args()
+
+    app = QApplication.instance() or QApplication([])
+    dict.__setitem__(CONFIG, 'NUKE', fake_nuke.create_executable(HOME))
+    for k in ('THREADS', 'MEMORY_LIMIT', 'LOW_PRIORITY'):
+        dict.__setitem__(CONFIG, k, 0)
+    dict.__setitem__(CONFIG, 'MAX_CONCURRENT', args.concurrent)
+    dict.__setitem__(CONFIG, 'VALIDATE', args.validate)
+    dict.__setitem__(CONFIG, 'PROGRESSIVE', args.progressive)
+    dict.__setitem__(CONFIG, 'INFER_DEPENDENCIES', int(args.chain))
+    dict.__setitem__(CONFIG, 'BATCH_COST', args.batch_cost)
+    dict.__setitem__(CONFIG, 'RECYCLE_FRAMES', args.recycle_frames)
+
+    try:
+        results = []
+        for i in (bench_handler, bench_queue, bench_render):
+            results.extend(i(app, args))
+        width = max(len(k) for k, _ in results)
+        for k, v in results:
+            print('{:<{}} {:>12.3f}'.format(k, width, v)
+                  if isinstance(v, float) else
+                  '{:<{}} {:>12}'.format(k, width, v))
+    finally:
+        for i in threading.enumerate():
+            if i is not threading.current_thread() and not i.daemon:
+                i.join(args.timeout)
+        if args.keep:
+            print('Home directory: {}'.format(HOME))
+        else:
+            shutil.rmtree(HOME, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
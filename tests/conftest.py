@@ -0,0 +1,30 @@
+# -*- coding=UTF-8 -*-
+"""Shared test fixtures.  """
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import time
+
+import pytest
+from PySide2.QtCore import QCoreApplication
+
+
+@pytest.fixture(name='app')
+def _app():
+    return QCoreApplication.instance() or QCoreApplication([])
+
+
+@pytest.fixture(name='wait')
+def _wait(app):
+    def _func(proc, timeout=30):
+        """Process events until process exits.  """
+
+        start = time.time()
+        while proc.poll() is None and time.time() - start < timeout:
+            app.processEvents()
+        # Wait handler threads.
+        time.sleep(0.2)
+        app.processEvents()
+
+    return _func
@@ -0,0 +1,214 @@
+#! /usr/bin/env python
+# -*- coding=UTF-8 -*-
+"""Fake nuke executable for testing render without nuke.
+
+Accept same arguments as `batchrender.render.task.nuke_process` used,
+print nuke style render output and write dummy output files.
+
+Behavior can be changed by environment variables:
+
+    FAKE_NUKE_FRAME_TIME: Seconds for each frame, defaults to 0.01.
+    FAKE_NUKE_STARTUP_TIME: Seconds before first frame, defaults to 0.
+    FAKE_NUKE_NOISE_LINES: Extra stdout lines for each frame, defaults to 0.
+    FAKE_NUKE_RANGE: Range when not specified by `-F`, defaults to `1-100`.
+    FAKE_NUKE_OUTPUT: Output path pattern,
+        defaults to `output/{stem}.%04d.exr` relative to working directory.
+    FAKE_NUKE_FAIL_AT: Exit with error before render this frame.
+    FAKE_NUKE_STDERR: Text print to stderr before render.
+    FAKE_NUKE_FAIL_SCRIPT: Script name pattern that fails to open,
+        only for `-t` driver script.
+
+With `-t`, the script is run as python with a fake `nuke` module,
+that supports what `batchrender.render.batch` driver script uses.
+"""
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import argparse
+import fnmatch
+import os
+import re
+import sys
+import time
+
+
+def _env(key, default, type_=str):
+    value = os.getenv(key)
+    if value is None:
+        return default
+    return type_(value)
+
+
+def parse_range(text):
+    """Parse nuke style frame range.
+
+    >>> parse_range('1-5x2 7')
+    [1, 3, 5, 7]
+    """
+
+    ret = []
+    for i in text.split():
+        match = re.match(r'(-?\d+)(?:-(-?\d+))?(?:x(\d+))?$', i)
+        if not match:
+            raise ValueError('Can not parse range.', i)
+        first, last, increment = match.groups()
+        first = int(first)
+        last = int(last) if last is not None else first
+        ret.extend(range(first, last + 1, int(increment or 1)))
+    return ret
+
+
+def create_executable(dirname):
+    """Create a executable file that run this script.
+
+    Args:
+        dirname (str): Directory to put the executable.
+
+    Returns:
+        str: Executable path, can be used as nuke path in config.
+    """
+
+    script = os.path.abspath(__file__)
+    if sys.platform == 'win32':
+        path = os.path.join(dirname, 'fake_nuke.bat')
+        content = '@"{}" "{}" %*\n'.format(sys.executable, script)
+    else:
+        path = os.path.join(dirname, 'fake_nuke')
+        content = '#!/bin/sh\nexec "{}" "{}" "$@"\n'.format(
+            sys.executable, script)
+    with open(path, 'w') as f:
+        f.write(content)
+    os.chmod(path, 0o755)
+    return path
+
+
+def _parse_args(argv):
+    parser = argparse.ArgumentParser(prog='nuke')
+    parser.add_argument('-x', action='store_true')
+    parser.add_argument('-t', action='store_true')
+    parser.add_argument('-f', action='store_true')
+    parser.add_argument('-p', action='store_true')
+    parser.add_argument('-F', action='append', default=[])
+    parser.add_argument('-m', type=int)
+    parser.add_argument('-c')
+    parser.add_argument('--priority')
+    parser.add_argument('--cont', action='store_true')
+    parser.add_argument('script')
+    return parser.parse_args(argv)
+
+
+class _Knob(object):
+    def __init__(self, value=None):
+        self._value = value
+
+    def value(self):
+        return self._value
+
+    def setValue(self, value):  # pylint: disable=invalid-name
+        self._value = value
+
+
+class _Node(object):
+    def __init__(self, class_, **knobs):
+        self._class = class_
+        self._knobs = {k: _Knob(v) for k, v in knobs.items()}
+
+    def Class(self):  # pylint: disable=invalid-name
+        return self._class
+
+    def __getitem__(self, name):
+        return self._knobs.setdefault(name, _Knob())
+
+
+class _FakeNukeModule(object):
+    """Fake `nuke` module for driver script.  """
+
+    def __init__(self):
+        self._script = None
+        frames = parse_range(_env('FAKE_NUKE_RANGE', '1-100'))
+        self._root = _Node('Root', first_frame=min(frames),
+                           last_frame=max(frames), proxy=False)
+
+    def scriptOpen(self, path):  # pylint: disable=invalid-name
+        if not os.path.exists(path):
+            raise RuntimeError('{}: No such file or directory'.format(path))
+        pattern = os.getenv('FAKE_NUKE_FAIL_SCRIPT')
+        if pattern and fnmatch.fnmatch(os.path.basename(path), pattern):
+            raise RuntimeError('Fake error on open {}.'.format(path))
+        self._script = path
+
+    def scriptClear(self):  # pylint: disable=invalid-name
+        self._script = None
+
+    def root(self):
+        return self._root
+
+    def allNodes(self, recurseGroups=False):  # pylint: disable=invalid-name,unused-argument
+        return [_Node('Write', disable=False)]
+
+    def executeMultiple(self, nodes, ranges, continueOnError=False):  # pylint: disable=invalid-name,unused-argument
+        stem = os.path.splitext(os.path.basename(self._script))[0]
+        output = _env('FAKE_NUKE_OUTPUT', 'output/{stem}.%04d.exr').format(stem=stem)
+        for first, last, increment in ranges:
+            for frame in range(first, last + 1, increment):
+                _render_frame(output, frame)
+
+
+def _render_frame(output, frame):
+    start = time.time()
+    for i in range(_env('FAKE_NUKE_NOISE_LINES', 0, int)):
+        print('Fake render log line {} of frame {}.'.format(i, frame))
+    path = os.path.abspath(output % frame).replace('\\', '/')
+    if not os.path.isdir(os.path.dirname(path)):
+        os.makedirs(os.path.dirname(path))
+    with open(path, 'wb') as f:
+        f.write(b'\0' * 64)
+    time.sleep(max(_env('FAKE_NUKE_FRAME_TIME', 0.01, float)
+                   - (time.time() - start), 0))
+    print('Writing {} took {:.2f} seconds'.format(path, time.time() - start))
+
+
+def _run_driver(path):
+    sys.modules['nuke'] = _FakeNukeModule()
+    with open(path) as f:
+        code = compile(f.read(), path, 'exec')
+    exec(code, {'__name__': '__main__'})  # pylint: disable=exec-used
+    return 0
+
+
+def main(argv=None):
+    args = _parse_args(sys.argv[1:] if argv is None else argv)
+    if args.t:
+        return _run_driver(args.script)
+    fail_at = _env('FAKE_NUKE_FAIL_AT', None, int)
+    stem = os.path.splitext(os.path.basename(args.script))[0]
+    output = _env('FAKE_NUKE_OUTPUT', 'output/{stem}.%04d.exr').format(stem=stem)
+    frames = []
+    for i in args.F or [_env('FAKE_NUKE_RANGE', '1-100')]:
+        frames.extend(parse_range(i))
+
+    print('Nuke 10.0v4, 64 bit, built Jan 18 2017.')
+    print('Copyright (c) 2017 The Foundry Visionmongers Ltd.  All Rights Reserved.')
+    sys.stdout.flush()
+    if not os.path.exists(args.script):
+        print('{}: No such file or directory'.format(args.script), file=sys.stderr)
+        return 1
+    stderr = os.getenv('FAKE_NUKE_STDERR')
+    if stderr:
+        print(stderr, file=sys.stderr)
+        sys.stderr.flush()
+    time.sleep(_env('FAKE_NUKE_STARTUP_TIME', 0, float))
+
+    for current, frame in enumerate(frames, 1):
+        if frame == fail_at:
+            print('Write1: Fake error on frame {}.'.format(frame), file=sys.stderr)
+            return 1
+        _render_frame(output, frame)
+        print('Frame {} ({} of {})'.format(frame, current, len(frames)))
+        sys.stdout.flush()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
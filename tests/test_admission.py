@@ -0,0 +1,73 @@
+# -*- coding=UTF-8 -*-
+"""Admission control test.  """
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+from collections import namedtuple
+
+import pytest
+
+from batchrender.render import admission
+from batchrender.render.admission import AdmissionController
+
+_Task = namedtuple('_Task', ('path', 'file_hash'))
+GB = 2 ** 30
+
+
+@pytest.fixture(name='controller')
+def _controller(monkeypatch):
+    ret = AdmissionController()
+    sizes = {'big': 12 * GB, 'medium': 4 * GB, 'small': 1 * GB}
+    monkeypatch.setattr(ret, 'predict', lambda file_hash, path=None: sizes[file_hash])
+    return ret
+
+
+def _tasks(*sizes):
+    return [_Task('{}_{}.nk'.format(i, size), size)
+            for i, size in enumerate(sizes)]
+
+
+def _paths(tasks):
+    return [i.path for i in tasks]
+
+
+def test_pack(controller, monkeypatch):
+    monkeypatch.setattr(controller, 'budget', lambda running: 6 * GB)
+    tasks = _tasks('big', 'small', 'medium', 'small', 'small')
+
+    # Nothing fits after the first task, but it starts anyway.
+    assert _paths(controller.select(tasks, [], 3)) == _paths(tasks[:1])
+    assert _paths(controller.select(tasks[1:], ['running'], 4)) == \
+        _paths([tasks[1], tasks[2], tasks[3]])
+    assert controller.select(tasks, ['running'], 0) == []
+
+
+def test_no_starvation(controller, monkeypatch):
+    monkeypatch.setattr(controller, 'budget', lambda running: 2 * GB)
+    tasks = _tasks('big', 'small')
+
+    for _ in range(controller.max_skip):
+        assert _paths(controller.select(tasks, ['running'], 1)) == \
+            _paths(tasks[1:])
+    assert controller.select(tasks, ['running'], 1) == []
+    assert _paths(controller.select(tasks, [], 1)) == _paths(tasks[:1])
+
+
+def test_estimate(tmpdir, monkeypatch):
+    path = tmpdir.join('a.nk')
+    path.write('Root {\n format "1920 1080 0 0 1920 1080 1 HD_1080"\n}\n'
+               'Read {\n file a.%04d.exr\n}\n'
+               'Write {\n file b.%04d.exr\n}\n')
+    frame = 1920 * 1080 * admission.BYTES_PER_PIXEL
+    assert admission.estimate(str(path)) == admission.BASE_MEMORY + 2 * frame
+    assert admission.estimate(str(tmpdir.join('missing.nk'))) is None
+
+    # Used before largest recorded peak of other files.
+    controller = AdmissionController()
+    monkeypatch.setattr(admission.database.Resource, 'summary',
+                        classmethod(lambda cls, sess, **kwargs: dict(
+                            rss_peak=None if kwargs else 64 * GB)))
+    assert controller.predict('hash', str(path)) == \
+        admission.BASE_MEMORY + 2 * frame
+    assert controller.predict('other') == 64 * GB
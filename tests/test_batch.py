@@ -0,0 +1,51 @@
+# -*- coding=UTF-8 -*-
+"""Batch render test with fake nuke.  """
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import os
+import sys
+from subprocess import PIPE, Popen
+
+from batchrender.render import batch, failure
+
+sys.path.insert(0, os.path.dirname(__file__))
+import fake_nuke  # pylint: disable=wrong-import-position
+
+
+def test_batch_handler(wait, tmpdir, monkeypatch):
+    monkeypatch.setenv('FAKE_NUKE_FAIL_SCRIPT', 'b.nk')
+    executable = fake_nuke.create_executable(str(tmpdir))
+    scripts = []
+    for name in ('a.nk', 'b.nk', 'c.nk'):
+        scripts.append(tmpdir.join(name))
+        scripts[-1].write('Root {}')
+    driver = tmpdir.join('driver.py')
+    driver.write(batch.driver_script([
+        (str(scripts[0]), [1, 3]),
+        (str(scripts[1]), [1]),
+        (str(scripts[2]), None),
+    ]))
+    monkeypatch.setenv('FAKE_NUKE_RANGE', '1-2')
+    proc = Popen([executable, '-t', str(driver)],
+                 stdout=PIPE, stderr=PIPE, cwd=str(tmpdir))
+    classifiers = [failure.Classifier() for _ in range(3)]
+    handler = batch.BatchHandler(proc, classifiers)
+    started, finished, frames, outputs = [], [], [], []
+    handler.entry_started.connect(lambda index: started.append(index))
+    handler.entry_finished.connect(lambda *args: finished.append(args))
+    handler.frame_finished.connect(lambda data: frames.append(data))
+    handler.output_updated.connect(lambda data: outputs.append(data))
+    handler.start()
+    wait(proc)
+
+    assert proc.returncode == 0
+    assert started == [0, 1, 2]
+    assert finished == [(0, 0), (1, 1), (2, 0)]
+    assert [(i['entry'], i['frame'], i['current'], i['total'])
+            for i in frames] == [(0, 1, 1, 2), (0, 3, 2, 2),
+                                 (2, 1, 1, 2), (2, 2, 2, 2)]
+    assert [(i['entry'], i['frame']) for i in outputs] == [
+        (0, 1), (0, 3), (2, 1), (2, 2)]
+    assert os.path.basename(outputs[-1]['path']) == 'c.0002.exr'
@@ -69,3 +69,81 @@ def test_output(session):
         assert database.output.get_sequence_pattern(files) == [i], i
         _ = [session.delete(i) for i in files]
         session.commit()
+
+
+def test_file_statistics(session):
+    file_obj = database.File(hash='abc', first_frame=1, last_frame=10)
+    session.add(file_obj)
+    session.add_all([database.Frame(file_hash='abc', frame=i, cost=i)
+                     for i in range(1, 11)])
+    session.flush()
+
+    result = file_obj.statistics()
+    assert result['hash'] == 'abc'
+    assert result['frame_count'] == 10
+    assert result['range'] == '1-10'
+    assert result['average_frame_cost'] == 5.5
+
+
+def test_estimate_without_insert(session):
+    session.add_all([database.Frame(file_hash='abc', frame=i, cost=i)
+                     for i in range(1, 11)])
+    session.add(database.Frame(file_hash='other', frame=1, cost=100))
+    session.flush()
+
+    file_obj = database.File(hash='abc')
+    assert file_obj.statistics(session)['average_frame_cost'] == 5.5
+    assert file_obj.estimate_cost(10, session=session) == 55
+    assert database.File(hash='new').estimate_cost(
+        2, session=session) == pytest.approx(155 / 11 * 2)
+    assert not session.query(database.File).count()
+
+
+def test_phase_summary(session):
+    session.add(database.File(hash='abc'))
+    session.bulk_insert_mappings(database.Phase, [
+        dict(run='1', name='task', start=0, cost=10, file_hash='abc'),
+        dict(run='1', name='spawn', start=0, cost=1, file_hash='abc'),
+        dict(run='1', name='commit', start=1, cost=0.5, file_hash='abc'),
+        dict(run='1', name='commit', start=2, cost=0.5, file_hash='abc'),
+        dict(run='2', name='spawn', start=20, cost=3, file_hash='def'),
+    ])
+    session.bulk_insert_mappings(database.Frame, [
+        dict(file_hash='abc', frame=i, cost=2, timestamp=i) for i in range(4)])
+
+    result = database.Phase.summary(session, file_hash='abc')
+    assert list(result) == ['spawn', 'commit', 'frame']
+    assert result['commit']['count'] == 2
+    assert result['commit']['total'] == 1
+    assert result['frame']['average'] == 2
+    assert result['frame']['ratio'] == 0.8
+
+    result = database.Phase.summary(session, since=10)
+    assert list(result) == ['spawn']
+
+
+def test_resource_summary(session):
+    session.bulk_insert_mappings(database.Resource, [
+        dict(run='1', frame=1, timestamp=1, samples=1, cpu_average=800,
+             cpu_max=800, rss_peak=4 * 2 ** 30, threads=20, file_hash='abc'),
+        dict(run='1', frame=None, timestamp=2, samples=1, cpu_average=100,
+             cpu_max=400, rss_peak=2 ** 30, io_read=10, io_write=20,
+             threads=16, file_hash='abc'),
+        dict(run='2', frame=None, timestamp=3, samples=3, cpu_average=300,
+             cpu_max=600, rss_peak=2 * 2 ** 30, io_read=10, io_write=20,
+             threads=8, file_hash='abc'),
+        dict(run='3', frame=None, timestamp=4, samples=1, cpu_average=100,
+             cpu_max=100, rss_peak=2 ** 30, threads=8, file_hash='def'),
+    ])
+
+    result = database.Resource.summary(session, file_hash='abc')
+    assert result['runs'] == 2
+    assert result['cpu_average'] == 250
+    assert result['cpu_max'] == 600
+    assert result['rss_peak'] == 2 * 2 ** 30
+    assert result['io_write'] == 40
+    assert result['threads'] == 16
+
+    result = database.Resource.summary(session, file_hash='xyz')
+    assert result['runs'] == 0
+    assert result['rss_peak'] is None
@@ -0,0 +1,80 @@
+# -*- coding=UTF-8 -*-
+"""Script dependency test.  """
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import doctest
+
+from batchrender.framerange import FrameRange
+from batchrender.render import dependency
+
+
+def test_doctest():
+    assert not doctest.testmod(dependency).failed
+
+
+def _write(tmpdir, name, reads=(), writes=()):
+    path = tmpdir.join(name)
+    path.write(''.join(
+        ['Read {{\n file {}\n}}\n'.format(i) for i in reads]
+        + ['Write {{\n file {}\n}}\n'.format(i) for i in writes]))
+    return dependency.pattern_key(str(path), str(tmpdir))
+
+
+def test_build(tmpdir):
+    plate = _write(tmpdir, 'plate.nk', writes=['plate/a.####.exr'])
+    precomp = _write(tmpdir, 'precomp.nk',
+                     reads=['plate/a.%04d.exr'], writes=['pre/a.%04d.exr'])
+    comp = _write(tmpdir, 'comp.nk',
+                  reads=['pre/a.####.exr', 'plate/a.####.exr', '"[value x]"'],
+                  writes=['comp/a.%04d.exr'])
+    other = _write(tmpdir, 'other.nk', reads=['plate/b.%04d.exr'])
+    keys = [plate, precomp, comp, other]
+
+    graph = dependency.Graph.build(keys, str(tmpdir), {}, True)
+    assert set(graph.upstreams(comp)) == {precomp, plate}
+    assert set(graph.upstreams(precomp)) == {plate}
+    assert not graph.upstreams(plate)
+    assert not graph.upstreams(other)
+    assert len(graph) == 3
+
+    assert not dependency.Graph.build(keys, str(tmpdir), {}, False)
+
+    graph = dependency.Graph.build(
+        keys, str(tmpdir), {'other.nk': 'comp*.nk'}, False)
+    assert list(graph.upstreams(other)) == [comp]
+    assert graph.upstreams(other)[comp] == set()
+
+
+def test_break_cycles():
+    graph = dependency.Graph()
+    graph.add('a', 'b')
+    graph.add('b', 'c')
+    graph.add('c', 'a')
+    graph.add('c', 'c')
+    assert graph.break_cycles() == [('c', 'a')]
+    assert len(graph) == 2
+    assert graph.break_cycles() == []
+
+
+def test_released():
+    graph = dependency.Graph()
+    graph.add('comp', 'pre1', 'pre1.%04d.exr')
+    graph.add('comp', 'pre2', 'pre2.%04d.exr')
+    graph.add('late', 'comp')
+    confirmed = {
+        'pre1': FrameRange(range(1, 11)),
+        'pre2': FrameRange(range(5, 21)),
+        'comp': FrameRange(range(1, 5)),
+    }
+
+    assert graph.released('comp', confirmed.get) == FrameRange(range(5, 11))
+    assert graph.released('late', confirmed.get) == FrameRange()
+    assert graph.released('pre1', confirmed.get) is None
+
+    # Finished upstream does not hold.
+    del confirmed['pre2']
+    assert graph.released('comp', confirmed.get) == FrameRange(range(1, 11))
+    del confirmed['comp']
+    assert graph.released('late', confirmed.get) is None
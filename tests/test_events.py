@@ -0,0 +1,48 @@
+# -*- coding=UTF-8 -*-
+"""Event log test.  """
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import threading
+
+from batchrender import events
+
+
+def test_event_log(tmpdir):
+    log = events.EventLog(str(tmpdir), max_bytes=500)
+    for i in range(20):
+        log.emit(events.FRAME_FINISHED, file='测试.nk', frame=i)
+    log.close()
+
+    paths = events.files(str(tmpdir))
+    assert len(paths) > 1
+    records = [j for i in paths for j in events.read(i)]
+    assert [i['frame'] for i in records] == list(range(20))
+    assert all(i['version'] == events.SCHEMA_VERSION for i in records)
+    assert records[0]['file'] == '测试.nk'
+    assert records[0]['event'] == events.FRAME_FINISHED
+
+
+def test_follow(tmpdir):
+    log = events.EventLog(str(tmpdir), max_bytes=300)
+    log.emit(events.STARTED, frame=-1)
+    log.flush()
+    received = []
+    is_done = threading.Event()
+
+    def _follow():
+        for i in events.follow(str(tmpdir), from_start=True, interval=0.01,
+                               stop=lambda: len(received) >= 11):
+            received.append(i['frame'])
+        is_done.set()
+
+    thread = threading.Thread(target=_follow)
+    thread.daemon = True
+    thread.start()
+    for i in range(10):
+        log.emit(events.FRAME_FINISHED, frame=i)
+        log.flush()
+    assert is_done.wait(10)
+    log.close()
+    assert received == list(range(-1, 10))
@@ -0,0 +1,59 @@
+# -*- coding=UTF-8 -*-
+"""Render failure classification test.  """
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import doctest
+
+import pytest
+
+from batchrender.render import failure
+
+
+def test_doctest():
+    assert not doctest.testmod(failure).failed
+
+
+@pytest.mark.parametrize('line,expected', [
+    ('There are no active Write operators in this script', failure.PERMANENT),
+    ("Read1: Read error: No such file or directory", failure.PERMANENT),
+    ("Can't read /mnt/a.exr: Permission denied", failure.PERMANENT),
+    ('Unable to get a licence for nuke_r', failure.TRANSIENT),
+    ('Nuke cannot find a valid license.', failure.TRANSIENT),
+    ('RLM error: license server is down', failure.TRANSIENT),
+    ('Foundry licensing: loaded plugin banner', None),
+    ('Connection timed out', failure.TRANSIENT),
+    ('NetworkDistance1: created', None),
+    ("RuntimeError: No enabled write node.", failure.PERMANENT),
+    ('Read1: Error reading pixel data from image file "a.exr". '
+     'Early end of file: read 1 out of 2 requested bytes.', failure.TRANSIENT),
+    ('Segmentation fault (core dumped)', failure.CRASH),
+    ('Writing a.0001.exr took 1.00 seconds', None),
+])
+def test_match(line, expected):
+    assert failure.match(line) == expected
+
+
+def test_classify():
+    classifier = failure.Classifier()
+    assert classifier.classify(1) == failure.CRASH
+    assert classifier.classify(1, is_time_out=True) == failure.TIMEOUT
+
+    classifier.feed('Segmentation fault\n')
+    classifier.feed('Unable to get a license\n')
+    assert classifier.classify(-11) == failure.TRANSIENT
+    classifier.feed('Read error: No such file or directory\n')
+    classifier.feed('Read error: No such file or directory again\n')
+    assert classifier.classify(1) == failure.PERMANENT
+    assert (classifier.message(failure.PERMANENT)
+            == 'Read error: No such file or directory')
+
+
+def test_backoff(monkeypatch):
+    monkeypatch.setattr(failure, 'CONFIG', dict(RETRY_BACKOFF=30))
+    assert failure.backoff(failure.PERMANENT, 1) == 0
+    assert failure.backoff(failure.TIMEOUT, 2) == 0
+    assert [failure.backoff(failure.TRANSIENT, i)
+            for i in range(1, 5)] == [30, 60, 120, 240]
+    assert failure.backoff(failure.CRASH, 20) == failure.MAX_BACKOFF
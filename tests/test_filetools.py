@@ -0,0 +1,25 @@
+# -*- coding=UTF-8 -*-
+"""File tools test.  """
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+from batchrender import filetools
+
+
+def test_version_index():
+    index = filetools.VersionIndex()
+    index.add('/a/sc_001_v1.nk', 3)
+    index.add('/a/sc_001_v2.nk', 1)
+    index.add('/a/sc_001_v2_1.nk', 2)
+    index.add('/b/sc_001_v1.nk', 0)
+    index.add('/a/sc_002.nk', 0)
+    assert index.outdated == {'/a/sc_001_v1.nk', '/a/sc_001_v2.nk'}
+
+    index.add('/a/sc_001_v2.nk', 4)
+    assert index.outdated == {'/a/sc_001_v1.nk', '/a/sc_001_v2_1.nk'}
+
+    index.remove('/a/sc_001_v2.nk')
+    index.remove('/a/sc_001_v2_1.nk')
+    assert not index.outdated
+    assert len(index) == 3
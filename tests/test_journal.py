@@ -0,0 +1,112 @@
+# -*- coding=UTF-8 -*-
+"""Frame journal test.  """
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import os
+from types import SimpleNamespace
+
+import pytest
+
+from batchrender.exceptions import AlreadyCompleted
+from batchrender.framerange import FrameRange
+from batchrender.render import journal
+from batchrender.render.task import NukeTask
+
+
+def _touch(path, data=b'x'):
+    with open(path, 'wb') as f:
+        f.write(data)
+    return path
+
+
+def test_completed(tmpdir):
+    j = journal.FrameJournal(str(tmpdir.join('render', 'a.journal')))
+    for i in range(1, 6):
+        path = _touch(str(tmpdir.join('a.{:04d}.exr'.format(i))))
+        assert j.add(i, path)
+    assert not j.add(6, str(tmpdir.join('a.0006.exr')))
+    assert not j.add(7, _touch(str(tmpdir.join('a.0007.exr')), b''))
+    assert list(j.completed()) == [1, 2, 3, 4, 5]
+    assert len(j.entries()) == 5
+
+    # Cached result is updated by new entries.
+    j.add(6, _touch(str(tmpdir.join('a.0006.exr'))))
+    assert list(j.completed()) == [1, 2, 3, 4, 5, 6]
+    assert list(journal.FrameJournal(j.path).completed()) == [1, 2, 3, 4, 5, 6]
+
+    # Deleted output is not completed.
+    os.remove(str(tmpdir.join('a.0003.exr')))
+    assert list(j.completed()) == [1, 2, 3, 4, 5, 6]
+    assert list(j.completed(refresh=True)) == [1, 2, 4, 5, 6]
+
+    # Broken line from crash is skipped.
+    with open(j.path, 'ab') as f:
+        f.write(b'{"frame": 8, "pa')
+    assert list(j.completed(refresh=True)) == [1, 2, 4, 5, 6]
+
+    j.remove()
+    journal.flush()
+    assert not os.path.exists(j.path)
+    assert list(j.completed()) == []
+    assert list(j.completed(refresh=True)) == []
+
+
+def test_scan(tmpdir):
+    for i in (1, 2, 10, 1001):
+        _touch(str(tmpdir.join('shot.{:04d}.exr'.format(i))))
+    _touch(str(tmpdir.join('shot.0003.exr')), b'')
+    _touch(str(tmpdir.join('shot.0004.exr.tmp')))
+    _touch(str(tmpdir.join('other.0005.exr')))
+
+    expected = [1, 2, 10, 1001]
+    for pattern in ('shot.%04d.exr', 'shot.####.exr', 'shot.%d.exr'):
+        ret = journal.scan(str(tmpdir.join(pattern)))
+        assert [i for i, _ in ret] == expected, pattern
+        assert all(os.path.exists(i) for _, i in ret)
+    assert journal.scan(str(tmpdir.join('missing', 'shot.%04d.exr'))) == []
+
+
+def test_rebuild(tmpdir):
+    j = journal.FrameJournal(str(tmpdir.join('render', 'a.journal')))
+    j.add(1, _touch(str(tmpdir.join('old.exr'))))
+    for i in (2, 3, 5):
+        _touch(str(tmpdir.join('a.{:04d}.exr'.format(i))))
+
+    ret = j.rebuild(journal.scan(str(tmpdir.join('a.%04d.exr'))))
+    assert list(ret) == [2, 3, 5]
+    assert [i['frame'] for i in j.entries()] == [2, 3, 5]
+    assert not os.path.exists(j.path + '.tmp')
+
+
+def test_remaining_range():
+    completed = FrameRange([1, 2, 3, 7])
+    assert FrameRange(FrameRange.parse('1-10') - completed).parts() == ['4-6', '8-10']
+
+
+def test_resume(tmpdir, monkeypatch):
+    j = journal.FrameJournal(str(tmpdir.join('render', 'a.journal')))
+    for i in range(1, 4):
+        j.add(i, _touch(str(tmpdir.join('a.{:04d}.exr'.format(i)))))
+    monkeypatch.setattr(journal.FrameJournal, 'for_file',
+                        classmethod(lambda cls, file_record: j))
+    task = SimpleNamespace(file=None, range=FrameRange.parse('1-5'),
+                           path=str(tmpdir.join('a.nk')),
+                           info=lambda text: None)
+
+    NukeTask._resume(task)
+    assert task.range.parts() == ['4-5']
+
+    # Crashed after last frame, nothing to render.
+    task.range = FrameRange.parse('1-3')
+    with pytest.raises(AlreadyCompleted):
+        NukeTask._resume(task)
+    assert task.range.parts() == ['1-3']
+
+    # Container output is rendered from first frame.
+    tmpdir.join('a.nk').write_text(
+        'Write {\n file a.####.exr\n}\nWrite {\n file a.mov\n}\n', 'utf-8')
+    task.range = FrameRange.parse('1-5')
+    NukeTask._resume(task)
+    assert task.range.parts() == ['1-5']
@@ -0,0 +1,68 @@
+# -*- coding=UTF-8 -*-
+"""Metrics test.  """
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import subprocess
+import sys
+import time
+
+from six.moves.urllib.request import urlopen
+
+from batchrender import metrics
+
+
+def test_registry_render():
+    registry = metrics.Registry()
+    frames = registry.counter('test_frames_total', 'Frames.')
+    tasks = registry.gauge('test_tasks', 'Tasks.')
+    frames.inc()
+    frames.inc(2)
+    tasks.set(3, state='doing')
+    tasks.set(1, state='finished')
+    assert registry.render() == '\n'.join((
+        '# HELP test_frames_total Frames.',
+        '# TYPE test_frames_total counter',
+        'test_frames_total 3.0',
+        '# HELP test_tasks Tasks.',
+        '# TYPE test_tasks gauge',
+        'test_tasks{state="doing"} 3.0',
+        'test_tasks{state="finished"} 1.0',
+    )) + '\n'
+
+
+def test_rate():
+    rate = metrics.Rate(window=30)
+    for i in range(10):
+        rate.mark(100 + i)
+    assert rate.per_minute(109) == 20
+    assert rate.per_minute(135) == 10
+    assert rate.per_minute(200) == 0
+
+
+def test_serve():
+    metrics.on_frame_finished(2.0)
+    server = metrics.serve(0)
+    try:
+        url = 'http://127.0.0.1:{}/metrics'.format(server.server_address[1])
+        text = urlopen(url).read().decode('utf-8')
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert 'batchrender_frames_per_minute ' in text
+    assert 'batchrender_process_resident_memory_bytes{process="self"}' in text
+
+
+def test_render_cpu():
+    proc = subprocess.Popen([sys.executable, '-c', 'while True: pass'])
+    try:
+        metrics.REGISTRY.render()
+        time.sleep(0.5)
+        metrics.REGISTRY.render()
+        assert metrics.PROCESS_CPU.get(process='render') > 0
+    finally:
+        proc.kill()
+        proc.wait()
+    metrics.REGISTRY.render()
+    assert proc.pid not in metrics._CHILDREN
@@ -0,0 +1,100 @@
+# -*- coding=UTF-8 -*-
+"""Scheduling policy test.  """
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import pytest
+
+from batchrender import database
+from batchrender.render import policy, simulate
+
+HOUR = 3600
+
+
+def _keys(jobs):
+    return [i.key for i in jobs]
+
+
+@pytest.fixture(name='jobs')
+def _jobs():
+    return [
+        policy.Job('long', 0, 10 * HOUR, 0, None),
+        policy.Job('short', 0, 120, 10, None),
+        policy.Job('unknown', 0, None, 20, None),
+        policy.Job('urgent', 1, 5 * HOUR, 30, None),
+    ]
+
+
+def test_fifo(jobs):
+    assert _keys(policy.FIFO().order(jobs, 100)) == [
+        'urgent', 'long', 'short', 'unknown']
+
+
+def test_sef(jobs):
+    assert _keys(policy.ShortestEstimateFirst().order(jobs, 100)) == [
+        'urgent', 'short', 'long', 'unknown']
+
+
+def test_aging(jobs):
+    # Waited more than a hour, priority raised to same as urgent one.
+    jobs[3] = jobs[3]._replace(arrival=1.5 * HOUR)
+    assert _keys(policy.Aging(rate=1).order(jobs, 1.5 * HOUR)) == [
+        'short', 'urgent', 'long', 'unknown']
+    assert _keys(policy.Aging(rate=0).order(jobs, 1.5 * HOUR)) == [
+        'urgent', 'short', 'long', 'unknown']
+
+
+def test_deadline(jobs):
+    jobs[0] = jobs[0]._replace(deadline=11 * HOUR)
+    assert _keys(policy.Deadline().order(jobs, 100)) == [
+        'urgent', 'long', 'short', 'unknown']
+
+
+def test_get(monkeypatch):
+    monkeypatch.setattr(policy, 'CONFIG', dict(
+        SCHEDULE_POLICY='sef', AGING_RATE=1.0))
+    assert isinstance(policy.get(), policy.ShortestEstimateFirst)
+    assert isinstance(policy.get('aging'), policy.Aging)
+    assert isinstance(policy.get('not_exists'), policy.FIFO)
+
+
+def test_simulate():
+    jobs = [policy.Job('long', 0, 100, 0, 150),
+            policy.Job('short1', 0, 10, 0, 30),
+            policy.Job('short2', 0, 10, 0, 30)]
+    durations = {i.key: i.estimate for i in jobs}
+
+    fifo = simulate.simulate(jobs, durations, policy.FIFO())
+    assert fifo.makespan == 120
+    assert fifo.mean_wait == pytest.approx((0 + 100 + 110) / 3)
+    assert fifo.late == 2
+
+    sef = simulate.simulate(jobs, durations, policy.ShortestEstimateFirst())
+    assert sef.makespan == 120
+    assert sef.mean_wait == pytest.approx((0 + 10 + 20) / 3)
+    assert sef.late == 0
+
+    parallel = simulate.simulate(jobs, durations, policy.FIFO(), slots=2)
+    assert parallel.makespan == 100
+    assert parallel.late == 0
+
+
+def test_load_jobs():
+    database.core.setup('sqlite:///:memory:')
+    session = database.core.Session()
+    session.bulk_insert_mappings(database.Frame, [
+        dict(file_hash='a', frame=i, cost=2, timestamp=100 + i * 2)
+        for i in range(1, 11)] + [
+        dict(file_hash='b', frame=1, cost=5, timestamp=50),
+        dict(file_hash='b', frame=1, cost=15, timestamp=500),
+    ])
+
+    jobs, durations = simulate.load_jobs(session)
+    assert _keys(jobs) == ['b', 'a']
+    assert durations == {'a': 20, 'b': 10}
+    assert [i.arrival for i in jobs] == [40, 100]
+
+    jobs, _ = simulate.load_jobs(session, arrival='batch', deadline_factor=2)
+    assert [i.arrival for i in jobs] == [40, 40]
+    assert [i.deadline for i in jobs] == [60, 80]
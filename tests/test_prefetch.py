@@ -0,0 +1,140 @@
+# -*- coding=UTF-8 -*-
+"""Input prefetch cache test.  """
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import io
+import os
+
+import pytest
+
+from batchrender import script
+from batchrender.render import prefetch
+
+SCRIPT = '''Root {
+ inputs 0
+}
+Read {
+ file input/a.%04d.exr
+}
+Read {
+ file input/b.####.exr
+}
+Write {
+ file output/a.%04d.exr
+}
+'''
+
+
+@pytest.fixture(name='config')
+def _config(monkeypatch, tmpdir):
+    ret = dict(DIR=str(tmpdir), PREFETCH_DIR=str(tmpdir.join('cache')),
+               PREFETCH_SIZE=1.0)
+    monkeypatch.setattr(prefetch, 'CONFIG', ret)
+    return ret
+
+
+def _sequence(tmpdir, name, frames, size=10):
+    for i in frames:
+        tmpdir.join('input', name.format(i)).write_binary(
+            b'x' * size, ensure=True)
+
+
+def test_sequence_files(tmpdir):
+    _sequence(tmpdir, 'a.{:04d}.exr', range(1, 4))
+    tmpdir.join('input', 'a.exr').write('')
+    expected = [str(tmpdir.join('input', 'a.{:04d}.exr'.format(i)))
+                for i in range(1, 4)]
+    assert prefetch.sequence_files('input/a.%04d.exr', str(tmpdir)) == expected
+    assert prefetch.sequence_files('input/a.####.exr', str(tmpdir)) == expected
+    assert prefetch.sequence_files('input/a.exr', str(tmpdir)) == [
+        str(tmpdir.join('input', 'a.exr'))]
+    assert prefetch.sequence_files('missing/a.%04d.exr', str(tmpdir)) == []
+
+
+def test_fetch(tmpdir):
+    _sequence(tmpdir, 'a.{:04d}.exr', range(1, 4))
+    src = [str(tmpdir.join('input', 'a.{:04d}.exr'.format(i)))
+           for i in range(1, 4)]
+    cache = prefetch.Cache(str(tmpdir.join('cache')), 25)
+    assert cache.lookup(src[0]) is None
+    assert cache.fetch(src[0])
+    assert cache.lookup(src[0]) == 10
+    assert os.path.exists(cache.path(src[0]))
+
+    # Least recently used is evicted.
+    assert cache.fetch(src[1])
+    assert cache.lookup(src[0]) == 10
+    assert cache.fetch(src[2])
+    assert cache.lookup(src[1]) is None
+    assert not os.path.exists(cache.path(src[1]))
+    assert cache.size == 20
+
+    # Changed source invalidates cache.
+    tmpdir.join('input', 'a.0001.exr').write_binary(b'y' * 5)
+    assert cache.lookup(src[0]) is None
+    assert not os.path.exists(cache.path(src[0]))
+
+    cache.save()
+    assert prefetch.Cache(str(tmpdir.join('cache')), 25).lookup(src[2]) == 10
+
+
+def test_remap(config, tmpdir):
+    _sequence(tmpdir, 'a.{:04d}.exr', range(1, 4))
+    _sequence(tmpdir, 'b.{:04d}.exr', range(1, 3))
+    path = tmpdir.join('shot.nk')
+    path.write_text(SCRIPT, 'utf-8')
+    cache = prefetch.cache()
+    for i in range(1, 4):
+        cache.fetch(str(tmpdir.join('input', 'a.{:04d}.exr'.format(i))))
+    cache.fetch(str(tmpdir.join('input', 'b.0001.exr')))
+
+    stats = cache.remap(str(path), str(tmpdir))
+    assert (stats.hits, stats.misses, stats.bytes) == (3, 2, 30)
+    with io.open(str(path), encoding='utf-8') as f:
+        parsed = script.parse_text(f.read())
+    dirname = cache.dirname(str(tmpdir.join('input')))
+    assert [i.file for i in parsed.reads()] == [
+        '{}/a.%04d.exr'.format(dirname), 'input/b.####.exr']
+    assert [i.file for i in parsed.writes()] == ['output/a.%04d.exr']
+
+    # Pinned files are kept.
+    cache.max_size = 0
+    assert not cache.fetch(str(tmpdir.join('input', 'b.0002.exr')))
+    assert cache.lookup(str(tmpdir.join('input', 'a.0001.exr'))) == 10
+    cache.release(stats.keys)
+    cache.fetch(str(tmpdir.join('input', 'b.0002.exr')))
+    assert cache.size == 0
+
+
+def test_prefetch(config, tmpdir):
+    _sequence(tmpdir, 'a.{:04d}.exr', range(1, 4))
+    tmpdir.join('shot.nk').write_text(SCRIPT, 'utf-8')
+    assert prefetch.Prefetcher.prefetch('shot.nk') == 3
+    assert prefetch.cache().size == 30
+
+
+def test_stale_pinned(config, tmpdir):
+    _sequence(tmpdir, 'a.{:04d}.exr', range(1, 3))
+    path = tmpdir.join('shot.nk')
+    path.write_text(SCRIPT, 'utf-8')
+    src = str(tmpdir.join('input', 'a.0001.exr'))
+    cache = prefetch.cache()
+    cache.fetch(src)
+    cache.fetch(str(tmpdir.join('input', 'a.0002.exr')))
+    stats = cache.remap(str(path), str(tmpdir))
+    assert stats.hits == 2
+
+    # Changed source does not touch copy used by rendering task.
+    tmpdir.join('input', 'a.0001.exr').write_binary(b'y' * 5)
+    assert cache.lookup(src) is None
+    assert not cache.fetch(src)
+    with io.open(cache.path(src), 'rb') as f:
+        assert f.read() == b'x' * 10
+
+    cache.release(stats.keys)
+    assert not os.path.exists(cache.path(src))
+    assert cache.fetch(src)
+    with io.open(cache.path(src), 'rb') as f:
+        assert f.read() == b'y' * 5
@@ -0,0 +1,47 @@
+# -*- coding=UTF-8 -*-
+"""Progressive render test.  """
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import doctest
+from pathlib import PurePath
+
+from batchrender import database
+from batchrender.framerange import FrameRange
+from batchrender.model import fileoutput
+from batchrender.render import progressive
+
+
+def test_doctest():
+    assert not doctest.testmod(progressive).failed
+
+
+def test_passes_cover_range_once():
+    frames = FrameRange(range(1, 101))
+    rendered = []
+    remains = frames
+    while remains:
+        number, selected = progressive.next_pass(remains, 1, 10)
+        assert number
+        rendered.extend(sorted(selected))
+        remains = FrameRange(remains - selected)
+    assert sorted(rendered) == list(frames)
+    assert rendered[:10] == list(range(1, 101, 10))
+
+
+def test_coverage():
+    database.core.setup('sqlite:///:memory:')
+    session = database.core.Session()
+    file_obj = database.File(hash='abc', first_frame=1, last_frame=100)
+    session.add(file_obj)
+    outputs = [database.Output(path=PurePath('out/a.{:04d}.exr'.format(i)), frame=i,
+                               files=[file_obj])
+               for i in range(1, 101, 10)]
+    session.add_all(outputs)
+    session.add(database.Output(path=PurePath('out/b.0001.exr'), frame=1,
+                                files=[file_obj]))
+    session.flush()
+
+    assert fileoutput._coverage(  # pylint: disable=protected-access
+        outputs[0].file_pattern(), outputs) == 0.1
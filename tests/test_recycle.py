@@ -0,0 +1,114 @@
+# -*- coding=UTF-8 -*-
+"""Render process recycle test.  """
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import pytest
+
+from batchrender import database
+from batchrender.render import recycle
+
+
+@pytest.fixture(name='config')
+def _config(monkeypatch):
+    ret = dict(RECYCLE_FRAMES=0, RECYCLE_MEMORY=0.0)
+    monkeypatch.setattr(recycle, 'CONFIG', ret)
+    return ret
+
+
+def test_check(config):
+    recycler = recycle.Recycler()
+    recycler.start()
+    for _ in range(10):
+        recycler.add_frame(1)
+    assert recycler.check(4 * 2 ** 30) is None
+
+    config['RECYCLE_MEMORY'] = 2.0
+    assert recycler.check(2 ** 30) is None
+    assert recycler.check(4 * 2 ** 30) == recycle.MEMORY
+
+    config['RECYCLE_FRAMES'] = 10
+    assert recycler.check() == recycle.FRAMES
+    recycler.recycle(recycle.FRAMES)
+    assert recycler.check() is None
+
+    recycler.start()
+    assert recycler.check() is None
+
+
+def test_record(config):
+    config['RECYCLE_FRAMES'] = 4
+    recycler = recycle.Recycler()
+    recycler.start()
+    for cost in (30, 1, 2, 3):
+        recycler.add_frame(cost)
+    record = recycler.recycle(recycle.FRAMES, frame=4)
+    assert record['frames'] == 4
+    # First frame includes process startup.
+    assert record['cost_before'] == 2
+    # Frame from stopping process.
+    recycler.add_frame(100)
+    assert recycler.pop_records() == []
+
+    recycler.start()
+    for cost in (30, 1, 1, 1, 1, 1, 5):
+        recycler.add_frame(cost)
+    records = recycler.pop_records()
+    assert len(records) == 1
+    assert records[0]['cost_after'] == 1
+    assert records[0]['frame'] == 4
+
+    # Process ended before enough frames.
+    recycler.recycle(recycle.FRAMES)
+    recycler.start()
+    recycler.add_frame(30)
+    recycler.finish()
+    records = recycler.pop_records()
+    assert records[0]['cost_before'] == pytest.approx(9 / 5)
+    assert records[0]['cost_after'] is None
+
+
+def test_summary():
+    database.core.setup('sqlite:///:memory:')
+    session = database.core.Session()
+    session.bulk_insert_mappings(database.Recycle, [
+        dict(run='1', timestamp=1, reason='frames', cost_before=4,
+             cost_after=2, file_hash='abc'),
+        dict(run='2', timestamp=2, reason='memory', cost_before=8,
+             cost_after=4, file_hash='abc'),
+        dict(run='3', timestamp=3, reason='memory', cost_before=8,
+             file_hash='abc'),
+        dict(run='4', timestamp=4, reason='frames', cost_before=1,
+             cost_after=1, file_hash='def'),
+    ])
+
+    result = database.Recycle.summary(session, file_hash='abc')
+    assert result == dict(count=3, cost_before=6, cost_after=3, speedup=2)
+    assert database.Recycle.summary(session, since=4)['speedup'] == 1
+    assert database.Recycle.summary(session, file_hash='xyz') == dict(
+        count=0, cost_before=None, cost_after=None, speedup=None)
+
+
+def test_progress(config):
+    config['RECYCLE_FRAMES'] = 2
+    recycler = recycle.Recycler()
+    recycler.start(journaled=3)
+    for _ in range(2):
+        recycler.add_frame(1)
+    # Nothing journaled, restart would render same frames.
+    assert recycler.check(journaled=3) is None
+    assert recycler.check(journaled=5) == recycle.FRAMES
+
+    for _ in range(recycler.max_restarts):
+        recycler.recycle(recycle.FRAMES)
+        recycler.start(journaled=5, is_restart=True)
+        for _ in range(2):
+            recycler.add_frame(1)
+    assert recycler.restarts == recycler.max_restarts
+    assert recycler.check(journaled=7) is None
+
+    recycler.start(journaled=7)
+    for _ in range(2):
+        recycler.add_frame(1)
+    assert recycler.check(journaled=9) == recycle.FRAMES
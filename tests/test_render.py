@@ -0,0 +1,41 @@
+# -*- coding=UTF-8 -*-
+"""Render test with fake nuke.  """
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import doctest
+import os
+import sys
+from subprocess import PIPE, Popen
+
+from batchrender.render import proc_handler
+from batchrender.render.proc_handler import NukeHandler
+
+sys.path.insert(0, os.path.dirname(__file__))
+import fake_nuke  # pylint: disable=wrong-import-position
+
+
+def test_doctest():
+    assert not doctest.testmod(proc_handler).failed
+
+
+def test_nuke_handler(wait, tmpdir):
+    executable = fake_nuke.create_executable(str(tmpdir))
+    script = tmpdir.join('test.nk')
+    script.write('Root {}')
+    proc = Popen([executable, '-x', '-F', '1-9x2', str(script)],
+                 stdout=PIPE, stderr=PIPE, cwd=str(tmpdir))
+    handler = NukeHandler(proc)
+    frames, outputs = [], []
+    handler.frame_finished.connect(lambda data: frames.append(data))
+    handler.output_updated.connect(lambda data: outputs.append(data))
+    handler.start()
+    wait(proc)
+
+    assert proc.returncode == 0
+    assert [i['frame'] for i in frames] == [1, 3, 5, 7, 9]
+    assert [i['current'] for i in frames] == [1, 2, 3, 4, 5]
+    assert all(i['total'] == 5 for i in frames)
+    assert [i['frame'] for i in outputs] == [1, 3, 5, 7, 9]
+    assert all(os.path.exists(i['path']) for i in outputs)
@@ -0,0 +1,61 @@
+# -*- coding=UTF-8 -*-
+"""Resource sampling test.  """
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import sys
+import time
+from subprocess import Popen
+
+import psutil
+
+from batchrender.render.resource import (ResourceSampler, Usage, resume_tree,
+                                         suspend_tree)
+
+
+def test_usage():
+    usage = Usage()
+    for cpu, rss in ((100, 10), (300, 30)):
+        usage.add(dict(cpu=cpu, rss=rss, threads=4, io_read=1, io_write=2))
+    assert usage.as_dict() == dict(
+        samples=2, cpu_average=200, cpu_max=300, rss_average=20, rss_peak=30,
+        io_read=2, io_write=4, threads=4)
+    assert Usage().as_dict()['cpu_average'] == 0
+
+
+def test_resource_sampler():
+    proc = Popen([sys.executable, '-c', 'import time; time.sleep(1)'])
+    sampler = ResourceSampler(proc.pid, interval=0.05)
+    sampler.start()
+    time.sleep(0.3)
+    frame = sampler.mark_frame()
+    proc.wait()
+    usage = sampler.stop()
+
+    assert frame.samples > 0
+    assert frame.rss_peak > 0
+    assert frame.threads > 0
+    assert usage.samples >= frame.samples
+
+
+def _wait_status(pid, status, timeout=2):
+    start = time.time()
+    while time.time() - start < timeout:
+        if psutil.Process(pid).status() == status:
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_suspend_tree():
+    proc = Popen([sys.executable, '-c', 'import time; time.sleep(5)'])
+    try:
+        assert suspend_tree(proc.pid) == 1
+        assert _wait_status(proc.pid, psutil.STATUS_STOPPED)
+        assert resume_tree(proc.pid) == 1
+        assert _wait_status(proc.pid, psutil.STATUS_SLEEPING)
+    finally:
+        proc.kill()
+        proc.wait()
+    assert suspend_tree(proc.pid) == 0
@@ -0,0 +1,78 @@
+# -*- coding=UTF-8 -*-
+"""Nuke script parser test.  """
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import doctest
+
+from batchrender import script
+
+SCRIPT = r'''#! nuke -nx
+version 10.0 v4
+Root {
+ inputs 0
+ name /tmp/shot.nk
+ first_frame 1001
+ last_frame 1100
+ format "1920 1080 0 0 1920 1080 1 HD_1080"
+}
+Read {
+ inputs 0
+ file "plates/shot \"a\".%04d.exr"
+ name Read1
+}
+Read {
+ inputs 0
+ file "\[value root.name].exr"
+ name Read2
+}
+Read {
+ inputs 0
+ file missing.exr
+ disable true
+ name Read3
+}
+Group {
+ name Group1
+ addUserKnob {20 User}
+ knobChanged "
+if True:
+    pass
+"
+}
+ Write {
+  file out/inner.%04d.exr
+  name Write2
+ }
+end_group
+Write {
+ file out/shot.####.exr
+ disable true
+ name Write1
+}
+'''
+
+
+def test_doctest():
+    assert not doctest.testmod(script).failed
+
+
+def test_parse_text():
+    parsed = script.parse_text(SCRIPT)
+    assert parsed.frame_range() == (1001, 1100)
+    assert parsed.resolution() == (1920, 1080)
+    assert [i.name for i in parsed.reads()] == ['Read1', 'Read2']
+    assert [i.file for i in parsed.reads()] == ['plates/shot "a".%04d.exr', None]
+    assert [i.name for i in parsed.writes()] == ['Write2']
+    assert 'Group1' in [i.name for i in parsed.nodes]
+
+
+def test_parse_cache(tmpdir):
+    path = tmpdir.join('a.nk')
+    path.write(SCRIPT)
+    assert script.parse(str(path)) is script.parse(str(path))
+
+    path.write('Root {\n first_frame 1\n last_frame 2\n}\n')
+    assert script.parse(str(path)).frame_range() == (1, 2)
+    assert script.parse(str(path)).resolution() is None
@@ -0,0 +1,104 @@
+# -*- coding=UTF-8 -*-
+"""Output staging test.  """
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import io
+import os
+
+from batchrender import script
+from batchrender.render import staging
+
+SCRIPT = '''Root {
+ inputs 0
+}
+Read {
+ file input/a.%04d.exr
+}
+Write {
+ file output/a.%04d.exr
+}
+Write {
+ file "output/a.####.jpg"
+}
+Write {
+ file "[value root.name].exr"
+}
+Write {
+ file output/a.mov
+}
+'''
+
+
+def test_move(tmpdir):
+    src = tmpdir.join('src.bin')
+    src.write_binary(b'x' * 100)
+    dst = tmpdir.join('a', 'b', 'dst.bin')
+    assert staging.move(str(src), str(dst)) is None
+    assert not src.exists()
+    assert dst.read_binary() == b'x' * 100
+    assert not tmpdir.join('a', 'b', 'dst.bin.part').exists()
+
+    error = staging.move(str(src), str(dst))
+    assert error
+    assert dst.read_binary() == b'x' * 100
+
+
+def test_remap(tmpdir):
+    path = tmpdir.join('a.nk')
+    path.write_text(SCRIPT, 'utf-8')
+    stager = staging.Stager(str(tmpdir.join('staging')))
+    assert stager.remap(str(path), str(tmpdir)) == 1
+
+    with io.open(str(path), encoding='utf-8') as f:
+        text = f.read()
+    parsed = script.parse_text(text)
+    reads = [i.file for i in parsed.reads()]
+    writes = [i.file for i in parsed.writes()]
+    assert reads == ['input/a.%04d.exr']
+    staged = staging._normpath(tmpdir.join('staging', '0'))
+    assert writes == ['{}/a.%04d.exr'.format(staged),
+                      '{}/a.####.jpg'.format(staged),
+                      None,
+                      'output/a.mov']
+    assert '"[value root.name].exr"' in text
+
+    final = staging._normpath(tmpdir.join('output'))
+    assert (stager.final_path('{}/a.0001.exr'.format(staged))
+            == '{}/a.0001.exr'.format(final))
+    assert stager.final_path(str(tmpdir.join('output', 'a.0001.exr'))) is None
+    stager.clean()
+
+
+def test_move_finished(tmpdir):
+    stager = staging.Stager(str(tmpdir.join('staging')))
+    stager.dirs['/staged'] = '/final'
+    moved = []
+    idle = []
+    stager.moved.connect(lambda x: moved.append(x))
+    stager.idle.connect(lambda: idle.append(True))
+
+    stager.pending = 2
+    job = dict(path='/staged/a.exr', frame=1, src='/staged/a.exr',
+               dst='/final/a.exr', stager=stager._token, error=None)
+    stager.on_move_finished(dict(job, stager='other'))
+    stager.on_move_finished(job)
+    assert moved == [dict(path='/final/a.exr', frame=1)]
+    assert not idle
+
+    stager.on_move_finished(dict(job, error='failed'))
+    assert len(moved) == 1
+    assert stager.failed == ['/final/a.exr: failed']
+    assert idle
+    stager.clean()
+
+
+def test_final_path_case(monkeypatch, tmpdir):
+    # Like windows.
+    monkeypatch.setattr(os.path, 'normcase', lambda x: x.lower())
+    stager = staging.Stager(str(tmpdir.join('staging')))
+    stager.dirs['/Staged/0'] = '/Final/Shot'
+    assert (stager.final_path('/staged/0/Shot.0001.exr')
+            == '/Final/Shot/Shot.0001.exr')
+    stager.clean()
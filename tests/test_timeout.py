@@ -0,0 +1,67 @@
+# -*- coding=UTF-8 -*-
+"""Render time out test.  """
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import pytest
+
+from batchrender import database
+from batchrender.render import timeout
+
+
+@pytest.fixture(name='session')
+def _session(monkeypatch):
+    monkeypatch.setattr(timeout, 'CONFIG', dict(
+        TIME_OUT=600,
+        TIME_OUT_FACTOR=3.0,
+        TIME_OUT_MIN=60,
+        TIME_OUT_OVERRIDES={'*_heavy.nk': 3600},
+    ))
+    database.core.setup('sqlite:///:memory:')
+    return database.core.Session()
+
+
+def _add_frames(session, file_hash, costs):
+    session.bulk_insert_mappings(database.Frame, [
+        dict(file_hash=file_hash, frame=i, cost=cost, timestamp=i)
+        for i, cost in enumerate(costs)])
+
+
+def test_quantile(session):
+    _add_frames(session, 'abc', range(100, 0, -1))
+    query = session.query(database.Frame.cost).filter(
+        database.Frame.file_hash == 'abc')
+    assert timeout.quantile(query, database.Frame.cost) == (100, 100)
+    assert timeout.quantile(query, database.Frame.cost, 0.5) == (51, 100)
+    assert timeout.quantile(query.filter(database.Frame.cost < 0),
+                            database.Frame.cost) == (None, 0)
+
+
+def test_decide(session):
+    _add_frames(session, 'fast', [30] * 50)
+    _add_frames(session, 'slow', [1000] * 50)
+    _add_frames(session, 'tiny', [0.5] * 50)
+    _add_frames(session, 'new', [10] * 5)
+
+    result = timeout.decide(session, 'fast', 'fast.nk')
+    assert result.frame == (90, timeout.HISTORY_SOURCE, 30, 50)
+    assert result.first_frame.source == timeout.CONFIG_SOURCE
+    assert result.first_frame.seconds == 600
+    assert timeout.decide(session, 'slow', 'slow.nk').frame.seconds == 600
+    assert timeout.decide(session, 'tiny', 'tiny.nk').frame.seconds == 60
+    assert timeout.decide(session, 'new', 'new.nk').frame.source == \
+        timeout.CONFIG_SOURCE
+
+    result = timeout.decide(session, 'fast', 'shot_heavy.nk')
+    assert result.frame == result.first_frame
+    assert result.frame.seconds == 3600
+    assert 'override' in str(result.frame)
+
+
+def test_decide_disabled(session):
+    _add_frames(session, 'fast', [30] * 50)
+    timeout.CONFIG['TIME_OUT'] = 0
+    result = timeout.decide(session, 'fast', 'fast.nk')
+    assert result.frame == (0, timeout.CONFIG_SOURCE, 30, 50)
+    assert result.first_frame.seconds == 0
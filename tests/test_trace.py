@@ -0,0 +1,52 @@
+# -*- coding=UTF-8 -*-
+"""Trace export test.  """
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import pytest
+
+from batchrender import database, trace
+
+
+@pytest.fixture(name='session')
+def _session():
+    database.core.setup('sqlite:///:memory:')
+    return database.core.Session()
+
+
+def test_export(session):
+    file_obj = database.File(hash='abc', label='test.nk')
+    session.add(file_obj)
+    session.add(database.Output(
+        path='test.0001.exr', frame=1, timestamp=102, files=[file_obj]))
+    session.bulk_insert_mappings(database.Phase, [
+        dict(run='1', name='task', start=100, cost=10,
+             file_hash='abc', host='a', slot=1),
+        dict(run='1', name='spawn', start=100, cost=1,
+             file_hash='abc', host='a', slot=1),
+    ])
+    session.bulk_insert_mappings(database.Frame, [
+        dict(file_hash='abc', frame=1, cost=2, timestamp=103),
+        dict(file_hash='abc', frame=2, cost=2, timestamp=105),
+    ])
+    session.commit()
+
+    result = trace.export(session)
+    events = result['traceEvents']
+    metadata = [i for i in events if i['ph'] == 'M']
+    assert {i['args']['name'] for i in metadata} == {'a', 'slot 1'}
+    spans = [i for i in events if i['ph'] != 'M']
+    assert [(i['cat'], i['name']) for i in spans] == [
+        ('task', 'test.nk'),
+        ('phase', 'spawn'),
+        ('frame', 'frame 1'),
+        ('output', 'test.0001.exr'),
+        ('frame', 'frame 2'),
+    ]
+    assert len({(i['pid'], i['tid']) for i in spans}) == 1
+    assert spans[2]['ts'] == 101000000
+    assert spans[2]['dur'] == 2000000
+
+    assert not [i for i in trace.export(session, since=200)['traceEvents']
+                if i['ph'] != 'M']
@@ -0,0 +1,73 @@
+# -*- coding=UTF-8 -*-
+"""Render option tuning test.  """
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import pytest
+
+from batchrender import database
+from batchrender.render import tuning
+
+
+@pytest.fixture(name='limits')
+def _limits(monkeypatch):
+    monkeypatch.setattr(tuning, '_max_threads', lambda: 16)
+    monkeypatch.setattr(tuning, '_max_memory_limit', lambda: 32.0)
+    monkeypatch.setattr(tuning, 'default_settings',
+                        lambda: tuning.Settings(16, 32.0, tuning.CONFIG_REASON))
+
+
+@pytest.fixture(name='session')
+def _session(limits):  # pylint: disable=unused-argument
+    database.core.setup('sqlite:///:memory:')
+    return database.core.Session()
+
+
+def _render(session, settings, frame_cost, since):
+    session.bulk_insert_mappings(database.Frame, [
+        dict(file_hash='abc', frame=i, cost=frame_cost, timestamp=since + i)
+        for i in range(4)])
+    session.add(database.Resource(
+        run=str(since), file_hash='abc', timestamp=since, samples=10,
+        cpu_average=350, cpu_max=380, rss_peak=3 * 2 ** 30))
+    return tuning.record(session, str(since), 'abc', settings, since)
+
+
+def test_from_resource(limits):  # pylint: disable=unused-argument
+    assert tuning.from_resource(dict(runs=0, cpu_max=None, rss_peak=None)) is None
+    settings = tuning.from_resource(
+        dict(runs=1, cpu_max=380, rss_peak=3 * 2 ** 30))
+    assert settings.threads == 5
+    assert settings.memory_limit == 4.5
+
+
+def test_choose(session):
+    settings = tuning.choose(session, 'abc', explore=True)
+    assert settings.reason == tuning.CONFIG_REASON
+    record = _render(session, settings, 4.0, 100)
+    assert record.speedup == 1
+
+    settings = tuning.choose(session, 'abc', explore=True)
+    assert settings == (5, 4.5, tuning.RESOURCE_REASON)
+    record = _render(session, settings, 2.0, 200)
+    assert record.speedup == 2
+
+    settings = tuning.choose(session, 'abc', explore=True)
+    assert settings == (4, 4.5, tuning.EXPLORE_REASON)
+    _render(session, settings, 3.0, 300)
+
+    settings = tuning.choose(session, 'abc', explore=True)
+    assert settings == (6, 4.5, tuning.EXPLORE_REASON)
+    _render(session, settings, 2.5, 400)
+
+    settings = tuning.choose(session, 'abc', explore=True)
+    assert settings == (5, 4.5, tuning.BEST_REASON)
+    assert tuning.choose(session, 'abc') == settings
+
+
+def test_options_override():
+    from batchrender.render.task import _options_from_config
+    options = _options_from_config({'THREADS': 3, 'MEMORY_LIMIT': 1.5})
+    assert options[options.index('-m') + 1] == 3
+    assert options[options.index('-c') + 1] == '1536M'
@@ -0,0 +1,96 @@
+# -*- coding=UTF-8 -*-
+"""Script validation test.  """
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import doctest
+
+from batchrender.render import validation
+
+
+def test_doctest():
+    assert not doctest.testmod(validation).failed
+
+
+def test_check(tmpdir):
+    tmpdir.mkdir('plates').join('a.0001.exr').write('x')
+    tmpdir.join('b.exr').write('x')
+    path = tmpdir.join('a.nk')
+    path.write('''Read {
+ file plates/a.%04d.exr
+ name Read1
+}
+Read {
+ file b.exr
+ name Read2
+}
+Write {
+ file out/a.%04d.exr
+ name Write1
+}
+''')
+    assert validation.check(str(path)) == []
+    assert validation.missing_inputs(str(path), str(tmpdir)) == []
+
+    path.write('''Read {
+ file plates/missing.####.exr
+ name Read1
+}
+Read {
+ file "[value root.name]"
+ name Read2
+}
+Write {
+ file out/a.%04d.exr
+ disable true
+ name Write1
+}
+''')
+    assert validation.check(str(path)) == ['没有启用的输出节点']
+    assert validation.missing_inputs(str(path), str(tmpdir)) == [
+        'Read1: 输入文件不存在: plates/missing.####.exr',
+    ]
+
+
+def test_script_frames(tmpdir):
+    path = tmpdir.join('a.nk')
+    path.write('Root {\n first_frame 3\n last_frame 5\n}\n')
+    assert list(validation.script_frames(str(path))) == [3, 4, 5]
+    path.write('Root {\n}\n')
+    assert not validation.script_frames(str(path))
+
+
+def test_output_frames(tmpdir):
+    path = tmpdir.join('a.nk')
+    path.write('''Write {
+ file out/a.%04d.exr
+ use_limit true
+ first 3
+ last 4
+ name Write1
+}
+Write {
+ file "[value root.name].####.exr"
+ name Write2
+}
+Write {
+ file out/a.mov
+ name Write3
+}
+''')
+    frames = range(1, 6)
+    assert list(validation.output_frames(str(path), frames)) == [3, 4]
+
+    path.write('''Write {
+ file out/a.%04d.exr
+ use_limit true
+ first "\\[value start]"
+ last 4
+ name Write1
+}
+''')
+    assert not validation.output_frames(str(path), frames)
+
+    path.write('Write {\n file out/b.####.exr\n name Write1\n}\n')
+    assert list(validation.output_frames(str(path), frames)) == [1, 2, 3, 4, 5]
@@ -0,0 +1,95 @@
+# -*- coding=UTF-8 -*-
+"""Directory watcher test.  """
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import os
+import struct
+import threading
+import time
+
+import pytest
+
+from batchrender import watcher
+
+
+def _write(path, content):
+    with open(path, 'w') as f:
+        f.write(content)
+
+
+def test_polling_watcher(tmpdir):
+    root = str(tmpdir)
+    _write(os.path.join(root, 'exists.nk'), 'exists')
+    _write(os.path.join(root, 'ignored.txt'), 'ignored')
+    events = []
+    obj = watcher.PollingWatcher(root, events.append, debounce=1)
+    obj.start()
+    obj.stop()
+    assert [(i.type, os.path.basename(i.path)) for i in events] == [
+        (watcher.ADDED, 'exists.nk')]
+    del events[:]
+
+    path = os.path.join(root, 'new.nk')
+    _write(path, 'part')
+    obj.diff(watcher.scan(root, '.nk'), now=0)
+    obj.check(now=0.5)
+    assert not events
+
+    # Still growing.
+    _write(path, 'partial')
+    obj.diff(watcher.scan(root, '.nk'), now=0.5)
+    obj.check(now=1.2)
+    assert not events
+
+    obj.check(now=1.6)
+    assert [(i.type, i.path) for i in events] == [(watcher.ADDED, path)]
+    assert path in obj
+    del events[:]
+
+    obj.diff(watcher.scan(root, '.nk'), now=2)
+    obj.check(now=4)
+    assert not events
+
+    os.remove(path)
+    obj.diff(watcher.scan(root, '.nk'), now=5)
+    assert [(i.type, i.path) for i in events] == [(watcher.REMOVED, path)]
+    assert path not in obj
+
+
+def test_scan_in_thread(tmpdir):
+    root = str(tmpdir)
+    _write(os.path.join(root, 'exists.nk'), 'exists')
+    events = []
+    obj = watcher.PollingWatcher(
+        root, lambda event: events.append((event, threading.current_thread())))
+    obj.start()
+    thread = obj._thread  # pylint: disable=protected-access
+    obj.stop(wait=False)
+    thread.join(5)
+    assert not thread.is_alive()
+    assert [(i.type, os.path.basename(i.path)) for i, _ in events] == [
+        (watcher.ADDED, 'exists.nk')]
+    assert all(i is thread for _, i in events)
+
+
+@pytest.mark.skipif(not watcher.InotifyWatcher.is_avaliable(),
+                    reason='Need inotify.')
+def test_inotify_overflow(tmpdir):
+    root = str(tmpdir)
+    events = []
+    obj = watcher.InotifyWatcher(root, events.append, debounce=1)
+    read_fd, write_fd = os.pipe()
+    obj._fd = read_fd  # pylint: disable=protected-access
+    try:
+        # Events of this file are lost.
+        _write(os.path.join(root, 'lost.nk'), 'lost')
+        os.write(write_fd, struct.pack(str('iIII'), -1, 0x4000, 0, 0))
+        obj.poll()
+        obj.check(now=time.time() + 2)
+    finally:
+        os.close(read_fd)
+        os.close(write_fd)
+    assert [(i.type, os.path.basename(i.path)) for i in events] == [
+        (watcher.ADDED, 'lost.nk')]